@@ -1,11 +1,22 @@
 import os
+import click
 from flask import Flask
-from sqlalchemy import BigInteger
+from sqlalchemy import BigInteger, event
 from sqlalchemy.ext.compiler import compiles
-from flasgger import Swagger
 from app.config import config
 from app.extensions import db, jwt, cors
 from app.errors import register_error_handlers
+from app.db_routing import init_db_routing
+from app.serialization import init_json_provider
+from app.compression import init_compression
+from app.instrumentation import init_instrumentation
+from app.concurrency import init_concurrency
+from app.query_guard import init_query_guard
+from app.session_provisioning import init_session_provisioning
+from app.login_throttle import init_login_throttle
+from app.passwords import init_password_hasher
+from app.tenancy import configure_partition_binds, init_tenancy
+from app.header_cache import init_header_cache
 
 
 @compiles(BigInteger, 'sqlite')
@@ -13,6 +24,23 @@ def _render_bigint_as_int(type_, compiler, **kw):
     return 'INTEGER'
 
 
+def _configure_sqlite_pragmas(app):
+    """Set the configured PRAGMAs on each new SQLite connection."""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    for engine in db.engines.values():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _set_pragmas)
+
+
 SWAGGER_TEMPLATE = {
     "info": {
         "title": "Incident Tracker Lite API",
@@ -82,6 +110,28 @@ SWAGGER_TEMPLATE = {
                 "session_id": {"type": "string"}
             }
         },
+        "IncidentSummary": {
+            "type": "object",
+            "description": "Compact incident used in list contexts (request view=full for the full Incident)",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "incident_number": {"type": "string"},
+                "title": {"type": "string"},
+                "severity": {"type": "string", "enum": ["critical", "high", "medium", "low"]},
+                "category": {"type": "string"},
+                "status": {"type": "string"},
+                "reported_at": {"type": "string", "format": "date-time"},
+                "acknowledged_at": {"type": "string", "format": "date-time"},
+                "resolved_at": {"type": "string", "format": "date-time"},
+                "closed_at": {"type": "string", "format": "date-time"},
+                "assigned_to": {"type": "string"},
+                "users_affected": {"type": "integer"},
+                "problem_id": {"type": "string", "format": "uuid"},
+                "created_at": {"type": "string", "format": "date-time"},
+                "updated_at": {"type": "string", "format": "date-time"},
+                "session_id": {"type": "string"}
+            }
+        },
         "TimelineEntry": {
             "type": "object",
             "properties": {
@@ -120,6 +170,25 @@ SWAGGER_TEMPLATE = {
                 "session_id": {"type": "string"}
             }
         },
+        "Job": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "kind": {"type": "string"},
+                "status": {"type": "string", "enum": ["queued", "running", "succeeded", "failed"]},
+                "params": {"type": "object"},
+                "attempts": {"type": "integer"},
+                "max_attempts": {"type": "integer"},
+                "run_after": {"type": "string", "format": "date-time"},
+                "error": {"type": "string"},
+                "has_result": {"type": "boolean"},
+                "result_content_type": {"type": "string"},
+                "created_at": {"type": "string", "format": "date-time"},
+                "started_at": {"type": "string", "format": "date-time"},
+                "finished_at": {"type": "string", "format": "date-time"},
+                "session_id": {"type": "string"}
+            }
+        },
         "Problem": {
             "type": "object",
             "properties": {
@@ -159,6 +228,16 @@ SWAGGER_TEMPLATE = {
                 "session_id": {"type": "string"}
             }
         },
+        "SimilarIncident": {
+            "type": "object",
+            "properties": {
+                "incident": {"$ref": "#/definitions/Incident"},
+                "score": {"type": "number"},
+                "shared_terms": {"type": "array", "items": {"type": "string"}},
+                "shared_assets": {"type": "array", "items": {"type": "string"}},
+                "same_category": {"type": "boolean"}
+            }
+        },
         "SLATarget": {
             "type": "object",
             "properties": {
@@ -168,6 +247,41 @@ SWAGGER_TEMPLATE = {
                 "resolution_target_minutes": {"type": "integer"},
                 "session_id": {"type": "string"}
             }
+        },
+        "WebhookSubscription": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "url": {"type": "string"},
+                "description": {"type": "string"},
+                "events": {"type": "array", "items": {"type": "string"}},
+                "severities": {"type": "array", "items": {"type": "string"}},
+                "categories": {"type": "array", "items": {"type": "string"}},
+                "active": {"type": "boolean"},
+                "secret": {"type": "string", "description": "Only returned on creation"},
+                "consecutive_failures": {"type": "integer"},
+                "last_delivery_at": {"type": "string", "format": "date-time"},
+                "last_error": {"type": "string"},
+                "created_at": {"type": "string", "format": "date-time"},
+                "session_id": {"type": "string"}
+            }
+        },
+        "WebhookDelivery": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "subscription_id": {"type": "string", "format": "uuid"},
+                "incident_id": {"type": "string", "format": "uuid"},
+                "event_types": {"type": "array", "items": {"type": "string"}},
+                "status": {"type": "string",
+                           "enum": ["pending", "sending", "delivered", "failed", "cancelled"]},
+                "attempts": {"type": "integer"},
+                "next_attempt_at": {"type": "string", "format": "date-time"},
+                "response_status": {"type": "integer"},
+                "last_error": {"type": "string"},
+                "created_at": {"type": "string", "format": "date-time"},
+                "delivered_at": {"type": "string", "format": "date-time"}
+            }
         }
     }
 }
@@ -195,17 +309,40 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.url_map.strict_slashes = False
     app.config.from_object(config[config_name])
+    if app.config.get('PROXY_FIX_X_FOR'):
+        # Behind nginx: trust this many X-Forwarded-For hops for the client address
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    init_json_provider(app)
 
+    configure_partition_binds(app)
     db.init_app(app)
+    with app.app_context():
+        _configure_sqlite_pragmas(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
     jwt.init_app(app)
 
-    Swagger(app, config=SWAGGER_CONFIG, template=SWAGGER_TEMPLATE)
+    # flasgger builds the spec on the first /apispec.json hit and caches it per worker;
+    # importing it here keeps it off the startup path when the docs are disabled.
+    if app.config.get('SWAGGER_ENABLED'):
+        from flasgger import Swagger
+        from app.openapi import init_static_spec
+        init_static_spec(app, Swagger(app, config=SWAGGER_CONFIG, template=SWAGGER_TEMPLATE))
 
     from app.api import register_blueprints
     register_blueprints(app)
 
     register_error_handlers(app)
+    init_db_routing(app)
+    init_concurrency(app)
+    init_compression(app)
+    init_instrumentation(app)
+    init_session_provisioning(app)
+    init_tenancy(app)
+    init_query_guard(app)
+    init_login_throttle(app)
+    init_password_hasher(app)
+    init_header_cache(app)
 
     @app.route('/api/health')
     def health_check():
@@ -241,16 +378,18 @@ def create_app(config_name=None):
     # Demo auth (enabled via DEMO_AUTH_ENABLED env var)
     try:
         from demo_auth import init_demo_auth
-        from demo_sessions import SessionManager
-        db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
-        if db_uri.startswith('sqlite:///'):
-            template_db = os.path.join(app.instance_path, db_uri.replace('sqlite:///', ''))
-        else:
-            template_db = os.path.join(app.instance_path, 'incident_tracker.db')
-        _session_mgr = SessionManager(
-            template_db=template_db,
-            sessions_dir=os.path.join(os.path.dirname(app.instance_path), 'data', 'sessions')
-        )
+        _session_mgr = app.extensions.get('session_provisioning')
+        if _session_mgr is None:
+            from demo_sessions import SessionManager
+            db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+            if db_uri.startswith('sqlite:///'):
+                template_db = os.path.join(app.instance_path, db_uri.replace('sqlite:///', ''))
+            else:
+                template_db = os.path.join(app.instance_path, 'incident_tracker.db')
+            _session_mgr = SessionManager(
+                template_db=template_db,
+                sessions_dir=os.path.join(os.path.dirname(app.instance_path), 'data', 'sessions')
+            )
         init_demo_auth(app, session_manager=_session_mgr)
     except ImportError:
         pass
@@ -268,9 +407,486 @@ def register_cli(app):
 
     @app.cli.command('init-db')
     def init_db_command():
+        from app.services.users import ensure_demo_users
         db.create_all()
+        ensure_demo_users()
+        db.session.commit()
         print('Database initialized.')
 
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Create tables and seed an empty database in one boot (container start-up)."""
+        from app.models.sla_target import SLATarget
+        from app.services.users import ensure_demo_users
+        db.create_all()
+        if SLATarget.query.first() is None:
+            from app.seed import seed
+            seed()
+        else:
+            print('Database already seeded.')
+        # Databases seeded before the users table existed
+        if ensure_demo_users():
+            db.session.commit()
+            print('Demo users added.')
+
+    @app.cli.command('create-user')
+    @click.option('--username', required=True)
+    @click.option('--role', default='responder', show_default=True)
+    @click.option('--name', default=None)
+    @click.password_option()
+    def create_user_command(username, role, name, password):
+        """Add a login user."""
+        from app.services.users import create_user, get_by_username
+        if get_by_username(username) is not None:
+            raise click.ClickException(f'User {username} already exists')
+        user = create_user(username, password, role=role, name=name)
+        db.session.commit()
+        print(f'Created user {user.username} ({user.id}).')
+
+    @app.cli.command('export-spec')
+    @click.option('--check', is_flag=True, help='Fail if the exported spec is out of date.')
+    def export_spec_command(check):
+        """Render the OpenAPI spec from the endpoint docstrings to a versioned JSON file."""
+        from app.openapi import export_spec
+        path, up_to_date = export_spec(app, check=check)
+        if check and not up_to_date:
+            raise click.ClickException(f'{path} is out of date; run "flask export-spec".')
+        print(f'OpenAPI spec {"is up to date" if check else "written"}: {path}')
+
+    @app.cli.command('seed-synthetic')
+    @click.option('--incidents', default=1000, show_default=True, help='Incidents to generate.')
+    @click.option('--timeline-per-incident', default=5, show_default=True)
+    @click.option('--problems', default=20, show_default=True)
+    @click.option('--session-id', default='__default__', show_default=True)
+    @click.option('--seed', 'random_seed', type=int, default=None, help='Random seed for repeatable data.')
+    @click.option('--skip-index', is_flag=True, help='Skip the similarity index and tag backfill.')
+    def seed_synthetic_command(incidents, timeline_per_incident, problems, session_id,
+                               random_seed, skip_index):
+        """Bulk-generate realistic incidents for scaling and benchmark runs."""
+        from app.synthetic import generate
+        db.create_all()
+        counts = generate(
+            incidents, timeline_per_incident, problems, session_id, seed=random_seed,
+            progress=lambda done, total: print(f'  {done}/{total} incidents', end='\r'),
+        )
+        if not skip_index:
+            from app.services.similarity import rebuild_index
+            from app.services.tags import backfill_tags
+            rebuild_index(session_id)
+            backfill_tags(session_id)
+        db.session.commit()
+        rows = sum(v for k, v in counts.items() if k != 'elapsed_seconds')
+        rate = rows / counts['elapsed_seconds'] if counts['elapsed_seconds'] else rows
+        print(f'\nGenerated {counts} ({rate:,.0f} rows/s).')
+
+    @app.cli.command('benchmark-endpoints')
+    @click.option('--session-id', default='__default__', show_default=True)
+    @click.option('--repeat', default=5, show_default=True)
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', default='admin123', show_default=True)
+    def benchmark_endpoints_command(session_id, repeat, username, password):
+        """Report p50/max latency and SQL query count of every GET endpoint."""
+        from app.benchmark import run
+        try:
+            results = run(app, session_id=session_id, repeat=repeat, username=username,
+                          password=password)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        for result in results:
+            queries = '-' if result['queries'] is None else result['queries']
+            print(f"{result['p50_ms']:>9.2f} ms p50 {result['max_ms']:>9.2f} ms max "
+                  f"{queries:>4} q {result['status']} {result['bytes']:>9} B  {result['url']}")
+
+    @app.cli.command('benchmark-auth')
+    @click.option('--iterations', default=2000, show_default=True)
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', default='admin123', show_default=True)
+    def benchmark_auth_command(iterations, username, password):
+        """Measure authenticated request overhead with and without the JWT claims cache."""
+        from app.benchmark import auth_overhead
+        try:
+            results = auth_overhead(app, iterations=iterations, username=username,
+                                    password=password)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        print(f"login (password KDF)  p50 {results['login_p50_ms']:>8.2f} ms")
+        print(f"/api/health baseline  p50 {results['health_p50_ms']:>8.2f} ms")
+        for label in ('uncached', 'cached'):
+            if label in results:
+                r = results[label]
+                print(f"{label:<9} verify {r['verify_us']:>8.2f} us   "
+                      f"/api/auth/me p50 {r['me_p50_ms']:>8.2f} ms")
+
+    @app.cli.command('load-test')
+    @click.option('--url', default='http://127.0.0.1:5000', show_default=True,
+                  help='Base URL of the running server.')
+    @click.option('--dashboard-clients', default=500, show_default=True)
+    @click.option('--stream-clients', default=5, show_default=True)
+    @click.option('--duration', default=30, show_default=True, help='Seconds to run.')
+    @click.option('--think-ms', default=1000, show_default=True,
+                  help='Pause between polls of each dashboard client.')
+    @click.option('--stream-read-delay-ms', default=100, show_default=True,
+                  help='Pause between 4 KB reads of each streaming client.')
+    @click.option('--max-crud-p95-ms', type=float, default=None,
+                  help='Fail if CRUD p95 latency exceeds this.')
+    @click.option('--session-id', default='__default__', show_default=True)
+    def load_test_command(url, dashboard_clients, stream_clients, duration, think_ms,
+                          stream_read_delay_ms, max_crud_p95_ms, session_id):
+        """Check that short CRUD requests stay fast under dashboard and streaming load."""
+        from app.benchmark import load_test
+        try:
+            results = load_test(app, url, dashboard_clients=dashboard_clients,
+                                stream_clients=stream_clients, duration=duration,
+                                think_ms=think_ms, stream_read_delay_ms=stream_read_delay_ms,
+                                session_id=session_id)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        for kind, r in results.items():
+            print(f"{kind:<11} {r['requests']:>7} ok {r['errors']:>5} err  "
+                  f"p50 {r['p50_ms'] or 0:>9.2f} ms  p95 {r['p95_ms'] or 0:>9.2f} ms  "
+                  f"max {r['max_ms'] or 0:>9.2f} ms")
+        crud_p95 = max(results['crud_read']['p95_ms'] or 0, results['crud_write']['p95_ms'] or 0)
+        if max_crud_p95_ms is not None and (
+                crud_p95 > max_crud_p95_ms or not results['crud_read']['requests']):
+            raise click.ClickException(
+                f'CRUD p95 {crud_p95:.2f} ms exceeds {max_crud_p95_ms:.2f} ms')
+
+    @app.cli.command('benchmark-serialization')
+    @click.option('--session-id', default='__default__', show_default=True)
+    @click.option('--per-page', default=500, show_default=True)
+    @click.option('--repeat', default=10, show_default=True)
+    def benchmark_serialization_command(session_id, per_page, repeat):
+        """Time a large list_incidents page with and without projection and the fast JSON provider."""
+        from app.benchmark import serialization_benchmark
+        from app.serialization import orjson
+        try:
+            results = serialization_benchmark(app, session_id=session_id, per_page=per_page,
+                                              repeat=repeat)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        if results and results[0]['items'] < per_page:
+            print(f"Only {results[0]['items']} incidents in {session_id}; "
+                  f"run 'flask seed-synthetic' for a full page.")
+        print(f"fast provider: {'orjson' if orjson is not None else 'stdlib (orjson not installed)'}")
+        for r in results:
+            print(f"{r['case']:<26} {r['items']:>5} items {r['bytes']:>10} B  "
+                  f"p50 {r['p50_ms']:>8.2f} ms  max {r['max_ms']:>8.2f} ms")
+
+    @app.cli.command('benchmark-startup')
+    @click.option('--runs', default=5, show_default=True, help='Fresh interpreters to start.')
+    @click.option('--max-startup-ms', type=float, default=None,
+                  help='Fail if import plus create_app p50 exceeds this.')
+    def benchmark_startup_command(runs, max_startup_ms):
+        """Measure worker cold-start time against the old eager start-up path."""
+        from app.benchmark import startup_benchmark
+        r = startup_benchmark(runs=runs)
+        print(f"import            p50 {r['import_ms']:>8.2f} ms")
+        print(f"create_app        p50 {r['create_app_ms']:>8.2f} ms")
+        print(f"startup (now)     p50 {r['startup_ms']:>8.2f} ms")
+        print(f"first apispec     p50 {r['first_spec_ms']:>8.2f} ms  (HTTP {r['spec_status']})")
+        print(f"demo hashes           {r['demo_hashes_ms']:>8.2f} ms")
+        print(f"startup (eager)   p50 {r['eager_startup_ms']:>8.2f} ms")
+        if max_startup_ms is not None and r['startup_ms'] > max_startup_ms:
+            raise click.ClickException(
+                f"Startup p50 {r['startup_ms']:.2f} ms exceeds {max_startup_ms:.2f} ms")
+
+    @app.cli.command('benchmark-sqlite-profile')
+    @click.option('--readers', default=8, show_default=True)
+    @click.option('--writers', default=2, show_default=True)
+    @click.option('--duration', default=10, show_default=True, help='Seconds per profile.')
+    @click.option('--timeout-ms', default=5000, show_default=True,
+                  help='Lock wait before "database is locked"; lower it to surface lock errors.')
+    def benchmark_sqlite_profile_command(readers, writers, duration, timeout_ms):
+        """Compare concurrent reads and lock errors under SQLite's defaults and SQLITE_PRAGMAS."""
+        from app.benchmark import SQLITE_DEFAULT_PRAGMAS, sqlite_profile_load_test
+        profiles = (('defaults', SQLITE_DEFAULT_PRAGMAS),
+                    ('SQLITE_PRAGMAS', app.config.get('SQLITE_PRAGMAS') or {}))
+        for label, pragmas in profiles:
+            # Both profiles wait --timeout-ms for locks, so only journaling differs
+            pragmas = {name: value for name, value in pragmas.items() if name != 'busy_timeout'}
+            r = sqlite_profile_load_test(pragmas, readers=readers, writers=writers,
+                                         duration=duration, timeout_ms=timeout_ms)
+            print(f"{label:<15} reads {r['reads_per_second']:>9.1f}/s  p95 "
+                  f"{r['read_p95_ms'] or 0:>8.2f} ms  writes {r['writes_per_second']:>7.1f}/s  "
+                  f"{r['lock_errors']:>5} locked {r['errors']:>5} err")
+
+    @app.cli.command('login-load-test')
+    @click.option('--url', default='http://127.0.0.1:5000', show_default=True,
+                  help='Base URL of the running server (with LOGIN_THROTTLE_ENABLED=false).')
+    @click.option('--login-clients', default=20, show_default=True)
+    @click.option('--probe-clients', default=4, show_default=True)
+    @click.option('--duration', default=15, show_default=True, help='Seconds per phase.')
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', default='admin123', show_default=True)
+    @click.option('--max-probe-p95-ms', type=float, default=None,
+                  help='Fail if API p95 latency during the login burst exceeds this.')
+    def login_load_test_command(url, login_clients, probe_clients, duration, username,
+                                password, max_probe_p95_ms):
+        """Check that API latency holds up while a burst of logins is being verified."""
+        from app.benchmark import login_load_test
+        results = login_load_test(url, login_clients=login_clients,
+                                  probe_clients=probe_clients, duration=duration,
+                                  username=username, password=password)
+        for phase in ('baseline', 'burst'):
+            r = results[phase]
+            print(f"api {phase:<9} {r['requests']:>7} ok {r['errors']:>5} err  "
+                  f"p50 {r['p50_ms'] or 0:>9.2f} ms  p95 {r['p95_ms'] or 0:>9.2f} ms  "
+                  f"max {r['max_ms'] or 0:>9.2f} ms")
+        r = results['logins']
+        print(f"logins        {r['requests']:>7} ok {r['busy']:>5} busy {r['throttled']:>5} "
+              f"throttled {r['errors']:>5} err  {r['per_second']:.1f}/s  "
+              f"p50 {r['p50_ms'] or 0:>9.2f} ms  p95 {r['p95_ms'] or 0:>9.2f} ms")
+        burst_p95 = results['burst']['p95_ms'] or 0
+        if max_probe_p95_ms is not None and burst_p95 > max_probe_p95_ms:
+            raise click.ClickException(
+                f'API p95 {burst_p95:.2f} ms during the login burst exceeds {max_probe_p95_ms:.2f} ms')
+
+    @app.cli.command('stress-writes')
+    @click.option('--url', default='http://127.0.0.1:5000', show_default=True,
+                  help='Base URL of the running server.')
+    @click.option('--clients', default=16, show_default=True)
+    @click.option('--duration', default=30, show_default=True, help='Seconds to run.')
+    @click.option('--session-id', default='__default__', show_default=True)
+    @click.option('--max-locked-pct', type=float, default=None,
+                  help='Fail if more than this percentage of writes got "database is locked".')
+    def stress_writes_command(url, clients, duration, session_id, max_locked_pct):
+        """Run concurrent incident creates and status updates and report lock contention."""
+        from app.benchmark import stress_writes
+        results = stress_writes(url, clients=clients, duration=duration, session_id=session_id)
+        for op, r in results.items():
+            print(f"{op:<16} {r['requests']:>7} req {r['locked']:>5} locked "
+                  f"({r['locked_pct']:>5.2f}%) {r['errors']:>5} err  "
+                  f"p50 {r['p50_ms'] or 0:>9.2f} ms  p99 {r['p99_ms'] or 0:>9.2f} ms  "
+                  f"max {r['max_ms'] or 0:>9.2f} ms")
+        worst = max(r['locked_pct'] for r in results.values())
+        if max_locked_pct is not None and worst > max_locked_pct:
+            raise click.ClickException(
+                f'{worst:.2f}% of writes hit "database is locked" (limit {max_locked_pct:.2f}%)')
+
+    @app.cli.command('check-query-budgets')
+    @click.option('--session-id', default='__default__', show_default=True)
+    @click.option('--username', default='admin', show_default=True)
+    @click.option('--password', default='admin123', show_default=True)
+    def check_query_budgets_command(session_id, username, password):
+        """Run every budgeted endpoint and fail on query budget overruns or N+1 patterns.
+
+        Logs in, then makes authenticated requests to every GET endpoint and one to
+        each write endpoint, which adds a test incident, problem and job to the
+        session; run it against a test database. Everything runs twice: first with
+        the header cache disabled, since budgets must hold on a cold worker, then
+        with it as configured. Fails if a budgeted endpoint was never reached.
+        """
+        from app import query_guard
+        from app.benchmark import _login_headers, exercise_write_endpoints, get_endpoints
+        from app.header_cache import EXTENSION_KEY as HEADER_CACHE_KEY
+        if not app.config.get('QUERY_GUARD_ENABLED'):
+            raise click.ClickException('Set QUERY_GUARD_ENABLED=true (or FLASK_ENV=testing).')
+        client = app.test_client()
+        del query_guard.violations[:]
+        reached = set()
+        failed = []
+        header_cache = app.extensions.get(HEADER_CACHE_KEY)
+        try:
+            for label, cache in (('header cache disabled', None),
+                                 ('header cache enabled', header_cache)):
+                app.extensions[HEADER_CACHE_KEY] = cache
+                query_guard.last_counts.clear()
+                try:
+                    headers = _login_headers(client, username, password)
+                except ValueError as exc:
+                    raise click.ClickException(str(exc))
+                for url in get_endpoints(app, session_id):
+                    response = client.get(url, headers=headers, buffered=True)
+                    if response.status_code >= 400:
+                        failed.append(('GET', url, response.status_code))
+                failed += exercise_write_endpoints(app, client, headers, session_id)
+                reached.update(query_guard.last_counts)
+                print(f'{label}:')
+                for endpoint, count in sorted(query_guard.last_counts.items()):
+                    budget = query_guard.QUERY_BUDGETS.get(endpoint)
+                    print(f'{count:>4} queries (budget {budget})  {endpoint}')
+        finally:
+            app.extensions[HEADER_CACHE_KEY] = header_cache
+        problems = list(query_guard.violations)
+        problems += [f'{method} {url} returned {status}' for method, url, status in failed]
+        problems += [f'{endpoint} was never requested'
+                     for endpoint in sorted(set(query_guard.QUERY_BUDGETS) - reached)]
+        if problems:
+            raise click.ClickException('\n'.join(problems))
+        print('All endpoints within query budgets.')
+
+    @app.cli.command('create-demo-session')
+    def create_demo_session_command():
+        """Register a shared-database demo session and print its session_id."""
+        manager = app.extensions.get('session_provisioning')
+        if manager is None:
+            raise click.ClickException('Set DEMO_SESSION_MODE=shared to use shared-database sessions.')
+        print(manager.create_session())
+
+    @app.cli.command('reap-sessions')
+    @click.option('--batch-size', default=200, show_default=True,
+                  help='Rows deleted per transaction.')
+    @click.option('--max-sessions', type=int, default=None, help='Stop after this many sessions.')
+    @click.option('--vacuum-pages', type=int, default=None,
+                  help='Pages returned per incremental vacuum (default: all free pages).')
+    @click.option('--no-vacuum', is_flag=True, help='Skip incremental vacuum and PRAGMA optimize.')
+    @click.option('--dry-run', is_flag=True, help='Report what would be purged without deleting.')
+    @click.option('--interval', type=int, default=None,
+                  help='Keep running, reaping every INTERVAL seconds.')
+    def reap_sessions_command(batch_size, max_sessions, vacuum_pages, no_vacuum, dry_run, interval):
+        """Delete expired demo session data and stale session files, then compact the database."""
+        import time
+        from app.session_reaper import reap
+        while True:
+            summary = reap(app, batch_size=batch_size, dry_run=dry_run, vacuum=not no_vacuum,
+                           vacuum_pages=vacuum_pages, max_sessions=max_sessions)
+            verb = 'Would purge' if dry_run else 'Purged'
+            rows = sum(summary['rows'].values())
+            print(f"{verb} {summary['sessions']} expired session(s), {rows} row(s); "
+                  f"{summary['files']} session file(s), {summary['file_bytes'] / 1e6:.1f} MB")
+            if summary['db_bytes_before'] is not None:
+                reclaimed = summary['db_bytes_before'] - summary['db_bytes_after']
+                print(f"Database {summary['db_bytes_after'] / 1e6:.1f} MB "
+                      f"({reclaimed / 1e6:.1f} MB reclaimed)")
+            if not interval:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('split-tenant')
+    @click.option('--session-id', required=True, help='Tenant listed in TENANT_PARTITIONS.')
+    @click.option('--dry-run', is_flag=True, help='Count the rows that would move.')
+    def split_tenant_command(session_id, dry_run):
+        """Move a tenant's incident data from the main database to its partition.
+
+        Stop the API servers (or at least this tenant's traffic) first, and start
+        them again with the same TENANT_PARTITIONS so the tenant is read from there.
+        """
+        from app.tenancy import split_tenant
+        try:
+            counts = split_tenant(session_id, dry_run=dry_run)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        for table, count in counts.items():
+            print(f'  {table}: {count}')
+        print(f"{'Would move' if dry_run else 'Moved'} {sum(counts.values())} row(s) "
+              f'for {session_id}.')
+
+    @app.cli.command('worker')
+    @click.option('--concurrency', type=int, default=None,
+                  help='Job threads in this process (default JOB_WORKER_CONCURRENCY).')
+    @click.option('--kind', 'kinds', multiple=True, help='Only run jobs of this kind (repeatable).')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+    def worker_command(concurrency, kinds, burst):
+        """Run queued background jobs until interrupted."""
+        import signal
+        from app.jobs import run_worker
+        threads, stop_event = run_worker(app, concurrency=concurrency, kinds=kinds or None,
+                                         burst=burst)
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        print(f'Worker started with {len(threads)} thread(s).')
+        try:
+            while any(t.is_alive() for t in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+        # Let in-flight jobs finish so they are not left to wait out their lease
+        for thread in threads:
+            thread.join()
+
+    @app.cli.command('dispatch-notifications')
+    @click.option('--burst', is_flag=True, help='Exit once nothing is due.')
+    def dispatch_notifications_command(burst):
+        """Deliver queued incident notifications to their channels until interrupted."""
+        import signal
+        import threading
+        from app.outbox import run_dispatcher
+        channels = app.config.get('NOTIFICATION_CHANNELS') or {}
+        if not channels:
+            print('No NOTIFICATION_CHANNELS configured; nothing to dispatch.')
+            return
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        print(f"Dispatching to {', '.join(sorted(channels))}.")
+        try:
+            delivered = run_dispatcher(app, stop_event=stop_event, burst=burst)
+        except KeyboardInterrupt:
+            return
+        print(f'Delivered {delivered} message(s).')
+
+    @app.cli.command('webhook-dispatcher')
+    @click.option('--workers', type=int, default=None,
+                  help='Delivery threads (default WEBHOOK_WORKERS).')
+    @click.option('--burst', is_flag=True,
+                  help='Exit once no events are pending and no delivery is due.')
+    def webhook_dispatcher_command(workers, burst):
+        """Fan out incident events to webhook subscriptions until interrupted."""
+        import signal
+        import threading
+        from app.webhooks import run_webhook_dispatcher
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        try:
+            sent = run_webhook_dispatcher(app, workers=workers, stop_event=stop_event,
+                                          burst=burst)
+        except KeyboardInterrupt:
+            return
+        print(f'Delivered {sent} webhook event(s).')
+
+    @app.cli.command('notification-sink')
+    @click.option('--host', default='127.0.0.1', show_default=True)
+    @click.option('--port', default=8025, show_default=True)
+    @click.option('--fail-rate', default=0.0, show_default=True,
+                  help='Fraction of batches answered with 503 to exercise retries.')
+    @click.option('--delay-ms', default=0, show_default=True,
+                  help='Pause before answering each batch.')
+    @click.option('--secret', default=None, help='Reject webhook batches not signed with this.')
+    def notification_sink_command(host, port, fail_rate, delay_ms, secret):
+        """Run a local HTTP receiver that prints the notification and webhook batches it gets."""
+        from app.outbox import make_sink_server
+        server = make_sink_server(host, port, fail_rate=fail_rate, delay=delay_ms / 1000.0,
+                                  secret=secret)
+        print(f'Listening on http://{host}:{port}/')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+    @app.cli.command('recompute-metrics')
+    @click.option('--workers', type=int, default=None,
+                  help='Worker processes (default: CPU count; 0 runs inline).')
+    @click.option('--chunk-size', default=200, show_default=True,
+                  help='Sessions per unit of work.')
+    def recompute_metrics_command(workers, chunk_size):
+        """Recompute MTTR/MTTA/SLA for every session into the session_metrics rollup."""
+        from app.metrics_rollup import recompute
+        db.create_all()
+
+        def progress(sessions, total, incidents, elapsed):
+            print(f'  {sessions}/{total} sessions, {incidents} incidents, '
+                  f'{sessions / elapsed if elapsed else 0:,.0f} sessions/s', end='\r')
+
+        result = recompute(None, workers=workers, chunk_size=chunk_size, progress=progress)
+        elapsed = result['elapsed_seconds'] or 1e-9
+        print(f"\nRecomputed {result['sessions']} sessions ({result['incidents']} incidents) "
+              f"in {result['elapsed_seconds']:.2f}s: {result['sessions'] / elapsed:,.0f} sessions/s, "
+              f"{result['incidents'] / elapsed:,.0f} incidents/s.")
+
+    @app.cli.command('reindex-similarity')
+    def reindex_similarity_command():
+        from app.services.similarity import rebuild_index
+        count = rebuild_index()
+        db.session.commit()
+        print(f'Similarity index rebuilt for {count} incidents.')
+
+    @app.cli.command('backfill-tags')
+    def backfill_tags_command():
+        from app.services.tags import backfill_tags
+        db.create_all()
+        count = backfill_tags()
+        db.session.commit()
+        print(f'Backfilled {count} incident tags.')
+
     @app.cli.command('reset-db')
     def reset_db_command():
         db.drop_all()
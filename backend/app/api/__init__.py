@@ -5,6 +5,9 @@ def register_blueprints(app):
     from app.api.timeline import timeline_bp
     from app.api.problems import problems_bp
     from app.api.sla import sla_bp
+    from app.api.internal_metrics import internal_metrics_bp
+    from app.api.jobs import jobs_bp
+    from app.api.webhooks import webhooks_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
@@ -12,3 +15,6 @@ def register_blueprints(app):
     app.register_blueprint(timeline_bp, url_prefix='/api/timeline')
     app.register_blueprint(problems_bp, url_prefix='/api/problems')
     app.register_blueprint(sla_bp, url_prefix='/api/sla')
+    app.register_blueprint(internal_metrics_bp, url_prefix='/api/metrics')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(webhooks_bp, url_prefix='/api/webhooks')
@@ -1,22 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import check_password_hash, generate_password_hash
+from app.extensions import db
+from app.passwords import EXTENSION_KEY as PASSWORD_HASHER
+from app.services.users import get_by_id, get_by_username
 
 auth_bp = Blueprint('auth', __name__)
 
-# Demo users
+# Demo users, copied into the users table by seed/bootstrap. Hashes are precomputed
+# (werkzeug scrypt) so seeding doesn't run the deliberately slow KDF.
 DEMO_USERS = {
     'admin': {
         'id': 'user-admin-001',
         'username': 'admin',
-        'password': generate_password_hash('admin123'),
+        'password': (
+            'scrypt:32768:8:1$Xtd1CjUN3vad3jld$2a819dfecb374708026d092c085017ec953d993887ad7614'
+            'd515f7c127ec18a737114a1424a64387e7c8822d4b04fc05429b70489d83584ef8a4d0d8f44b9b53'
+        ),  # admin123
         'role': 'admin',
         'name': 'Admin User',
     },
     'responder': {
         'id': 'user-responder-001',
         'username': 'responder',
-        'password': generate_password_hash('resp123'),
+        'password': (
+            'scrypt:32768:8:1$wLaty3wZgPddO0pf$8f01c79ce3ea8bcfe450f9a252b36a0047af7397512f3f49'
+            'd951a8ac9fee735123d5e31d660b6b1bf97130252fa70ad1d6f675a38edc545d0dce64c78e0f3760'
+        ),  # resp123
         'role': 'responder',
         'name': 'Incident Responder',
     },
@@ -68,6 +77,14 @@ def login():
         description: Invalid username or password
         schema:
           $ref: '#/definitions/Error'
+      429:
+        description: Too many login attempts; retry after the Retry-After seconds
+        schema:
+          $ref: '#/definitions/Error'
+      503:
+        description: Too many logins being verified at once; retry shortly
+        schema:
+          $ref: '#/definitions/Error'
     """
     data = request.get_json()
     if not data:
@@ -76,24 +93,34 @@ def login():
     username = data.get('username', '').strip()
     password = data.get('password', '')
 
-    user = DEMO_USERS.get(username)
-    if not user or not check_password_hash(user['password'], password):
+    throttle = current_app.extensions.get('login_throttle')
+    if throttle is not None:
+        retry_after = throttle.check(request.remote_addr, username)
+        if retry_after:
+            return (jsonify({'message': 'Too many login attempts, try again later'}), 429,
+                    {'Retry-After': str(retry_after)})
+
+    hasher = current_app.extensions[PASSWORD_HASHER]
+    user = get_by_username(username)
+    if not user or not hasher.verify(user.password_hash, password):
+        if throttle is not None:
+            throttle.record_failure(username)
         return jsonify({'message': 'Invalid username or password'}), 401
+    if throttle is not None:
+        throttle.record_success(username)
+    if hasher.needs_rehash(user.password_hash):
+        user.password_hash = hasher.hash(password)
+        db.session.commit()
 
     token = create_access_token(
-        identity=user['id'],
-        additional_claims={'username': user['username'], 'role': user['role']},
+        identity=user.id,
+        additional_claims={'username': user.username, 'role': user.role},
     )
 
     return jsonify({
         'token': token,
         'access_token': token,
-        'user': {
-            'id': user['id'],
-            'username': user['username'],
-            'role': user['role'],
-            'name': user['name'],
-        },
+        'user': user.to_dict(),
     })
 
 
@@ -114,13 +141,7 @@ def me():
         schema:
           $ref: '#/definitions/Error'
     """
-    current_user_id = get_jwt_identity()
-    for user in DEMO_USERS.values():
-        if user['id'] == current_user_id:
-            return jsonify({
-                'id': user['id'],
-                'username': user['username'],
-                'role': user['role'],
-                'name': user['name'],
-            })
-    return jsonify({'message': 'User not found'}), 404
+    user = get_by_id(get_jwt_identity())
+    if user is None:
+        return jsonify({'message': 'User not found'}), 404
+    return jsonify(user.to_dict())
@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
+from sqlalchemy.orm import load_only
 from app.extensions import db
+from app.db_routing import use_replica
+from app.concurrency import heavy_endpoint, shared_response
 from app.models.incident import Incident
 from app.models.timeline_entry import TimelineEntry
 from app.models.problem import Problem
+from app.header_cache import get_headers
 from app.services.metrics import calculate_mttr, calculate_mtta, calculate_sla_compliance
+from app.services.tags import tag_counts
+from app.serialization import wants_full_view, stream_json, JSONArrayStream
+from app.tenancy import use_tenant
 from datetime import datetime, timezone
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -37,6 +44,9 @@ CATEGORY_COLORS = {
 
 
 @dashboard_bp.route('', methods=['GET'])
+@use_replica
+@shared_response('DASHBOARD_SHARE_SECONDS')
+@heavy_endpoint
 def get_dashboard():
     """Get dashboard summary with KPIs, charts, and recent activity.
     ---
@@ -49,6 +59,13 @@ def get_dashboard():
         required: false
         default: __default__
         description: Session ID for demo isolation
+      - name: view
+        in: query
+        type: string
+        required: false
+        default: summary
+        enum: [summary, full]
+        description: Representation of open_incidents (summary omits the long text columns)
     responses:
       200:
         description: Dashboard data
@@ -103,6 +120,16 @@ def get_dashboard():
                     type: integer
                   color:
                     type: string
+            top_tags:
+              type: array
+              description: Most used incident tags
+              items:
+                type: object
+                properties:
+                  name:
+                    type: string
+                  value:
+                    type: integer
             recent_activity:
               type: array
               items:
@@ -114,9 +141,10 @@ def get_dashboard():
             open_incidents:
               type: array
               items:
-                $ref: '#/definitions/Incident'
+                $ref: '#/definitions/IncidentSummary'
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
+    full = wants_full_view(request.args.get('view'))
 
     # Active incidents (non-resolved, non-closed)
     active_incidents_query = Incident.query.filter(
@@ -139,7 +167,9 @@ def get_dashboard():
     sla_pct = calculate_sla_compliance(session_id)
 
     # Incidents by severity
-    all_incidents = Incident.query.filter_by(session_id=session_id).all()
+    all_incidents = Incident.query.filter_by(session_id=session_id).options(
+        load_only(Incident.severity, Incident.status, Incident.category)
+    ).all()
 
     severity_counts = {}
     status_counts = {}
@@ -169,17 +199,21 @@ def get_dashboard():
         for name, count in category_counts.items()
     ]
 
-    # Recent activity — last 10 timeline entries with incident_number
-    recent_entries = db.session.query(TimelineEntry, Incident.incident_number).join(
-        Incident, TimelineEntry.incident_id == Incident.id
-    ).filter(
-        Incident.session_id == session_id,
-    ).order_by(TimelineEntry.created_at.desc()).limit(10).all()
+    top_tags = [
+        {'name': tag, 'value': count}
+        for tag, count in tag_counts(session_id)
+    ]
+
+    # Recent activity — last 10 timeline entries, labelled from the incident header cache
+    recent_entries = TimelineEntry.query.filter_by(session_id=session_id).order_by(
+        TimelineEntry.created_at.desc()).limit(10).all()
+    headers = get_headers(Incident, {entry.incident_id for entry in recent_entries})
 
     recent_activity = []
-    for entry, inc_number in recent_entries:
+    for entry in recent_entries:
         d = entry.to_dict()
-        d['incident_number'] = inc_number
+        header = headers.get(entry.incident_id)
+        d['incident_number'] = header.number if header else None
         recent_activity.append(d)
 
     # Trending problems — top 3 by incident_count
@@ -189,14 +223,19 @@ def get_dashboard():
     trending_problems = [p.to_dict() for p in trending]
 
     # Open incidents sorted by severity then reported_at
-    active_incidents = active_incidents_query.all()
-    active_incidents.sort(key=lambda i: (
-        SEVERITY_ORDER.get(i.severity, 99),
-        i.reported_at or '',
-    ))
-    open_incidents = [inc.to_dict() for inc in active_incidents]
-
-    return jsonify({
+    # (ordered in SQL so the list can be streamed instead of sorted in memory)
+    open_query = active_incidents_query.order_by(
+        db.case(SEVERITY_ORDER, value=Incident.severity, else_=99),
+        Incident.reported_at.asc(),
+    )
+    if not full:
+        open_query = open_query.options(Incident.summary_load_options())
+    open_incidents = JSONArrayStream(
+        open_query.yield_per(200),
+        Incident.to_dict if full else Incident.to_summary_dict,
+    )
+
+    return stream_json({
         'active_incidents': active_count,
         'resolved_today': resolved_today,
         'mttr_hours': mttr,
@@ -205,6 +244,7 @@ def get_dashboard():
         'incidents_by_severity': incidents_by_severity,
         'incidents_by_status': incidents_by_status,
         'incidents_by_category': incidents_by_category,
+        'top_tags': top_tags,
         'recent_activity': recent_activity,
         'trending_problems': trending_problems,
         'open_incidents': open_incidents,
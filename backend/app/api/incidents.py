@@ -2,13 +2,24 @@ import uuid
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
 from app.extensions import db
+from app.db_routing import use_replica
+from app.concurrency import heavy_endpoint
 from app.models.incident import Incident
 from app.models.timeline_entry import TimelineEntry
 from app.models.incident_asset import IncidentAsset
 from app.models.incident_responder import IncidentResponder
 from app.models.communication import Communication
 from app.services.incident_number import generate_incident_number
+from app.services.similarity import index_incident, text_fields_changed, similar_incidents
+from app.services.tags import sync_incident_tags, serialize_tags, filter_by_tags
+from app.services.reports import incident_report
+from app.outbox import enqueue_notifications
+from app.webhooks import record_event
 from app.errors import NotFoundError, BadRequestError
+from app.serialization import (
+    parse_fields, rows_to_dicts, wants_full_view, stream_json, JSONArrayStream,
+)
+from app.tenancy import use_tenant
 
 incidents_bp = Blueprint('incidents', __name__)
 
@@ -18,7 +29,52 @@ VALID_STATUSES = {'open', 'investigating', 'identified', 'monitoring', 'resolved
 VALID_CATEGORIES = {'outage', 'degradation', 'security', 'data_loss', 'access_issue', 'other'}
 
 
+def apply_incident_filters(query, params, session_id='__default__'):
+    """Apply the list filters (status, severity, category, assigned_to, search, tag) from a mapping."""
+    status = params.get('status')
+    if status:
+        query = query.filter(Incident.status == status)
+
+    severity = params.get('severity')
+    if severity:
+        query = query.filter(Incident.severity == severity)
+
+    category = params.get('category')
+    if category:
+        query = query.filter(Incident.category == category)
+
+    assigned_to = params.get('assigned_to')
+    if assigned_to:
+        query = query.filter(Incident.assigned_to.ilike(f'%{assigned_to}%'))
+
+    search = params.get('search')
+    if search:
+        search_term = f'%{search}%'
+        query = query.filter(
+            db.or_(
+                Incident.title.ilike(search_term),
+                Incident.description.ilike(search_term),
+                Incident.incident_number.ilike(search_term),
+            )
+        )
+
+    tags = params.getlist('tag') if hasattr(params, 'getlist') else params.get('tag')
+    if tags:
+        query = filter_by_tags(query, session_id, tags)
+
+    return query
+
+
+def _serialize_incidents(incidents, columns, full):
+    if columns:
+        return rows_to_dicts(incidents, columns)
+    if full:
+        return [i.to_dict() for i in incidents]
+    return [i.to_summary_dict() for i in incidents]
+
+
 @incidents_bp.route('', methods=['GET'])
+@use_replica
 def list_incidents():
     """List all incidents with optional filters and pagination.
     ---
@@ -66,16 +122,36 @@ def list_incidents():
         type: string
         required: false
         description: Search across title, description, incident_number
+      - name: tag
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        required: false
+        description: Only incidents carrying every given tag (repeat for several)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated Incident columns to return (id is always included)
+      - name: view
+        in: query
+        type: string
+        required: false
+        default: summary
+        enum: [summary, full]
+        description: Incident representation (summary omits the long text columns)
     responses:
       200:
-        description: Paginated list of incidents
+        description: Paginated list of incidents (IncidentSummary unless view=full)
         schema:
           type: object
           properties:
             incidents:
               type: array
               items:
-                $ref: '#/definitions/Incident'
+                $ref: '#/definitions/IncidentSummary'
             total:
               type: integer
             page:
@@ -83,39 +159,21 @@ def list_incidents():
             per_page:
               type: integer
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    query = Incident.query.filter_by(session_id=session_id)
-
-    # Filters
-    status = request.args.get('status')
-    if status:
-        query = query.filter(Incident.status == status)
-
-    severity = request.args.get('severity')
-    if severity:
-        query = query.filter(Incident.severity == severity)
-
-    category = request.args.get('category')
-    if category:
-        query = query.filter(Incident.category == category)
-
-    assigned_to = request.args.get('assigned_to')
-    if assigned_to:
-        query = query.filter(Incident.assigned_to.ilike(f'%{assigned_to}%'))
-
-    search = request.args.get('search')
-    if search:
-        search_term = f'%{search}%'
-        query = query.filter(
-            db.or_(
-                Incident.title.ilike(search_term),
-                Incident.description.ilike(search_term),
-                Incident.incident_number.ilike(search_term),
-            )
-        )
+    columns = parse_fields(Incident, request.args.get('fields'))
+    full = wants_full_view(request.args.get('view'))
+    if columns:
+        base = db.session.query(*columns)
+    elif full:
+        base = Incident.query
+    else:
+        base = Incident.query.options(Incident.summary_load_options())
+    query = apply_incident_filters(
+        base.filter(Incident.session_id == session_id), request.args, session_id
+    )
 
     # Order by severity then reported_at descending
     total = query.count()
@@ -124,7 +182,7 @@ def list_incidents():
     ).limit(per_page).all()
 
     return jsonify({
-        'incidents': [i.to_dict() for i in incidents],
+        'incidents': _serialize_incidents(incidents, columns, full),
         'total': total,
         'page': page,
         'per_page': per_page,
@@ -183,6 +241,7 @@ def create_incident():
             tags:
               type: string
               default: "[]"
+              description: JSON list or comma-separated tag names; a list of strings is also accepted
             session_id:
               type: string
               default: __default__
@@ -204,7 +263,7 @@ def create_incident():
     if not title:
         raise BadRequestError('Title is required')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     now = datetime.now(timezone.utc).isoformat()
 
     incident_number = generate_incident_number()
@@ -226,7 +285,7 @@ def create_incident():
         reported_by=data.get('reported_by'),
         assigned_to=data.get('assigned_to'),
         wiki_url=data.get('wiki_url'),
-        tags=data.get('tags', '[]'),
+        tags=serialize_tags(data.get('tags')),
         created_at=now,
         updated_at=now,
         session_id=session_id,
@@ -244,6 +303,9 @@ def create_incident():
         session_id=session_id,
     )
     db.session.add(timeline)
+    index_incident(incident)
+    sync_incident_tags(incident)
+    record_event(incident, 'incident.created')
 
     db.session.commit()
     return jsonify(incident.to_dict()), 201
@@ -297,7 +359,7 @@ def get_incident(incident_id):
         schema:
           $ref: '#/definitions/Error'
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
 
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
@@ -394,6 +456,7 @@ def update_incident(incident_id):
               type: string
             tags:
               type: string
+              description: JSON list or comma-separated tag names; a list of strings is also accepted
             session_id:
               type: string
               default: __default__
@@ -415,7 +478,7 @@ def update_incident(incident_id):
     if not data:
         raise BadRequestError('Missing request body')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
         raise NotFoundError('Incident not found')
@@ -432,11 +495,21 @@ def update_incident(incident_id):
         'preventive_actions', 'tags',
     ]
 
+    # Validated before any field is assigned
+    tags = serialize_tags(data['tags']) if 'tags' in data else None
     for field in updatable_fields:
         if field in data:
             setattr(incident, field, data[field])
+    if tags is not None:
+        incident.tags = tags
 
     incident.updated_at = now
+    if text_fields_changed(data):
+        index_incident(incident)
+    if 'tags' in data:
+        sync_incident_tags(incident)
+    record_event(incident, 'incident.updated',
+                 fields=[field for field in updatable_fields if field in data])
     db.session.commit()
 
     return jsonify(incident.to_dict())
@@ -496,7 +569,7 @@ def update_status(incident_id):
     if not new_status or new_status not in VALID_STATUSES:
         raise BadRequestError(f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
         raise NotFoundError('Incident not found')
@@ -529,6 +602,9 @@ def update_status(incident_id):
         session_id=session_id,
     )
     db.session.add(timeline)
+    enqueue_notifications(incident, 'status_changed', content, sent_by=author)
+    record_event(incident, 'incident.status_changed', old_status=old_status,
+                 new_status=new_status)
     db.session.commit()
 
     return jsonify(incident.to_dict())
@@ -585,7 +661,7 @@ def assign_incident(incident_id):
     if not assigned_to:
         raise BadRequestError('assigned_to is required')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
         raise NotFoundError('Incident not found')
@@ -610,6 +686,9 @@ def assign_incident(incident_id):
         session_id=session_id,
     )
     db.session.add(timeline)
+    enqueue_notifications(incident, 'assigned', content, sent_by=data.get('author'))
+    record_event(incident, 'incident.assigned', old_assignee=old_assignee,
+                 assigned_to=assigned_to)
     db.session.commit()
 
     return jsonify(incident.to_dict())
@@ -664,7 +743,7 @@ def resolve_incident(incident_id):
     if not data:
         raise BadRequestError('Missing request body')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
         raise NotFoundError('Incident not found')
@@ -692,12 +771,83 @@ def resolve_incident(incident_id):
         session_id=session_id,
     )
     db.session.add(timeline)
+    if 'root_cause' in data:
+        index_incident(incident)
+    enqueue_notifications(incident, 'resolved', resolution_text,
+                          sent_by=data.get('resolved_by'))
+    record_event(incident, 'incident.resolved', old_status=old_status)
     db.session.commit()
 
     return jsonify(incident.to_dict())
 
 
+@incidents_bp.route('/<incident_id>/similar', methods=['GET'])
+@heavy_endpoint
+def get_similar_incidents(incident_id):
+    """Suggest incidents similar to this one by text, shared assets and category.
+    ---
+    tags:
+      - Incidents
+    parameters:
+      - name: incident_id
+        in: path
+        type: string
+        required: true
+        description: Incident UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+      - name: view
+        in: query
+        type: string
+        required: false
+        default: summary
+        enum: [summary, full]
+        description: Incident representation (summary omits the long text columns)
+    responses:
+      200:
+        description: Ranked similar incidents
+        schema:
+          type: object
+          properties:
+            incident_id:
+              type: string
+            suggestions:
+              type: array
+              items:
+                $ref: '#/definitions/SimilarIncident'
+      404:
+        description: Incident not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    full = wants_full_view(request.args.get('view'))
+
+    incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
+    if not incident:
+        raise NotFoundError('Incident not found')
+
+    suggestions = similar_incidents(incident, limit=limit, summary=not full)
+    return jsonify({
+        'incident_id': incident.id,
+        'suggestions': [
+            {**s, 'incident': s['incident'].to_dict() if full else s['incident'].to_summary_dict()}
+            for s in suggestions
+        ],
+    })
+
+
 @incidents_bp.route('/<incident_id>/report', methods=['GET'])
+@use_replica
 def get_report(incident_id):
     """Get a full post-incident report with timeline, assets, responders, and duration.
     ---
@@ -751,39 +901,14 @@ def get_report(incident_id):
         schema:
           $ref: '#/definitions/Error'
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
     incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
     if not incident:
         raise NotFoundError('Incident not found')
 
-    timeline = [
-        e.to_dict() for e in incident.timeline_entries.order_by(TimelineEntry.created_at.asc()).all()
-    ]
-    assets = [a.to_dict() for a in incident.assets.all()]
-    responders = [r.to_dict() for r in incident.responders.all()]
-    communications = [c.to_dict() for c in incident.communications.all()]
-
-    # Calculate duration
-    duration_hours = None
-    if incident.reported_at and incident.resolved_at:
-        try:
-            from app.services.metrics import _parse_dt
-            reported = _parse_dt(incident.reported_at)
-            resolved = _parse_dt(incident.resolved_at)
-            if reported and resolved:
-                duration_hours = round((resolved - reported).total_seconds() / 3600.0, 2)
-        except Exception:
-            pass
-
-    report = {
-        'incident': incident.to_dict(),
-        'timeline': timeline,
-        'affected_assets': assets,
-        'responders': responders,
-        'communications': communications,
-        'duration_hours': duration_hours,
-        'problem': incident.problem.to_dict() if incident.problem else None,
-        'report_generated_at': datetime.now(timezone.utc).isoformat(),
-    }
-
-    return jsonify(report)
+    # The timeline is the unbounded part of a report, so it is streamed
+    timeline = JSONArrayStream(
+        incident.timeline_entries.order_by(TimelineEntry.created_at.asc()).yield_per(500),
+        TimelineEntry.to_dict,
+    )
+    return stream_json(incident_report(incident, timeline=timeline))
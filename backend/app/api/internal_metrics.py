@@ -0,0 +1,30 @@
+from flask import Blueprint, current_app
+from app.instrumentation import REGISTRY
+from app.errors import NotFoundError
+
+internal_metrics_bp = Blueprint('internal_metrics', __name__)
+
+
+@internal_metrics_bp.route('/internal', methods=['GET'])
+def get_internal_metrics():
+    """Per-route request, SQL and serialization histograms in Prometheus text format.
+    ---
+    tags:
+      - System
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Prometheus exposition text for this worker process
+        schema:
+          type: string
+      404:
+        description: Instrumentation is disabled
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    if not current_app.config.get('INSTRUMENTATION_ENABLED'):
+        raise NotFoundError('Instrumentation is disabled')
+    return current_app.response_class(
+        REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,145 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.extensions import db
+from app.models.job import Job
+from app.jobs import JOB_HANDLERS, enqueue
+from app.errors import NotFoundError, BadRequestError, ConflictError
+from app.tenancy import use_tenant
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _get_job(job_id, session_id):
+    job = Job.query.filter_by(id=job_id, session_id=session_id).first()
+    if not job:
+        raise NotFoundError('Job not found')
+    return job
+
+
+@jobs_bp.route('', methods=['POST'])
+def create_job():
+    """Queue a background job (report, export, SLA recomputation or bulk maintenance).
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - kind
+          properties:
+            kind:
+              type: string
+              enum: [incident_report, sla_compliance, export_incidents, reindex_similarity]
+            params:
+              type: object
+              description: >
+                incident_report takes incident_id; export_incidents takes the incident
+                list filters (status, severity, category, assigned_to, search, tag)
+            max_attempts:
+              type: integer
+              description: Attempts before the job is marked failed (default JOB_MAX_ATTEMPTS)
+            session_id:
+              type: string
+              default: __default__
+    responses:
+      202:
+        description: Job queued
+        schema:
+          $ref: '#/definitions/Job'
+      400:
+        description: Unknown kind or invalid params
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json()
+    if not data:
+        raise BadRequestError('Missing request body')
+
+    kind = data.get('kind')
+    if not kind:
+        raise BadRequestError('kind is required', payload={'valid_kinds': sorted(JOB_HANDLERS)})
+
+    max_attempts = data.get('max_attempts')
+    if max_attempts is not None and (not isinstance(max_attempts, int) or max_attempts < 1):
+        raise BadRequestError('max_attempts must be a positive integer')
+
+    job = enqueue(kind, data.get('params'), session_id=use_tenant(data),
+                  max_attempts=max_attempts)
+    db.session.commit()
+    return jsonify(job.to_dict()), 202
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a job's status, attempts and last error.
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: Job UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      200:
+        description: Job status
+        schema:
+          $ref: '#/definitions/Job'
+      404:
+        description: Job not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    return jsonify(_get_job(job_id, session_id).to_dict())
+
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Download the result of a finished job.
+    ---
+    tags:
+      - Jobs
+    produces:
+      - application/json
+      - text/csv
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: Job UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      200:
+        description: The job's output (JSON report or CSV export) as an attachment
+      404:
+        description: Job not found
+        schema:
+          $ref: '#/definitions/Error'
+      409:
+        description: Job has not succeeded yet
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    job = _get_job(job_id, session_id)
+    if job.status != 'succeeded' or job.result is None:
+        raise ConflictError('Job has no result yet', payload={'status': job.status})
+
+    response = current_app.response_class(job.result, mimetype=job.result_content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="{job.result_filename}"'
+    return response
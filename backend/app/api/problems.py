@@ -1,16 +1,30 @@
 import uuid
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func, insert, update
 from app.extensions import db
+from app.db_routing import use_replica
+from app.concurrency import heavy_endpoint
 from app.models.problem import Problem
 from app.models.incident import Incident
+from app.models.timeline_entry import TimelineEntry
+from app.services.similarity import problem_candidates
+from app.api.incidents import apply_incident_filters
 from app.services.incident_number import generate_problem_number
 from app.errors import NotFoundError, BadRequestError
+from app.serialization import (
+    parse_fields, rows_to_dicts, wants_full_view, stream_json, JSONArrayStream,
+)
+from app.tenancy import use_tenant
 
 problems_bp = Blueprint('problems', __name__)
 
+# Upper bound on incidents linked per batch call (keeps the IN (...) list within SQLite limits)
+MAX_BATCH_LINK = 500
+
 
 @problems_bp.route('', methods=['GET'])
+@use_replica
 def list_problems():
     """List all problems with optional filters and pagination.
     ---
@@ -44,6 +58,11 @@ def list_problems():
         type: string
         required: false
         enum: [critical, high, medium, low]
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated Problem columns to return (id is always included)
     responses:
       200:
         description: Paginated list of problems
@@ -61,11 +80,13 @@ def list_problems():
             per_page:
               type: integer
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    query = Problem.query.filter_by(session_id=session_id)
+    columns = parse_fields(Problem, request.args.get('fields'))
+    base = db.session.query(*columns) if columns else Problem.query
+    query = base.filter(Problem.session_id == session_id)
 
     fix_status = request.args.get('fix_status')
     if fix_status:
@@ -81,7 +102,7 @@ def list_problems():
     ).limit(per_page).all()
 
     return jsonify({
-        'problems': [p.to_dict() for p in problems],
+        'problems': rows_to_dicts(problems, columns) if columns else [p.to_dict() for p in problems],
         'total': total,
         'page': page,
         'per_page': per_page,
@@ -157,7 +178,7 @@ def create_problem():
     if not title:
         raise BadRequestError('Title is required')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     now = datetime.now(timezone.utc).isoformat()
     problem_number = generate_problem_number()
 
@@ -204,9 +225,16 @@ def get_problem(problem_id):
         type: string
         required: false
         default: __default__
+      - name: view
+        in: query
+        type: string
+        required: false
+        default: summary
+        enum: [summary, full]
+        description: Incident representation (summary omits the long text columns)
     responses:
       200:
-        description: Problem details with linked incidents
+        description: Problem details with linked incidents (IncidentSummary unless view=full)
         schema:
           allOf:
             - $ref: '#/definitions/Problem'
@@ -215,25 +243,32 @@ def get_problem(problem_id):
                 incidents:
                   type: array
                   items:
-                    $ref: '#/definitions/Incident'
+                    $ref: '#/definitions/IncidentSummary'
       404:
         description: Problem not found
         schema:
           $ref: '#/definitions/Error'
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
+    full = wants_full_view(request.args.get('view'))
     problem = Problem.query.filter_by(id=problem_id, session_id=session_id).first()
     if not problem:
         raise NotFoundError('Problem not found')
 
     result = problem.to_dict()
-    # Include linked incidents
-    linked_incidents = Incident.query.filter_by(
+    # Stream linked incidents; a problem can group hundreds of them
+    linked_query = Incident.query.filter_by(
         problem_id=problem_id, session_id=session_id
-    ).all()
-    result['incidents'] = [i.to_dict() for i in linked_incidents]
+    ).order_by(Incident.reported_at.desc())
+    if full:
+        result['incidents'] = JSONArrayStream(linked_query.yield_per(200), Incident.to_dict)
+    else:
+        linked_query = linked_query.options(Incident.summary_load_options())
+        result['incidents'] = JSONArrayStream(
+            linked_query.yield_per(200), Incident.to_summary_dict
+        )
 
-    return jsonify(result)
+    return stream_json(result)
 
 
 @problems_bp.route('/<problem_id>', methods=['PUT'])
@@ -311,7 +346,7 @@ def update_problem(problem_id):
     if not data:
         raise BadRequestError('Missing request body')
 
-    session_id = data.get('session_id', '__default__')
+    session_id = use_tenant(data)
     problem = Problem.query.filter_by(id=problem_id, session_id=session_id).first()
     if not problem:
         raise NotFoundError('Problem not found')
@@ -336,6 +371,71 @@ def update_problem(problem_id):
     return jsonify(problem.to_dict())
 
 
+@problems_bp.route('/<problem_id>/candidates', methods=['GET'])
+@heavy_endpoint
+def get_problem_candidates(problem_id):
+    """Suggest unlinked incidents that likely belong to this problem.
+    ---
+    tags:
+      - Problems
+    parameters:
+      - name: problem_id
+        in: path
+        type: string
+        required: true
+        description: Problem UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+      - name: view
+        in: query
+        type: string
+        required: false
+        default: summary
+        enum: [summary, full]
+        description: Incident representation (summary omits the long text columns)
+    responses:
+      200:
+        description: Ranked candidate incidents
+        schema:
+          type: object
+          properties:
+            problem_id:
+              type: string
+            candidates:
+              type: array
+              items:
+                $ref: '#/definitions/SimilarIncident'
+      404:
+        description: Problem not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    full = wants_full_view(request.args.get('view'))
+
+    problem = Problem.query.filter_by(id=problem_id, session_id=session_id).first()
+    if not problem:
+        raise NotFoundError('Problem not found')
+
+    candidates = problem_candidates(problem, limit=limit, summary=not full)
+    return jsonify({
+        'problem_id': problem.id,
+        'candidates': [
+            {**c, 'incident': c['incident'].to_dict() if full else c['incident'].to_summary_dict()}
+            for c in candidates
+        ],
+    })
+
+
 @problems_bp.route('/<problem_id>/link/<incident_id>', methods=['POST'])
 def link_incident(problem_id, incident_id):
     """Link an incident to a problem. Updates the problem's incident count.
@@ -375,7 +475,7 @@ def link_incident(problem_id, incident_id):
         schema:
           $ref: '#/definitions/Error'
     """
-    session_id = request.args.get('session_id', '__default__')
+    session_id = use_tenant(request.args)
 
     problem = Problem.query.filter_by(id=problem_id, session_id=session_id).first()
     if not problem:
@@ -394,10 +494,188 @@ def link_incident(problem_id, incident_id):
     ).count()
     problem.incident_count = linked_count
 
+    # Serialized from the loaded rows before the commit expires them, saving two reloads
+    result = {
+        'message': f'Incident {incident.incident_number} linked to problem {problem.problem_number}',
+        'problem': problem.to_dict(),
+        'incident': incident.to_dict(),
+    }
+    db.session.commit()
+
+    return jsonify(result)
+
+
+@problems_bp.route('/<problem_id>/link', methods=['POST'])
+def link_incidents(problem_id):
+    """Link many incidents to a problem in one call, by ID list or incident filter.
+    ---
+    tags:
+      - Problems
+    parameters:
+      - name: problem_id
+        in: path
+        type: string
+        required: true
+        description: Problem UUID
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            incident_ids:
+              type: array
+              items:
+                type: string
+                format: uuid
+              description: Incidents to link (takes precedence over filter)
+            filter:
+              type: object
+              description: Link every incident matching the incident list filters
+              properties:
+                status:
+                  type: string
+                  enum: [open, investigating, identified, monitoring, resolved, closed]
+                severity:
+                  type: string
+                  enum: [critical, high, medium, low]
+                category:
+                  type: string
+                  enum: [outage, degradation, security, data_loss, access_issue, other]
+                assigned_to:
+                  type: string
+                search:
+                  type: string
+                tag:
+                  type: array
+                  items:
+                    type: string
+            author:
+              type: string
+              default: System
+            session_id:
+              type: string
+              default: __default__
+    responses:
+      200:
+        description: Batch link summary
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            problem:
+              $ref: '#/definitions/Problem'
+            linked:
+              type: integer
+              description: Number of incidents newly linked
+            linked_incident_numbers:
+              type: array
+              items:
+                type: string
+            already_linked:
+              type: integer
+            not_found:
+              type: array
+              items:
+                type: string
+      400:
+        description: Missing incident_ids/filter or batch too large
+        schema:
+          $ref: '#/definitions/Error'
+      404:
+        description: Problem not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json()
+    if not data:
+        raise BadRequestError('Missing request body')
+
+    incident_ids = data.get('incident_ids')
+    filters = data.get('filter')
+    if incident_ids is None and not filters:
+        raise BadRequestError('incident_ids or filter is required')
+    if filters is not None and not isinstance(filters, dict):
+        raise BadRequestError('filter must be an object')
+    if incident_ids is not None:
+        if not isinstance(incident_ids, list) or \
+                not all(isinstance(i, str) for i in incident_ids):
+            raise BadRequestError('incident_ids must be a list of strings')
+        incident_ids = list(dict.fromkeys(incident_ids))
+        if len(incident_ids) > MAX_BATCH_LINK:
+            raise BadRequestError(f'Cannot link more than {MAX_BATCH_LINK} incidents at once')
+
+    session_id = use_tenant(data)
+    problem = Problem.query.filter_by(id=problem_id, session_id=session_id).first()
+    if not problem:
+        raise NotFoundError('Problem not found')
+
+    # Resolve targets with a single narrow SELECT instead of hydrating each incident
+    query = db.session.query(
+        Incident.id, Incident.incident_number, Incident.problem_id
+    ).filter(Incident.session_id == session_id)
+    if incident_ids is not None:
+        query = query.filter(Incident.id.in_(incident_ids))
+    else:
+        query = apply_incident_filters(query, filters, session_id)
+    rows = query.limit(MAX_BATCH_LINK + 1).all()
+    if len(rows) > MAX_BATCH_LINK:
+        raise BadRequestError(f'Filter matches more than {MAX_BATCH_LINK} incidents')
+
+    found_ids = {row.id for row in rows}
+    not_found = [i for i in incident_ids if i not in found_ids] if incident_ids is not None else []
+    to_link = [row for row in rows if row.problem_id != problem_id]
+
+    now = datetime.now(timezone.utc).isoformat()
+    if to_link:
+        link_ids = [row.id for row in to_link]
+        Incident.query.filter(
+            Incident.id.in_(link_ids),
+            Incident.session_id == session_id,
+        ).update(
+            {Incident.problem_id: problem_id, Incident.updated_at: now},
+            synchronize_session=False,
+        )
+
+        author = data.get('author', 'System')
+        db.session.execute(insert(TimelineEntry), [
+            {
+                'id': str(uuid.uuid4()),
+                'incident_id': row.id,
+                'entry_type': 'update',
+                'content': f'Linked to problem {problem.problem_number}',
+                'author': author,
+                'created_at': now,
+                'session_id': session_id,
+            }
+            for row in to_link
+        ])
+
+        problem.incident_count = Incident.query.filter_by(
+            problem_id=problem_id, session_id=session_id
+        ).count()
+        problem.updated_at = now
+
+        # The problems these incidents were moved away from lose them from their counts
+        previous_ids = {row.problem_id for row in to_link if row.problem_id}
+        if previous_ids:
+            counts = dict(db.session.query(Incident.problem_id, func.count(Incident.id)).filter(
+                Incident.problem_id.in_(previous_ids), Incident.session_id == session_id,
+            ).group_by(Incident.problem_id).all())
+            db.session.execute(update(Problem), [
+                {'id': previous_id, 'incident_count': counts.get(previous_id, 0),
+                 'updated_at': now}
+                for previous_id in previous_ids
+            ])
+
     db.session.commit()
 
     return jsonify({
-        'message': f'Incident {incident.incident_number} linked to problem {problem.problem_number}',
+        'message': f'{len(to_link)} incident(s) linked to problem {problem.problem_number}',
         'problem': problem.to_dict(),
-        'incident': incident.to_dict(),
+        'linked': len(to_link),
+        'linked_incident_numbers': [row.incident_number for row in to_link],
+        'already_linked': len(rows) - len(to_link),
+        'not_found': not_found,
     })
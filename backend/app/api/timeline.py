@@ -4,7 +4,10 @@ from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.incident import Incident
 from app.models.timeline_entry import TimelineEntry
+from app.header_cache import get_header, invalidate_header
+from app.webhooks import record_event
 from app.errors import NotFoundError, BadRequestError
+from app.tenancy import use_tenant
 
 timeline_bp = Blueprint('timeline', __name__)
 
@@ -38,11 +41,8 @@ def list_timeline(incident_id):
         schema:
           $ref: '#/definitions/Error'
     """
-    session_id = request.args.get('session_id', '__default__')
-
-    incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
-    if not incident:
-        raise NotFoundError('Incident not found')
+    session_id = use_tenant(request.args)
+    get_header(Incident, incident_id, session_id)
 
     entries = TimelineEntry.query.filter_by(
         incident_id=incident_id,
@@ -110,10 +110,8 @@ def create_timeline_entry(incident_id):
     if not data:
         raise BadRequestError('Missing request body')
 
-    session_id = data.get('session_id', '__default__')
-    incident = Incident.query.filter_by(id=incident_id, session_id=session_id).first()
-    if not incident:
-        raise NotFoundError('Incident not found')
+    session_id = use_tenant(data)
+    incident = get_header(Incident, incident_id, session_id)
 
     content = data.get('content')
     if not content:
@@ -132,10 +130,25 @@ def create_timeline_entry(incident_id):
         new_status=data.get('new_status'),
         session_id=session_id,
     )
-    db.session.add(entry)
 
-    # Update incident's updated_at
-    incident.updated_at = now
+    # Update incident's updated_at without loading it; no row means it was deleted
+    # after its header was cached
+    touched = db.session.execute(
+        db.update(Incident)
+        .where(Incident.id == incident_id, Incident.session_id == session_id)
+        .values(updated_at=now)
+    ).rowcount
+    if not touched:
+        db.session.rollback()
+        invalidate_header(Incident, incident_id)
+        raise NotFoundError('Incident not found')
+
+    db.session.add(entry)
+    record_event(incident, 'timeline.entry_added', entry_id=entry.id,
+                 entry_type=entry.entry_type)
+    db.session.flush()
+    # Serialized before the commit expires the entry, which would cost a reload
+    result = entry.to_dict()
     db.session.commit()
 
-    return jsonify(entry.to_dict()), 201
+    return jsonify(result), 201
@@ -0,0 +1,248 @@
+import json
+import secrets
+from flask import Blueprint, current_app, request, jsonify
+from app.extensions import db
+from app.models.webhook_subscription import WebhookSubscription
+from app.models.webhook_delivery import WebhookDelivery
+from app.api.incidents import VALID_SEVERITIES, VALID_CATEGORIES
+from app.webhooks import WEBHOOK_EVENTS, DestinationNotAllowed, check_destination
+from app.errors import NotFoundError, BadRequestError
+from app.tenancy import use_tenant
+
+webhooks_bp = Blueprint('webhooks', __name__)
+
+
+def _get_subscription(webhook_id, session_id):
+    subscription = WebhookSubscription.query.filter_by(id=webhook_id, session_id=session_id).first()
+    if not subscription:
+        raise NotFoundError('Webhook not found')
+    return subscription
+
+
+def _filter_list(data, field, valid):
+    values = data.get(field) or []
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise BadRequestError(f'{field} must be a list of strings')
+    invalid = sorted(set(values) - set(valid))
+    if invalid:
+        raise BadRequestError(f'Invalid {field}: {", ".join(invalid)}',
+                              payload={'valid': sorted(valid)})
+    return json.dumps(values)
+
+
+@webhooks_bp.route('', methods=['POST'])
+def create_webhook():
+    """Subscribe a URL to signed incident events.
+    ---
+    tags:
+      - Webhooks
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - url
+          properties:
+            url:
+              type: string
+              description: http(s) endpoint that receives batched event POSTs; must resolve to a public address
+            description:
+              type: string
+            events:
+              type: array
+              items:
+                type: string
+                enum: [incident.created, incident.updated, incident.status_changed, incident.assigned, incident.resolved, timeline.entry_added]
+              description: Event types to receive; empty or omitted means all
+            severities:
+              type: array
+              items:
+                type: string
+                enum: [critical, high, medium, low]
+            categories:
+              type: array
+              items:
+                type: string
+                enum: [outage, degradation, security, data_loss, access_issue, other]
+            secret:
+              type: string
+              description: HMAC signing secret; generated when omitted
+            session_id:
+              type: string
+              default: __default__
+    responses:
+      201:
+        description: Subscription created; the secret is only returned here
+        schema:
+          $ref: '#/definitions/WebhookSubscription'
+      400:
+        description: Validation error, or a url on a loopback, private or reserved address
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json()
+    if not data:
+        raise BadRequestError('Missing request body')
+
+    url = data.get('url')
+    if not url or not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+        raise BadRequestError('url must be an http or https URL')
+    try:
+        check_destination(url, current_app.config.get('WEBHOOK_ALLOW_PRIVATE_DESTINATIONS', False))
+    except DestinationNotAllowed as exc:
+        raise BadRequestError(f'url is not allowed: {exc}')
+
+    subscription = WebhookSubscription(
+        url=url,
+        description=data.get('description'),
+        events=_filter_list(data, 'events', WEBHOOK_EVENTS),
+        severities=_filter_list(data, 'severities', VALID_SEVERITIES),
+        categories=_filter_list(data, 'categories', VALID_CATEGORIES),
+        secret=data.get('secret') or secrets.token_hex(32),
+        session_id=use_tenant(data),
+    )
+    db.session.add(subscription)
+    db.session.commit()
+    return jsonify(subscription.to_dict(include_secret=True)), 201
+
+
+@webhooks_bp.route('', methods=['GET'])
+def list_webhooks():
+    """List webhook subscriptions.
+    ---
+    tags:
+      - Webhooks
+    parameters:
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      200:
+        description: Subscriptions, without their secrets
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/WebhookSubscription'
+    """
+    session_id = use_tenant(request.args)
+    subscriptions = WebhookSubscription.query.filter_by(session_id=session_id).order_by(
+        WebhookSubscription.created_at).all()
+    return jsonify([s.to_dict() for s in subscriptions])
+
+
+@webhooks_bp.route('/<webhook_id>', methods=['GET'])
+def get_webhook(webhook_id):
+    """Get a webhook subscription and its delivery health.
+    ---
+    tags:
+      - Webhooks
+    parameters:
+      - name: webhook_id
+        in: path
+        type: string
+        required: true
+        description: Subscription UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      200:
+        description: Subscription
+        schema:
+          $ref: '#/definitions/WebhookSubscription'
+      404:
+        description: Webhook not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    return jsonify(_get_subscription(webhook_id, session_id).to_dict())
+
+
+@webhooks_bp.route('/<webhook_id>', methods=['DELETE'])
+def delete_webhook(webhook_id):
+    """Delete a webhook subscription and its undelivered events.
+    ---
+    tags:
+      - Webhooks
+    parameters:
+      - name: webhook_id
+        in: path
+        type: string
+        required: true
+        description: Subscription UUID
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      204:
+        description: Subscription deleted
+      404:
+        description: Webhook not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    subscription = _get_subscription(webhook_id, session_id)
+    WebhookDelivery.query.filter_by(subscription_id=subscription.id).delete(
+        synchronize_session=False)
+    db.session.delete(subscription)
+    db.session.commit()
+    return '', 204
+
+
+@webhooks_bp.route('/<webhook_id>/deliveries', methods=['GET'])
+def list_deliveries(webhook_id):
+    """Recent deliveries to a subscription, newest first.
+    ---
+    tags:
+      - Webhooks
+    parameters:
+      - name: webhook_id
+        in: path
+        type: string
+        required: true
+        description: Subscription UUID
+      - name: status
+        in: query
+        type: string
+        required: false
+        enum: [pending, sending, delivered, failed, cancelled]
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+      - name: session_id
+        in: query
+        type: string
+        required: false
+        default: __default__
+    responses:
+      200:
+        description: Deliveries
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/WebhookDelivery'
+      404:
+        description: Webhook not found
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    session_id = use_tenant(request.args)
+    subscription = _get_subscription(webhook_id, session_id)
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    query = WebhookDelivery.query.filter_by(subscription_id=subscription.id)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    deliveries = query.order_by(WebhookDelivery.created_at.desc()).limit(limit).all()
+    return jsonify([d.to_dict() for d in deliveries])
@@ -0,0 +1,79 @@
+"""Per-worker cache of verified JWT claims.
+
+Every ``@jwt_required`` request otherwise re-parses the token and recomputes
+its HMAC. ``CachingJWTManager`` keeps the claims of tokens it has already
+verified in a bounded LRU keyed by the token's SHA-256, so the token text
+itself is never held in memory. An entry is dropped once the token's ``exp``
+(set from ``JWT_ACCESS_TOKEN_EXPIRES``) passes, after which the full decode runs
+again and rejects it as expired. ``JWT_CLAIMS_CACHE_SIZE = 0`` disables the cache.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_jwt_extended import JWTManager
+
+EXTENSION_KEY = 'jwt_claims_cache'
+
+
+class ClaimsCache:
+    """A thread-safe LRU of ``key -> (claims, expires_at)``."""
+
+    def __init__(self, maxsize=10000, max_ttl=3600):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, claims, exp=None):
+        expires_at = time.time() + self.max_ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachingJWTManager(JWTManager):
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor=add_context_processor)
+        size = app.config.get('JWT_CLAIMS_CACHE_SIZE', 10000)
+        expires = app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+        max_ttl = expires.total_seconds() if hasattr(expires, 'total_seconds') else expires
+        app.extensions[EXTENSION_KEY] = ClaimsCache(size, max_ttl or 3600) if size else None
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        cache = current_app.extensions.get(EXTENSION_KEY)
+        # CSRF checks and expired-token decodes depend on more than the token itself
+        if cache is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode('utf-8')).digest()
+        claims = cache.get(key)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+            cache.put(key, claims, claims.get('exp'))
+        return dict(claims)
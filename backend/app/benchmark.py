@@ -0,0 +1,657 @@
+"""Latency baselines for every GET endpoint, run in-process through the test client,
+plus a concurrent read load test and a write-path stress test against a running server."""
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+from flask import g
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.problem import Problem
+
+
+def _sample_ids(session_id):
+    incident = db.session.query(Incident.id).filter(
+        Incident.session_id == session_id
+    ).order_by(Incident.reported_at.desc()).first()
+    problem = db.session.query(Problem.id).filter(
+        Problem.session_id == session_id
+    ).order_by(Problem.incident_count.desc()).first()
+    return (incident[0] if incident else None), (problem[0] if problem else None)
+
+
+def get_endpoints(app, session_id):
+    """Concrete GET URLs for every /api/ route, with path params filled from the data."""
+    with app.app_context():
+        incident_id, problem_id = _sample_ids(session_id)
+    values = {'incident_id': incident_id, 'problem_id': problem_id}
+
+    urls = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api/'):
+            continue
+        if any(values.get(arg) is None for arg in rule.arguments):
+            continue
+        path = rule.rule
+        for arg in rule.arguments:
+            path = path.replace(f'<{arg}>', values[arg])
+        separator = '&' if '?' in path else '?'
+        urls.append(f'{path}{separator}session_id={session_id}')
+    return urls
+
+
+def _login_headers(client, username, password):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password},
+                           buffered=True)
+    if response.status_code != 200:
+        raise ValueError(f'Login as {username} failed with {response.status_code}')
+    return {'Authorization': f'Bearer {response.get_json()["token"]}'}
+
+
+def exercise_write_endpoints(app, client, headers, session_id='__default__'):
+    """Make one successful request to each write endpoint (plus the job and webhook
+    detail views, which need an id), creating an incident, a problem, a job and a
+    webhook subscription in ``session_id``; the subscription is deleted again.
+
+    Returns ``(method, url, status)`` for every request that did not succeed.
+    """
+    from app.jobs import claim_next, run_job
+
+    failed = []
+    scoped = {'session_id': session_id}
+
+    def call(method, url, body=None):
+        response = getattr(client, method)(url, json=body, query_string=scoped,
+                                           headers=headers, buffered=True)
+        if response.status_code >= 400:
+            failed.append((method.upper(), url, response.status_code))
+            return {}
+        return response.get_json(silent=True) or {}
+
+    incident_id = call('post', '/api/incidents', {
+        'title': 'Query budget check', 'description': 'Created by flask check-query-budgets',
+        'severity': 'low', 'category': 'other', **scoped,
+    }).get('id')
+    problem_id = call('post', '/api/problems', {
+        'title': 'Query budget check', 'description': 'Created by flask check-query-budgets',
+        **scoped,
+    }).get('id')
+    if incident_id:
+        call('put', f'/api/incidents/{incident_id}', {'impact_description': 'None', **scoped})
+        call('put', f'/api/incidents/{incident_id}/status', {'status': 'investigating', **scoped})
+        call('put', f'/api/incidents/{incident_id}/assign', {'assigned_to': 'Budget', **scoped})
+        call('post', f'/api/timeline/{incident_id}', {'content': 'Budget check', **scoped})
+        call('put', f'/api/incidents/{incident_id}/resolve',
+             {'resolution_summary': 'Budget check', **scoped})
+    if problem_id:
+        call('put', f'/api/problems/{problem_id}', {'workaround': 'None', **scoped})
+    if incident_id and problem_id:
+        call('post', f'/api/problems/{problem_id}/link/{incident_id}')
+        call('post', f'/api/problems/{problem_id}/link', {'incident_ids': [incident_id], **scoped})
+
+    job_id = call('post', '/api/jobs', {'kind': 'sla_compliance', **scoped}).get('id')
+    if job_id:
+        with app.app_context():
+            job = claim_next('query-budget-check', kinds=['sla_compliance'])
+            if job is not None:
+                run_job(job)
+        call('get', f'/api/jobs/{job_id}')
+        call('get', f'/api/jobs/{job_id}/result')
+
+    # A public address: private ones are refused unless WEBHOOK_ALLOW_PRIVATE_DESTINATIONS
+    webhook_id = call('post', '/api/webhooks', {
+        'url': 'https://93.184.216.34/query-budget-check', 'events': ['incident.resolved'],
+        **scoped,
+    }).get('id')
+    if webhook_id:
+        call('get', f'/api/webhooks/{webhook_id}')
+        call('get', f'/api/webhooks/{webhook_id}/deliveries')
+        call('delete', f'/api/webhooks/{webhook_id}')
+    return failed
+
+
+def run(app, session_id='__default__', repeat=5, username='admin', password='admin123'):
+    """Time each GET endpoint ``repeat`` times as ``username``; returns one result dict per URL.
+
+    ``queries`` is the SQL statement count of the last call (None when
+    ``INSTRUMENTATION_ENABLED`` is off). Dashboard sharing is switched off so
+    every call renders.
+    """
+    client = app.test_client()
+    headers = _login_headers(client, username, password)
+    counted = app.config.get('INSTRUMENTATION_ENABLED', True)
+    share_seconds = app.config.get('DASHBOARD_SHARE_SECONDS')
+    app.config['DASHBOARD_SHARE_SECONDS'] = 0
+    results = []
+    try:
+        for url in get_endpoints(app, session_id):
+            timings = []
+            status = None
+            size = 0
+            queries = None
+            for _ in range(repeat):
+                # The request reuses this app context, so its g (and the query count a
+                # streamed body adds while it is read) is still here after close
+                with app.app_context():
+                    started = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    size = len(response.get_data())
+                    # Frees the request's heavy-endpoint slot, as the WSGI server would
+                    response.close()
+                    timings.append((time.perf_counter() - started) * 1000.0)
+                    status = response.status_code
+                    stats = g.get('db_stats')
+                    queries = stats['queries'] if stats is not None else 0
+            timings.sort()
+            results.append({
+                'url': url,
+                'status': status,
+                'bytes': size,
+                'queries': queries if counted else None,
+                'p50_ms': round(statistics.median(timings), 2),
+                'max_ms': round(timings[-1], 2),
+            })
+    finally:
+        app.config['DASHBOARD_SHARE_SECONDS'] = share_seconds
+    return results
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+def _summarize(timings, errors):
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'p50_ms': _percentile(timings, 50),
+        'p95_ms': _percentile(timings, 95),
+        'max_ms': round(timings[-1], 2) if timings else None,
+    }
+
+
+def _http_call(base_url, method, path, body=None, timeout=60, read_delay=None):
+    """Make one request on a fresh connection; returns ``(status, body, elapsed_ms)``.
+
+    ``status`` is None if the connection failed. With ``read_delay`` the body is
+    read 4 KB at a time with a pause between reads (a slow client) and discarded.
+    """
+    target = urlsplit(base_url)
+    connection_class = (http.client.HTTPSConnection if target.scheme == 'https'
+                        else http.client.HTTPConnection)
+    started = time.perf_counter()
+    status = data = None
+    conn = connection_class(target.hostname, target.port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers=headers)
+        response = conn.getresponse()
+        if read_delay is None:
+            data = response.read()
+        else:
+            while response.read(4096):
+                time.sleep(read_delay)
+        status = response.status
+    except (OSError, http.client.HTTPException):
+        pass
+    finally:
+        conn.close()
+    return status, data, (time.perf_counter() - started) * 1000.0
+
+
+def load_test(app, base_url, dashboard_clients=500, stream_clients=5, duration=30,
+              think_ms=1000, stream_read_delay_ms=100, session_id='__default__', timeout=60):
+    """Drive a running server with concurrent dashboard pollers, slow streaming readers
+    and one CRUD client, and report latency per class.
+
+    Dashboard clients poll ``/api/dashboard`` every ``think_ms``. Streaming clients
+    download incident reports while reading 4 KB every ``stream_read_delay_ms``, so
+    each holds its connection open the way a slow consumer does. The CRUD client
+    alternates incident reads and timeline writes back to back; its latency shows
+    whether short requests are being starved.
+    """
+    with app.app_context():
+        incident_id, _ = _sample_ids(session_id)
+    if incident_id is None:
+        raise ValueError(f'No incidents in session {session_id!r}; seed the database first.')
+
+    deadline = time.monotonic() + duration
+    stop = threading.Event()
+    results = {name: {'timings': [], 'errors': 0}
+               for name in ('dashboard', 'stream', 'crud_read', 'crud_write')}
+    lock = threading.Lock()
+
+    def request(kind, method, path, body=None, read_delay=None):
+        status, _, elapsed = _http_call(base_url, method, path, body, timeout, read_delay)
+        ok = status is not None and status < 500
+        with lock:
+            if ok:
+                results[kind]['timings'].append(elapsed)
+            else:
+                results[kind]['errors'] += 1
+
+    def dashboard_client(offset):
+        # Stagger the first poll so clients don't arrive in lockstep
+        if stop.wait(think_ms / 1000.0 * offset):
+            return
+        while time.monotonic() < deadline and not stop.is_set():
+            request('dashboard', 'GET', f'/api/dashboard?session_id={session_id}')
+            stop.wait(think_ms / 1000.0)
+
+    def stream_client():
+        while time.monotonic() < deadline and not stop.is_set():
+            request('stream', 'GET', f'/api/incidents/{incident_id}/report?session_id={session_id}',
+                    read_delay=stream_read_delay_ms / 1000.0)
+
+    def crud_client():
+        while time.monotonic() < deadline and not stop.is_set():
+            request('crud_read', 'GET', f'/api/incidents/{incident_id}?session_id={session_id}')
+            request('crud_write', 'POST', f'/api/timeline/{incident_id}', body={
+                'content': 'load test note', 'entry_type': 'update', 'session_id': session_id,
+            })
+
+    threads = [threading.Thread(target=dashboard_client, args=(n / max(dashboard_clients, 1),),
+                                daemon=True) for n in range(dashboard_clients)]
+    threads += [threading.Thread(target=stream_client, daemon=True) for _ in range(stream_clients)]
+    threads.append(threading.Thread(target=crud_client, daemon=True))
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()) + timeout)
+    finally:
+        stop.set()
+
+    return {kind: _summarize(r['timings'], r['errors']) for kind, r in results.items()}
+
+
+WRITE_STATUSES = ['investigating', 'identified', 'monitoring', 'investigating']
+
+
+def stress_writes(base_url, clients=16, duration=30, session_id='__default__', timeout=60):
+    """Hammer the write path of a running server from ``clients`` concurrent threads.
+
+    Each client creates an incident, then moves it through status updates before
+    creating the next, so creates (incident counter + insert + index) and status
+    updates (update + timeline insert) contend for the write lock across every
+    gunicorn worker. 503 responses are the API's answer to ``database is locked``.
+    Returns per-operation counts, p50/p99 latency and lock/error rates.
+    """
+    deadline = time.monotonic() + duration
+    ops = ('create_incident', 'update_status')
+    results = {op: {'timings': [], 'locked': 0, 'errors': 0} for op in ops}
+    lock = threading.Lock()
+
+    def record(op, status, elapsed):
+        with lock:
+            if status == 503:
+                results[op]['locked'] += 1
+            elif status is None or status >= 400:
+                results[op]['errors'] += 1
+            else:
+                results[op]['timings'].append(elapsed)
+
+    def client(n):
+        while time.monotonic() < deadline:
+            status, data, elapsed = _http_call(base_url, 'POST', '/api/incidents', {
+                'title': f'Write stress {n}', 'severity': 'low', 'category': 'other',
+                'description': 'Generated by flask stress-writes', 'session_id': session_id,
+            }, timeout)
+            record('create_incident', status, elapsed)
+            if status != 201:
+                continue
+            incident_id = json.loads(data)['id']
+            for new_status in WRITE_STATUSES:
+                if time.monotonic() >= deadline:
+                    break
+                status, _, elapsed = _http_call(
+                    base_url, 'PUT', f'/api/incidents/{incident_id}/status',
+                    {'status': new_status, 'session_id': session_id}, timeout)
+                record('update_status', status, elapsed)
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + timeout)
+
+    summary = {}
+    for op, r in results.items():
+        attempts = len(r['timings']) + r['locked'] + r['errors']
+        timings = sorted(r['timings'])
+        summary[op] = {
+            'requests': attempts,
+            'ok': len(timings),
+            'p50_ms': _percentile(timings, 50),
+            'p99_ms': _percentile(timings, 99),
+            'max_ms': round(timings[-1], 2) if timings else None,
+            'locked': r['locked'],
+            'errors': r['errors'],
+            'locked_pct': round(100.0 * r['locked'] / attempts, 2) if attempts else 0.0,
+        }
+    return summary
+
+
+SERIALIZATION_CASES = (
+    # label, query parameters, encode with the stdlib provider
+    ('full rows, stdlib json', {'view': 'full'}, True),
+    ('full rows, fast provider', {'view': 'full'}, False),
+    ('summary view', {}, False),
+    ('fields projection', {'fields': 'incident_number,title,status,severity,reported_at'}, False),
+)
+
+
+def serialization_benchmark(app, session_id='__default__', per_page=500, repeat=10,
+                            username='admin', password='admin123'):
+    """Time one ``per_page`` page of ``GET /api/incidents`` per SERIALIZATION_CASES entry.
+
+    The first case is the path every list took before projection and the fast
+    JSON provider: fully hydrated rows encoded by Flask's stdlib provider.
+    """
+    from flask.json.provider import DefaultJSONProvider
+
+    client = app.test_client()
+    headers = _login_headers(client, username, password)
+    provider = app.json
+    results = []
+    try:
+        for label, params, stdlib in SERIALIZATION_CASES:
+            app.json = DefaultJSONProvider(app) if stdlib else provider
+            query = {'session_id': session_id, 'per_page': per_page, **params}
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.get('/api/incidents', query_string=query, headers=headers,
+                                      buffered=True)
+                timings.append((time.perf_counter() - started) * 1000.0)
+            if response.status_code != 200:
+                raise ValueError(f'GET /api/incidents ({label}) returned {response.status_code}')
+            results.append({
+                'case': label,
+                'items': len(response.get_json()['incidents']),
+                'bytes': len(response.get_data()),
+                'p50_ms': _percentile(sorted(timings), 50),
+                'max_ms': round(max(timings), 2),
+            })
+    finally:
+        app.json = provider
+    return results
+
+
+_STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get('/apispec.json', buffered=True).status_code
+print(json.dumps({'import_ms': (imported - started) * 1000.0,
+                  'create_app_ms': (created - imported) * 1000.0,
+                  'first_spec_ms': (time.perf_counter() - created) * 1000.0,
+                  'spec_status': status}))
+"""
+
+
+def startup_benchmark(runs=5):
+    """Cold-start cost of a worker, each run in a fresh interpreter.
+
+    ``startup_ms`` is what a worker now pays before it can serve (import plus
+    ``create_app``). ``eager_startup_ms`` adds back the work that used to happen
+    up front: building the OpenAPI spec (now deferred to the first
+    ``/apispec.json``) and hashing the two demo passwords at import.
+    """
+    import os
+    import subprocess
+    import sys
+    from flask import current_app
+    from werkzeug.security import generate_password_hash
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], cwd=backend_dir,
+                                   capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    method = current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+    started = time.perf_counter()
+    for password in ('admin123', 'resp123'):
+        generate_password_hash(password, method=method)
+    hash_ms = (time.perf_counter() - started) * 1000.0
+
+    def p50(key):
+        return _percentile(sorted(sample[key] for sample in samples), 50)
+
+    startup = _percentile(sorted(s['import_ms'] + s['create_app_ms'] for s in samples), 50)
+    return {
+        'runs': runs,
+        'import_ms': p50('import_ms'),
+        'create_app_ms': p50('create_app_ms'),
+        'startup_ms': startup,
+        'first_spec_ms': p50('first_spec_ms'),
+        'spec_status': samples[-1]['spec_status'],
+        'demo_hashes_ms': round(hash_ms, 2),
+        'eager_startup_ms': round(startup + p50('first_spec_ms') + hash_ms, 2),
+    }
+
+
+# SQLite's own defaults, the "before" side of benchmark-sqlite-profile
+SQLITE_DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def sqlite_profile_load_test(pragmas, readers=8, writers=2, duration=10, rows=5000,
+                             timeout_ms=5000):
+    """Concurrent read throughput and lock errors on a scratch SQLite file opened
+    with ``pragmas``.
+
+    ``readers`` threads page through an incidents-sized table while ``writers``
+    threads insert and update rows in short transactions, each on its own pooled
+    connection, as gunicorn workers would. Returns read/write counts, read p95
+    and the number of ``database is locked`` errors.
+    """
+    import os
+    import shutil
+    import tempfile
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.exc import OperationalError
+    from app.config import engine_options
+
+    directory = tempfile.mkdtemp(prefix='itl-sqlite-profile-')
+    url = f'sqlite:///{os.path.join(directory, "profile.db")}'
+    options = engine_options(url)
+    options['connect_args'] = {'timeout': timeout_ms / 1000.0}
+    engine = create_engine(url, **options)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY, status TEXT, '
+                          'updated_at REAL, body TEXT)'))
+        conn.execute(text('CREATE INDEX ix_items_updated ON items (updated_at)'))
+        conn.execute(text('INSERT INTO items (status, updated_at, body) VALUES (:s, :t, :b)'),
+                     [{'s': 'open', 't': time.time(), 'b': 'x' * 2000} for _ in range(rows)])
+
+    deadline = time.monotonic() + duration
+    lock = threading.Lock()
+    results = {'read_timings': [], 'writes': 0, 'lock_errors': 0, 'errors': 0}
+
+    def count_error(exc):
+        with lock:
+            results['lock_errors' if 'database is locked' in str(exc) else 'errors'] += 1
+
+    def reader(n):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT id, status, body FROM items ORDER BY updated_at '
+                                      'DESC LIMIT 50 OFFSET :o'), {'o': (n * 50) % rows}).all()
+                    conn.execute(text('SELECT status, count(*) FROM items GROUP BY status')).all()
+            except OperationalError as exc:
+                count_error(exc)
+                continue
+            with lock:
+                results['read_timings'].append((time.perf_counter() - started) * 1000.0)
+
+    def writer(n):
+        while time.monotonic() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text('INSERT INTO items (status, updated_at, body) '
+                                      'VALUES (:s, :t, :b)'),
+                                 {'s': 'investigating', 't': time.time(), 'b': 'y' * 2000})
+                    conn.execute(text('UPDATE items SET updated_at = :t WHERE id = :id'),
+                                 {'t': time.time(), 'id': (n * 7919 + results['writes']) % rows + 1})
+            except OperationalError as exc:
+                count_error(exc)
+                continue
+            with lock:
+                results['writes'] += 1
+
+    threads = [threading.Thread(target=reader, args=(n,), daemon=True) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,), daemon=True) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + timeout_ms / 1000.0 + 30)
+    engine.dispose()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    timings = sorted(results['read_timings'])
+    return {
+        'reads': len(timings),
+        'reads_per_second': round(len(timings) / duration, 1),
+        'read_p95_ms': _percentile(timings, 95),
+        'writes': results['writes'],
+        'writes_per_second': round(results['writes'] / duration, 1),
+        'lock_errors': results['lock_errors'],
+        'errors': results['errors'],
+    }
+
+
+def auth_overhead(app, iterations=2000, username='admin', password='admin123'):
+    """In-process cost of authenticating a request, with and without the claims cache.
+
+    ``verify_us`` times ``verify_jwt_in_request`` alone; ``me_p50_ms`` is a full
+    ``GET /api/auth/me`` next to the unauthenticated ``/api/health`` baseline.
+    ``login_p50_ms`` shows what the password KDF costs per login for comparison.
+    """
+    from flask_jwt_extended import verify_jwt_in_request
+    from app.auth_cache import EXTENSION_KEY
+
+    client = app.test_client()
+    login_timings = []
+    token = None
+    for _ in range(5):
+        started = time.perf_counter()
+        response = client.post('/api/auth/login',
+                               json={'username': username, 'password': password})
+        login_timings.append((time.perf_counter() - started) * 1000.0)
+        if response.status_code != 200:
+            raise ValueError(f'Login as {username} failed with {response.status_code}')
+        token = response.get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def time_requests(url, request_headers):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            client.get(url, headers=request_headers).close()
+            timings.append((time.perf_counter() - started) * 1000.0)
+        return _percentile(sorted(timings), 50)
+
+    cache = app.extensions.get(EXTENSION_KEY)
+    results = {'login_p50_ms': _percentile(sorted(login_timings), 50),
+               'health_p50_ms': time_requests('/api/health', {})}
+    try:
+        for label, enabled in (('uncached', False), ('cached', True)):
+            if enabled and cache is None:
+                continue
+            app.extensions[EXTENSION_KEY] = cache if enabled else None
+            with app.test_request_context('/api/auth/me', headers=headers):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    verify_jwt_in_request()
+                elapsed = time.perf_counter() - started
+            results[label] = {
+                'verify_us': round(elapsed / iterations * 1e6, 2),
+                'me_p50_ms': time_requests('/api/auth/me', headers),
+            }
+    finally:
+        app.extensions[EXTENSION_KEY] = cache
+    return results
+
+
+def login_load_test(base_url, login_clients=20, probe_clients=4, duration=15,
+                    username='admin', password='admin123', probe_path='/api/incidents',
+                    timeout=60):
+    """Measure API latency on its own and then during a burst of concurrent logins.
+
+    ``probe_clients`` poll ``probe_path`` throughout both phases; in the second
+    phase ``login_clients`` log in back to back. Run the server with
+    ``LOGIN_THROTTLE_ENABLED=false``, since every login here comes from one address.
+    Returns ``{'baseline': probes, 'burst': probes, 'logins': {...}}``.
+    """
+    lock = threading.Lock()
+
+    def run_phase(logins):
+        deadline = time.monotonic() + duration
+        probe = {'timings': [], 'errors': 0}
+        login = {'timings': [], 'errors': 0, 'busy': 0, 'throttled': 0}
+
+        def probe_client():
+            while time.monotonic() < deadline:
+                status, _, elapsed = _http_call(base_url, 'GET', probe_path, timeout=timeout)
+                with lock:
+                    if status == 200:
+                        probe['timings'].append(elapsed)
+                    else:
+                        probe['errors'] += 1
+
+        def login_client():
+            while time.monotonic() < deadline:
+                status, _, elapsed = _http_call(base_url, 'POST', '/api/auth/login', {
+                    'username': username, 'password': password,
+                }, timeout)
+                with lock:
+                    if status == 200:
+                        login['timings'].append(elapsed)
+                    elif status == 503:
+                        login['busy'] += 1
+                    elif status == 429:
+                        login['throttled'] += 1
+                    else:
+                        login['errors'] += 1
+
+        threads = [threading.Thread(target=probe_client, daemon=True)
+                   for _ in range(probe_clients)]
+        threads += [threading.Thread(target=login_client, daemon=True) for _ in range(logins)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(duration + timeout)
+        return probe, login
+
+    baseline, _ = run_phase(0)
+    burst, logins = run_phase(login_clients)
+    login_summary = _summarize(logins['timings'], logins['errors'])
+    login_summary.update(busy=logins['busy'], throttled=logins['throttled'],
+                         per_second=round(len(logins['timings']) / duration, 1))
+    return {
+        'baseline': _summarize(baseline['timings'], baseline['errors']),
+        'burst': _summarize(burst['timings'], burst['errors']),
+        'logins': login_summary,
+    }
@@ -0,0 +1,134 @@
+"""Per-worker admission control and response sharing for expensive read endpoints.
+
+Views decorated with ``@heavy_endpoint`` (dashboard aggregates, reports, SLA
+compliance, similarity ranking) share ``HEAVY_REQUEST_CONCURRENCY`` slots per
+worker. Under gevent or gthread workers the remaining greenlets or threads keep
+serving short CRUD requests while extra heavy requests wait for a slot; once the wait exceeds
+``HEAVY_REQUEST_QUEUE_TIMEOUT`` they get a 503 instead of piling up. With sync
+workers a request already has the worker to itself, so the slot is always free.
+
+``@shared_response`` lets concurrent pollers of the same URL share one rendered
+body for a few seconds: the first request renders it while identical requests
+wait, then they are all served from memory. Any successful write for a
+session drops that session's entries in the worker that handled it; other
+workers catch up within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from app.db_routing import MUTATING_METHODS, request_session_id
+from app.errors import ServiceUnavailableError
+
+EXTENSION_KEY = 'heavy_request_slots'
+MAX_SHARED_RESPONSES = 1000
+
+# (session_id, full path) -> (expires_at, body, status, mimetype), oldest first  (per worker)
+_shared = OrderedDict()
+_shared_locks = {}
+_shared_guard = threading.Lock()
+
+
+def _release_once(slots):
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            slots.release()
+    return release
+
+
+def heavy_endpoint(view):
+    """Run ``view`` only while holding one of the worker's heavy-request slots.
+
+    The slot is held until the response is closed, so queries and encoding done
+    while a ``stream_json`` body is written still count against the limit.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        slots = current_app.extensions.get(EXTENSION_KEY)
+        if slots is None:
+            return view(*args, **kwargs)
+        timeout = current_app.config.get('HEAVY_REQUEST_QUEUE_TIMEOUT', 10)
+        if not slots.acquire(timeout=timeout):
+            raise ServiceUnavailableError('Server busy, please retry shortly')
+        release = _release_once(slots)
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        response.call_on_close(release)
+        return response
+    return wrapper
+
+
+def _key_lock(key):
+    with _shared_guard:
+        lock = _shared_locks.get(key)
+        if lock is None:
+            lock = _shared_locks[key] = threading.Lock()
+        return lock
+
+
+def _store_shared(key, entry):
+    with _shared_guard:
+        _shared.pop(key, None)
+        while len(_shared) >= MAX_SHARED_RESPONSES:
+            _shared.popitem(last=False)
+        if len(_shared_locks) > 2 * MAX_SHARED_RESPONSES:
+            # Locks of evicted entries and of renders that never stored one; a held
+            # lock belongs to a render in progress and has to stay shared
+            for stale in [k for k, lock in _shared_locks.items()
+                          if k not in _shared and not lock.locked()]:
+                del _shared_locks[stale]
+        _shared[key] = entry
+
+
+def shared_response(ttl_config_key):
+    """Serve identical GETs from one rendering for ``app.config[ttl_config_key]`` seconds."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            ttl = current_app.config.get(ttl_config_key) or 0
+            if ttl <= 0:
+                return view(*args, **kwargs)
+
+            key = (request_session_id(), request.full_path)
+            entry = _shared.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                with _key_lock(key):
+                    entry = _shared.get(key)
+                    if entry is None or entry[0] <= time.monotonic():
+                        response = current_app.make_response(view(*args, **kwargs))
+                        if response.status_code != 200:
+                            return response
+                        # Buffers streamed bodies (shared pollers only ever need them
+                        # whole), then closes the rendering to free its heavy slot
+                        try:
+                            entry = (time.monotonic() + ttl, response.get_data(), 200,
+                                     response.mimetype)
+                        finally:
+                            response.close()
+                        _store_shared(key, entry)
+            return current_app.response_class(entry[1], status=entry[2], mimetype=entry[3])
+        return wrapper
+    return decorator
+
+
+def init_concurrency(app):
+    limit = app.config.get('HEAVY_REQUEST_CONCURRENCY')
+    if limit:
+        # Created after gunicorn's gevent patching, so waiting here yields to other greenlets
+        app.extensions[EXTENSION_KEY] = threading.BoundedSemaphore(limit)
+
+    @app.after_request
+    def _drop_shared_responses(response):
+        if _shared and request.method in MUTATING_METHODS and response.status_code < 400:
+            session_id = request_session_id()
+            with _shared_guard:
+                for key in [k for k in _shared if k[0] == session_id]:
+                    del _shared[key]
+        return response
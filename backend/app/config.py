@@ -1,9 +1,26 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def engine_options(database_uri):
+    """SQLAlchemy engine options for the given backend."""
+    if not database_uri or database_uri.startswith('sqlite'):
+        # sqlite3's own lock wait, in seconds; busy_timeout below covers later statements
+        return {
+            'connect_args': {'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000.0},
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
 class BaseConfig:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -11,21 +28,127 @@ class BaseConfig:
     JWT_ACCESS_TOKEN_EXPIRES = 3600
     JWT_REFRESH_TOKEN_EXPIRES = 86400 * 30
     JWT_TOKEN_LOCATION = ['headers']
+    # Verified token claims kept per worker so repeat requests skip the decode; 0 disables
+    JWT_CLAIMS_CACHE_SIZE = int(os.getenv('JWT_CLAIMS_CACHE_SIZE', 10000))
+    # werkzeug hash method for passwords; stored hashes made with other parameters are
+    # upgraded at the user's next login (see app/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Password KDF threads per worker, and how many logins may run or wait for them
+    PASSWORD_HASH_THREADS = int(os.getenv('PASSWORD_HASH_THREADS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+    # Login limits checked before the password hash runs (see app/login_throttle.py)
+    LOGIN_THROTTLE_ENABLED = os.getenv('LOGIN_THROTTLE_ENABLED', 'true').lower() == 'true'
+    LOGIN_ATTEMPTS_PER_ADDRESS = int(os.getenv('LOGIN_ATTEMPTS_PER_ADDRESS', 60))
+    LOGIN_FAILURES_PER_USERNAME = int(os.getenv('LOGIN_FAILURES_PER_USERNAME', 5))
+    LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv('LOGIN_THROTTLE_WINDOW_SECONDS', 300))
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted (nginx: 1)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    # Optional read replica for @use_replica views; e.g. a second SQLite file for local testing
+    SQLALCHEMY_BINDS = (
+        {'replica': os.getenv('DATABASE_REPLICA_URL')} if os.getenv('DATABASE_REPLICA_URL') else {}
+    )
+    READ_REPLICA_STICKY_SECONDS = int(os.getenv('READ_REPLICA_STICKY_SECONDS', 5))
+    SWAGGER_ENABLED = os.getenv('SWAGGER_ENABLED', 'true').lower() == 'true'
+    # Serve /apispec.json from the file written by "flask export-spec"
+    OPENAPI_STATIC_SPEC = os.getenv('OPENAPI_STATIC_SPEC', 'false').lower() == 'true'
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+    INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    # SELECTs slower than this are logged with their query plan; 0 disables
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 500))
+    # Record statement shapes per request and flag budget overruns / N+1 patterns
+    QUERY_GUARD_ENABLED = os.getenv('QUERY_GUARD_ENABLED', 'false').lower() == 'true'
+    N_PLUS_ONE_THRESHOLD = 5
+    # Expensive read endpoints allowed to run at once per worker; extra requests wait
+    # (yielding to short requests under gevent) and get a 503 after the queue timeout
+    HEAVY_REQUEST_CONCURRENCY = int(os.getenv('HEAVY_REQUEST_CONCURRENCY', 2))
+    HEAVY_REQUEST_QUEUE_TIMEOUT = float(os.getenv('HEAVY_REQUEST_QUEUE_TIMEOUT', 10))
+    # Per-worker incident/problem headers (number, status, session) for existence checks and
+    # labels; other workers' status changes show up after the TTL (see app/header_cache.py)
+    HEADER_CACHE_SIZE = int(os.getenv('HEADER_CACHE_SIZE', 20000))
+    HEADER_CACHE_TTL_SECONDS = float(os.getenv('HEADER_CACHE_TTL_SECONDS', 30))
+    # Concurrent dashboard pollers share one rendering for this long; 0 disables
+    DASHBOARD_SHARE_SECONDS = float(os.getenv('DASHBOARD_SHARE_SECONDS', 2))
+    # Background jobs run by "flask worker"
+    JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', 2))
+    JOB_POLL_INTERVAL = 1.0
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_BACKOFF_SECONDS = 10
+    # A running job is reclaimed by another worker once its lease lapses
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+    # Most jobs of one kind running at once across all workers
+    JOB_KIND_CONCURRENCY = {'export_incidents': 2, 'reindex_similarity': 1}
+    # Incident notification channels (JSON, see app/outbox.py), delivered from the
+    # outbox by "flask dispatch-notifications"
+    NOTIFICATION_CHANNELS = json.loads(os.getenv('NOTIFICATION_CHANNELS', '{}'))
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 20))
+    OUTBOX_POLL_INTERVAL = 1.0
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_RETRY_BACKOFF_SECONDS = 5
+    OUTBOX_LEASE_SECONDS = 60
+    OUTBOX_HTTP_TIMEOUT = 10
+    # Webhook events are recorded with each incident write and fanned out to
+    # subscribers by "flask webhook-dispatcher" (see app/webhooks.py)
+    WEBHOOKS_ENABLED = os.getenv('WEBHOOKS_ENABLED', 'true').lower() == 'true'
+    # Changes to one incident within this window reach each subscriber as one delivery
+    WEBHOOK_COALESCE_SECONDS = float(os.getenv('WEBHOOK_COALESCE_SECONDS', 2))
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 8))
+    WEBHOOK_BATCH_SIZE = 50
+    WEBHOOK_POLL_INTERVAL = 0.5
+    WEBHOOK_MAX_ATTEMPTS = 8
+    WEBHOOK_RETRY_BACKOFF_SECONDS = 5
+    WEBHOOK_LEASE_SECONDS = 60
+    WEBHOOK_HTTP_TIMEOUT = 10
+    # Lets subscriptions target loopback/private hosts (local receivers); never in production
+    WEBHOOK_ALLOW_PRIVATE_DESTINATIONS = (
+        os.getenv('WEBHOOK_ALLOW_PRIVATE_DESTINATIONS', 'false').lower() == 'true')
+    # 'files' copies the SQLite file per demo session; 'shared' isolates sessions by
+    # session_id in the main database and clones the template rows on first use
+    DEMO_SESSION_MODE = os.getenv('DEMO_SESSION_MODE', 'files')
+    DEMO_SESSION_TEMPLATE = '__default__'
+    DEMO_SESSION_TTL_SECONDS = int(os.getenv('DEMO_SESSION_TTL_SECONDS', 4 * 3600))
+    # Add "session_id = <handler's session>" to every ORM query in API requests (app/tenancy.py)
+    TENANT_SCOPING_ENABLED = os.getenv('TENANT_SCOPING_ENABLED', 'true').lower() == 'true'
+    # session_id -> database URL or {"schema": "..."} holding that tenant's incident data;
+    # requests only reach a partition while TENANT_SCOPING_ENABLED is on. Requires
+    # WEBHOOKS_ENABLED=false and no NOTIFICATION_CHANNELS (see app/tenancy.py)
+    TENANT_PARTITIONS = json.loads(os.getenv('TENANT_PARTITIONS', '{}'))
+    # Applied on every new SQLite connection: WAL lets readers proceed while a writer commits
+    # auto_vacuum only takes effect on a new file, so it must come before anything creates tables
+    SQLITE_PRAGMAS = {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),
+        'temp_store': 'MEMORY',
+    }
 
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///incident_tracker.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 
 class TestingConfig(BaseConfig):
     TESTING = True
+    QUERY_GUARD_ENABLED = True
+    DASHBOARD_SHARE_SECONDS = 0
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///incident_tracker_test.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    OPENAPI_STATIC_SPEC = os.getenv('OPENAPI_STATIC_SPEC', 'true').lower() == 'true'
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     SECRET_KEY = os.getenv('SECRET_KEY')
 
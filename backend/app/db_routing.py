@@ -0,0 +1,94 @@
+"""Route read-only endpoints to a replica bind, keeping writes on the primary.
+
+Views decorated with ``@use_replica`` run their queries against the
+``SQLALCHEMY_BINDS['replica']`` engine when one is configured. After a client
+mutates data, its reads stay on the primary for ``READ_REPLICA_STICKY_SECONDS``
+(tracked by cookie and by demo ``session_id``) so it always sees its own writes.
+"""
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from app.tenancy import partition_engine
+
+REPLICA_BIND_KEY = 'replica'
+STICKY_COOKIE = 'itl_primary_until'
+MUTATING_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+MAX_TRACKED_SESSIONS = 10000
+
+# session_id -> epoch seconds until which reads must hit the primary (per worker)
+_primary_until = {}
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends reads from replica-enabled views to the replica.
+
+    Statements on a partitioned tenant's tables go to its partition instead (see
+    ``app.tenancy``), replica or not.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            partition = partition_engine(mapper, clause)
+            if partition is not None:
+                return partition
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get('use_replica', False)
+        ):
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def request_session_id():
+    session_id = request.args.get('session_id')
+    if session_id is None and request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            session_id = data.get('session_id')
+    return session_id or '__default__'
+
+
+def _must_read_primary():
+    now = time.time()
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    return _primary_until.get(request_session_id(), 0) > now
+
+
+def use_replica(view):
+    """Mark a read-only view as safe to serve from the replica bind."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = not _must_read_primary()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_db_routing(app):
+    """Record successful mutations so the same client reads its own writes."""
+    if REPLICA_BIND_KEY not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+
+    @app.after_request
+    def _mark_primary_window(response):
+        window = app.config.get('READ_REPLICA_STICKY_SECONDS', 0)
+        if not window or request.method not in MUTATING_METHODS or response.status_code >= 400:
+            return response
+
+        until = time.time() + window
+        if len(_primary_until) >= MAX_TRACKED_SESSIONS:
+            now = time.time()
+            for key in [k for k, v in _primary_until.items() if v <= now]:
+                del _primary_until[key]
+        _primary_until[request_session_id()] = until
+        response.set_cookie(STICKY_COOKIE, str(int(until) + 1), max_age=int(window) + 1,
+                            httponly=True, samesite='Lax')
+        return response
@@ -1,4 +1,6 @@
 from flask import jsonify
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
 
 
 class ITLError(Exception):
@@ -37,6 +39,10 @@ class UnauthorizedError(ITLError):
     status_code = 401
 
 
+class ServiceUnavailableError(ITLError):
+    status_code = 503
+
+
 def register_error_handlers(app):
     @app.errorhandler(ITLError)
     def handle_itl_error(error):
@@ -44,6 +50,17 @@ def register_error_handlers(app):
         response.status_code = error.status_code
         return response
 
+    @app.errorhandler(OperationalError)
+    def database_error(error):
+        # SQLite gave up waiting for the write lock (busy_timeout); the client can retry
+        if 'database is locked' not in str(error.orig):
+            raise error
+        db.session.rollback()
+        response = jsonify({'message': 'Database is busy, please retry'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'message': 'Resource not found'}), 404
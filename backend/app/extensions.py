@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from app.db_routing import RoutingSession
+from app.auth_cache import CachingJWTManager
 
-db = SQLAlchemy()
-jwt = JWTManager()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = CachingJWTManager()
 cors = CORS()
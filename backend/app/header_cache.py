@@ -0,0 +1,168 @@
+"""Per-worker read-through cache of incident and problem headers.
+
+Several handlers only need to know that an incident exists in the caller's
+session, or its number, before doing their real work: the timeline endpoints
+check the incident and the dashboard labels recent activity with incident
+numbers. ``get_header``/``get_headers`` answer those from a bounded LRU of
+``Header(id, number, status, severity, session_id)`` tuples, loading misses with
+one narrow SELECT.
+
+Headers of incidents and problems written through this worker's ORM sessions
+are refreshed when the transaction commits. Writes from other workers reach
+this cache once the entry's ``HEADER_CACHE_TTL_SECONDS`` runs out, so ``status``
+and ``severity`` may lag by that long; ``id``, ``number`` and ``session_id``
+never change. Callers that go on to write must still confirm the row exists in
+the same statement (e.g. via an UPDATE's rowcount), as an incident purged by
+another process can outlive its header here. ``HEADER_CACHE_SIZE = 0`` disables
+the cache.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.errors import NotFoundError
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.problem import Problem
+
+EXTENSION_KEY = 'header_cache'
+PENDING_KEY = 'header_cache_pending'
+
+Header = namedtuple('Header', ['id', 'number', 'status', 'severity', 'session_id'])
+
+# Model -> the columns that fill in a Header, in field order
+HEADER_COLUMNS = {
+    Incident: (Incident.id, Incident.incident_number, Incident.status, Incident.severity,
+               Incident.session_id),
+    Problem: (Problem.id, Problem.problem_number, Problem.fix_status, Problem.priority,
+              Problem.session_id),
+}
+
+
+class HeaderCache:
+    """A thread-safe LRU of ``(model, id) -> (Header, expires_at)``."""
+
+    def __init__(self, maxsize=20000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_many(self, model, ids):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for id_ in ids:
+                key = (model, id_)
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now:
+                    if entry is not None:
+                        del self._entries[key]
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[id_] = entry[0]
+        return found
+
+    def put(self, model, header):
+        with self._lock:
+            self._entries[(model, header.id)] = (header, time.monotonic() + self.ttl)
+            self._entries.move_to_end((model, header.id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model, id_):
+        with self._lock:
+            self._entries.pop((model, id_), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _cache():
+    return current_app.extensions.get(EXTENSION_KEY) if has_app_context() else None
+
+
+def get_headers(model, ids):
+    """Headers of the ``model`` rows among ``ids`` that exist; misses are loaded together."""
+    ids = set(ids)
+    cache = _cache()
+    found = cache.get_many(model, ids) if cache is not None else {}
+    missing = ids - found.keys()
+    if missing:
+        columns = HEADER_COLUMNS[model]
+        for row in db.session.query(*columns).filter(columns[0].in_(missing)):
+            header = Header(*row)
+            found[header.id] = header
+            if cache is not None:
+                cache.put(model, header)
+    return found
+
+
+def get_header(model, id_, session_id):
+    """The header of ``id_`` in ``session_id``, or NotFoundError."""
+    header = get_headers(model, [id_]).get(id_)
+    if header is None or header.session_id != session_id:
+        raise NotFoundError(f'{model.__name__} not found')
+    return header
+
+
+def invalidate_header(model, id_):
+    cache = _cache()
+    if cache is not None:
+        cache.invalidate(model, id_)
+
+
+def _header_of(obj):
+    values = inspect(obj).dict
+    keys = [column.key for column in HEADER_COLUMNS[type(obj)]]
+    # Partially loaded (load_only) rows: drop the entry rather than load the rest
+    if not all(key in values for key in keys):
+        return None
+    return Header(*(values[key] for key in keys))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_headers(session, flush_context):
+    if _cache() is None:
+        return
+    pending = session.info.setdefault(PENDING_KEY, {})
+    for obj in session.new | session.dirty:
+        if type(obj) in HEADER_COLUMNS:
+            pending[(type(obj), obj.id)] = _header_of(obj)
+    for obj in session.deleted:
+        if type(obj) in HEADER_COLUMNS:
+            pending[(type(obj), obj.id)] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_headers(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    cache = _cache()
+    if not pending or cache is None:
+        return
+    for (model, id_), header in pending.items():
+        if header is None:
+            cache.invalidate(model, id_)
+        else:
+            cache.put(model, header)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_headers(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_header_cache(app):
+    size = app.config.get('HEADER_CACHE_SIZE', 20000)
+    app.extensions[EXTENSION_KEY] = (
+        HeaderCache(size, app.config.get('HEADER_CACHE_TTL_SECONDS', 30)) if size else None
+    )
@@ -0,0 +1,363 @@
+"""Per-request SQL and timing instrumentation.
+
+Engine cursor events accumulate query count, DB time and rows written into ``g``
+for the current request, and a session listener counts the ORM objects it loads.
+When the response is closed (after a streamed body has been written) the totals
+are folded into per-route histograms rendered in Prometheus text format by
+``/api/metrics/internal``; responses that are not streamed also get a
+``Server-Timing`` header. Histograms live in the worker process, so each
+gunicorn worker reports its own series.
+
+Write requests also record how long they waited for the write lock, and how
+long they spent flushing and committing. The lock wait is the time of the first
+write statement in a transaction (where SQLite takes its database lock) or of
+a ``SELECT ... FOR UPDATE``. ``database is locked`` failures are counted per route.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app.db_routing import MUTATING_METHODS
+
+slow_query_logger = logging.getLogger('app.slow_query')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, bucket_counts, total, count in sorted(items):
+            label_str = ','.join(
+                f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels)
+            )
+            prefix = label_str + ',' if label_str else ''
+            cumulative = 0
+            for bound, n in zip(self.buckets, bucket_counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_str}}} {total}')
+            lines.append(f'{self.name}_count{{{label_str}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a label tuple."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            label_str = ','.join(
+                f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels)
+            )
+            lines.append(f'{self.name}{{{label_str}}} {value}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, tuple(label_names), buckets)
+            return self._metrics[name]
+
+    def counter(self, name, help_text, label_names=()):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help_text, tuple(label_names))
+            return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    'itl_request_duration_seconds', 'Request wall time by route.', ('route', 'method'))
+DB_SECONDS = REGISTRY.histogram(
+    'itl_request_db_seconds', 'Time spent executing SQL per request.', ('route', 'method'))
+QUERY_COUNT = REGISTRY.histogram(
+    'itl_request_queries', 'SQL statements executed per request.', ('route', 'method'),
+    buckets=COUNT_BUCKETS)
+SERIALIZE_SECONDS = REGISTRY.histogram(
+    'itl_request_serialize_seconds', 'JSON encoding time per request.', ('route', 'method'))
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    'itl_write_lock_wait_seconds',
+    'Time write requests spent acquiring the database write lock or row locks.',
+    ('route', 'method'))
+FLUSH_SECONDS = REGISTRY.histogram(
+    'itl_write_flush_seconds', 'ORM flush time per write request.', ('route', 'method'))
+COMMIT_SECONDS = REGISTRY.histogram(
+    'itl_write_commit_seconds', 'Commit time per write request, excluding its flush.',
+    ('route', 'method'))
+LOCK_ERRORS = REGISTRY.counter(
+    'itl_database_locked_total', 'Statements that failed with "database is locked".',
+    ('route', 'method'))
+
+
+def _request_stats():
+    stats = g.get('db_stats')
+    if stats is None:
+        stats = g.db_stats = {'queries': 0, 'db_seconds': 0.0, 'rows': 0, 'rows_written': 0,
+                              'serialize_seconds': 0.0, 'lock_wait_seconds': 0.0,
+                              'flush_seconds': 0.0, 'commit_seconds': 0.0, 'lock_errors': 0}
+    return stats
+
+
+def record_serialization(seconds):
+    """Called by the JSON provider with the time spent encoding a response body."""
+    if has_request_context():
+        _request_stats()['serialize_seconds'] += seconds
+
+
+def _explain(conn, statement, parameters):
+    dialect = conn.dialect.name
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _takes_lock(conn, statement):
+    """True for the statement that acquires the transaction's write or row lock."""
+    head = statement.lstrip()[:6].upper()
+    if head in ('INSERT', 'UPDATE', 'DELETE'):
+        if conn.info.get('holds_write_lock'):
+            return False
+        conn.info['holds_write_lock'] = True
+        return True
+    return head == 'SELECT' and 'FOR UPDATE' in statement.upper()
+
+
+def _release_lock(conn):
+    conn.info.pop('holds_write_lock', None)
+
+
+def _instrument_engine(app, engine):
+    slow_ms = app.config.get('SLOW_QUERY_MS') or 0
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        takes_lock = _takes_lock(conn, statement)
+        if has_request_context():
+            stats = _request_stats()
+            stats['queries'] += 1
+            stats['db_seconds'] += elapsed
+            if takes_lock:
+                stats['lock_wait_seconds'] += elapsed
+            # SELECT rowcounts are -1 on sqlite3 and driver-specific elsewhere; rows
+            # read are counted as the ORM loads them (_count_loaded_rows)
+            if context is not None and cursor.rowcount > 0 \
+                    and (context.isinsert or context.isupdate or context.isdelete):
+                stats['rows_written'] += cursor.rowcount
+
+        if slow_ms and elapsed * 1000.0 >= slow_ms and not executemany \
+                and statement.lstrip().upper().startswith('SELECT'):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as exc:  # plan is best-effort diagnostics only
+                plan = f'<explain failed: {exc}>'
+            slow_query_logger.warning(
+                'Slow query (%.1f ms) on %s:\n%s\nPlan:\n%s',
+                elapsed * 1000.0,
+                request.endpoint if has_request_context() else '-',
+                statement, plan,
+            )
+
+    event.listen(engine, 'commit', _release_lock)
+    event.listen(engine, 'rollback', _release_lock)
+
+    @event.listens_for(engine, 'handle_error')
+    def _count_lock_errors(context):
+        # after_cursor_execute never runs for a failed statement; drop its start time
+        starts = context.connection.info.get('query_start') if context.connection else None
+        if context.execution_context is not None and starts:
+            starts.pop()
+        if has_request_context() and 'database is locked' in str(context.original_exception):
+            _request_stats()['lock_errors'] += 1
+
+
+def _count_loaded_rows(session, instance):
+    if has_request_context():
+        _request_stats()['rows'] += 1
+
+
+def _before_flush(session, flush_context, instances):
+    if has_request_context():
+        g.flush_started = time.perf_counter()
+
+
+def _after_flush(session, flush_context):
+    started = g.pop('flush_started', None) if has_request_context() else None
+    if started is not None:
+        _request_stats()['flush_seconds'] += time.perf_counter() - started
+
+
+def _before_commit(session):
+    if has_request_context():
+        g.commit_started = (time.perf_counter(), _request_stats()['flush_seconds'])
+
+
+def _after_commit(session):
+    started = g.pop('commit_started', None) if has_request_context() else None
+    if started is not None:
+        stats = _request_stats()
+        flushed = stats['flush_seconds'] - started[1]
+        stats['commit_seconds'] += time.perf_counter() - started[0] - flushed
+
+
+SESSION_LISTENERS = (
+    ('loaded_as_persistent', _count_loaded_rows),
+    ('before_flush', _before_flush),
+    ('after_flush_postexec', _after_flush),
+    ('before_commit', _before_commit),
+    ('after_commit', _after_commit),
+)
+
+
+def init_instrumentation(app):
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+
+    from sqlalchemy.orm import Session
+    from app.extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_engine(app, engine)
+    for name, listener in SESSION_LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        stats = _request_stats()
+        labels = (request.endpoint or 'unmatched', request.method)
+        mutating = request.method in MUTATING_METHODS
+
+        def _observe():
+            # Streamed bodies run their queries and encoding after after_request
+            REQUEST_SECONDS.observe(labels, time.perf_counter() - started)
+            DB_SECONDS.observe(labels, stats['db_seconds'])
+            QUERY_COUNT.observe(labels, stats['queries'])
+            SERIALIZE_SECONDS.observe(labels, stats['serialize_seconds'])
+            if stats['lock_errors']:
+                LOCK_ERRORS.inc(labels, stats['lock_errors'])
+            if mutating:
+                LOCK_WAIT_SECONDS.observe(labels, stats['lock_wait_seconds'])
+                FLUSH_SECONDS.observe(labels, stats['flush_seconds'])
+                COMMIT_SECONDS.observe(labels, stats['commit_seconds'])
+
+        response.call_on_close(_observe)
+
+        # Headers go out before a streamed body is produced, so its totals are unknown here
+        if not app.config.get('SERVER_TIMING_ENABLED') or response.is_streamed:
+            return response
+        timings = [
+            f'db;dur={stats["db_seconds"] * 1000.0:.2f};desc="{stats["queries"]} queries, '
+            f'{stats["rows"]} rows loaded, {stats["rows_written"]} rows written"',
+            f'serialize;dur={stats["serialize_seconds"] * 1000.0:.2f}',
+        ]
+        if mutating:
+            timings += [
+                f'lock;dur={stats["lock_wait_seconds"] * 1000.0:.2f}',
+                f'flush;dur={stats["flush_seconds"] * 1000.0:.2f}',
+                f'commit;dur={stats["commit_seconds"] * 1000.0:.2f}',
+            ]
+        timings.append(f'app;dur={(time.perf_counter() - started) * 1000.0:.2f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+        total = time.perf_counter() - started
+        stats = _request_stats()
+        labels = (request.endpoint or 'unmatched', request.method)
+
+        REQUEST_SECONDS.observe(labels, total)
+        DB_SECONDS.observe(labels, stats['db_seconds'])
+        QUERY_COUNT.observe(labels, stats['queries'])
+        SERIALIZE_SECONDS.observe(labels, stats['serialize_seconds'])
+        if stats['lock_errors']:
+            LOCK_ERRORS.inc(labels, stats['lock_errors'])
+
+        timings = [
+            f'db;dur={stats["db_seconds"] * 1000.0:.2f};desc="{stats["queries"]} queries, '
+            f'{stats["rows"]} rows loaded, {stats["rows_written"]} rows written"',
+            f'serialize;dur={stats["serialize_seconds"] * 1000.0:.2f}',
+        ]
+        if request.method in MUTATING_METHODS:
+            LOCK_WAIT_SECONDS.observe(labels, stats['lock_wait_seconds'])
+            FLUSH_SECONDS.observe(labels, stats['flush_seconds'])
+            COMMIT_SECONDS.observe(labels, stats['commit_seconds'])
+            timings += [
+                f'lock;dur={stats["lock_wait_seconds"] * 1000.0:.2f}',
+                f'flush;dur={stats["flush_seconds"] * 1000.0:.2f}',
+                f'commit;dur={stats["commit_seconds"] * 1000.0:.2f}',
+            ]
+
+        if app.config.get('SERVER_TIMING_ENABLED'):
+            timings.append(f'app;dur={total * 1000.0:.2f}')
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
@@ -0,0 +1,296 @@
+"""Background job queue backed by the ``jobs`` table.
+
+Reports, exports and bulk maintenance can be queued with ``POST /api/jobs``
+instead of running inside a gunicorn worker. ``flask worker`` processes claim
+queued jobs with a conditional UPDATE (so several workers never run the same
+job), hold them under a lease, and store the result in the row for
+``GET /api/jobs/<id>/result``. Failed jobs are retried with exponential backoff
+up to ``max_attempts``. Workers renew the lease while a job runs, so a job is
+only reclaimed once its worker has died, and a worker records the outcome only
+while it still owns the job. ``JOB_KIND_CONCURRENCY`` caps how many jobs of one
+kind run at once across all workers.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+from app.errors import BadRequestError, ITLError, NotFoundError
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.job import Job
+from app.tenancy import tenant_scope
+
+logger = logging.getLogger('app.jobs')
+
+JobResult = namedtuple('JobResult', ['body', 'content_type', 'filename'])
+
+# kind -> callable(params, session_id) returning a JSON-serializable value or a JobResult
+JOB_HANDLERS = {}
+CLAIM_BATCH = 20
+
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of ``kind``."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def enqueue(kind, params=None, session_id='__default__', max_attempts=None):
+    """Add a job to the queue. The caller is responsible for committing."""
+    if kind not in JOB_HANDLERS:
+        raise BadRequestError(f'Unknown job kind: {kind}',
+                              payload={'valid_kinds': sorted(JOB_HANDLERS)})
+    if params is not None and not isinstance(params, dict):
+        raise BadRequestError('params must be an object')
+    job = Job(
+        kind=kind,
+        params=json.dumps(params or {}),
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+        session_id=session_id,
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def _claimable(now):
+    return or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        # A running job whose lease lapsed belonged to a worker that died
+        and_(Job.status == 'running', Job.lease_expires_at <= now),
+    )
+
+
+def _running_count(kind, now):
+    running = aliased(Job)
+    return (
+        select(func.count(running.id))
+        .where(running.kind == kind, running.status == 'running',
+               running.lease_expires_at > now)
+        .scalar_subquery()
+    )
+
+
+def claim_next(worker_id, lease_seconds=600, kinds=None, kind_limits=None):
+    """Claim the oldest runnable job for ``worker_id``; returns the Job or None."""
+    now = _now().isoformat()
+    query = db.session.query(Job.id, Job.kind).filter(_claimable(now))
+    if kinds:
+        query = query.filter(Job.kind.in_(list(kinds)))
+    candidates = query.order_by(Job.created_at).limit(CLAIM_BATCH).all()
+
+    running = {}
+    if kind_limits and candidates:
+        # Skips kinds that are already full without trying to claim each of their jobs
+        running = dict(
+            db.session.query(Job.kind, func.count(Job.id))
+            .filter(Job.status == 'running', Job.lease_expires_at > now)
+            .group_by(Job.kind)
+            .all()
+        )
+
+    lease_until = (_now() + timedelta(seconds=lease_seconds)).isoformat()
+    for job_id, kind in candidates:
+        limit = (kind_limits or {}).get(kind)
+        if limit is not None and running.get(kind, 0) >= limit:
+            continue
+        claim = db.update(Job).where(Job.id == job_id, _claimable(now))
+        if limit is not None:
+            # Checked again in the claiming statement, as other workers claim in between
+            claim = claim.where(_running_count(kind, now) < limit)
+        claimed = db.session.execute(
+            claim.values(status='running', worker_id=worker_id, started_at=now,
+                         lease_expires_at=lease_until, attempts=Job.attempts + 1)
+        ).rowcount
+        if claimed:
+            db.session.commit()
+            return db.session.get(Job, job_id)
+    db.session.rollback()
+    return None
+
+
+def _result_values(job, value):
+    if not isinstance(value, JobResult):
+        value = JobResult(current_app.json.dumps(value), 'application/json', f'{job.kind}.json')
+    body = value.body.decode('utf-8') if isinstance(value.body, bytes) else value.body
+    return {'result': body, 'result_content_type': value.content_type,
+            'result_filename': value.filename}
+
+
+def _owned(job_id, owner):
+    """Criteria matching the job only while ``owner`` (worker_id, attempts) still holds it."""
+    worker_id, attempts = owner
+    return and_(Job.id == job_id, Job.status == 'running', Job.worker_id == worker_id,
+                Job.attempts == attempts)
+
+
+def _keep_lease(app, job_id, owner, lease_seconds, stop_event):
+    """Extend the job's lease every third of ``lease_seconds`` until ``stop_event`` is set."""
+    while not stop_event.wait(max(lease_seconds / 3.0, 1.0)):
+        lease_until = (_now() + timedelta(seconds=lease_seconds)).isoformat()
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                renewed = conn.execute(
+                    db.update(Job.__table__).where(_owned(job_id, owner))
+                    .values(lease_expires_at=lease_until)
+                ).rowcount
+        except Exception:  # e.g. database is locked; the next beat tries again
+            logger.warning('Could not renew the lease of job %s', job_id, exc_info=True)
+            continue
+        if not renewed:
+            logger.warning('Job %s lost its lease to another worker', job_id)
+            return
+
+
+def run_job(job, backoff_seconds=10, lease_seconds=None):
+    """Execute a claimed job and record success, a scheduled retry, or failure.
+
+    With ``lease_seconds`` a heartbeat thread keeps the lease from lapsing while
+    the handler runs. The outcome is written only if this claim still owns the
+    job; a worker whose lease was taken over discards its result and returns
+    ``'lost'``.
+    """
+    job_id = job.id
+    owner = (job.worker_id, job.attempts)
+    stop_event = threading.Event()
+    if lease_seconds:
+        threading.Thread(
+            target=_keep_lease, name=f'job-lease-{job_id}', daemon=True,
+            args=(current_app._get_current_object(), job_id, owner, lease_seconds, stop_event),
+        ).start()
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Lease expired on the final attempt')
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise BadRequestError(f'Unknown job kind: {job.kind}')
+        with tenant_scope(job.session_id):
+            value = handler(json.loads(job.params or '{}'), job.session_id)
+        values = dict(_result_values(job, value), status='succeeded', error=None)
+    except Exception as exc:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        error = f'{type(exc).__name__}: {getattr(exc, "message", None) or exc}'
+        values = {'error': error}
+        # Client errors (bad params, missing incident) will not succeed on retry
+        permanent = isinstance(exc, ITLError) and exc.status_code < 500
+        if permanent or job.attempts >= job.max_attempts:
+            values['status'] = 'failed'
+            logger.warning('Job %s (%s) failed: %s', job.id, job.kind, error)
+        else:
+            values['status'] = 'queued'
+            delay = backoff_seconds * 2 ** (job.attempts - 1)
+            values['run_after'] = (_now() + timedelta(seconds=delay)).isoformat()
+            logger.info('Job %s (%s) attempt %d failed, retrying in %ds: %s',
+                        job.id, job.kind, job.attempts, delay, error)
+    finally:
+        stop_event.set()
+
+    if values['status'] != 'queued':
+        values['finished_at'] = _now().isoformat()
+    values['lease_expires_at'] = None
+    finished = db.session.execute(
+        db.update(Job).where(_owned(job_id, owner)).values(**values)
+    ).rowcount
+    if not finished:
+        db.session.rollback()
+        logger.warning('Job %s lost its lease before finishing; its outcome was discarded',
+                       job_id)
+        return 'lost'
+    db.session.commit()
+    return values['status']
+
+
+def run_worker(app, concurrency=None, poll_interval=None, kinds=None, stop_event=None,
+               burst=False):
+    """Run ``concurrency`` threads that claim and execute jobs until ``stop_event`` is set.
+
+    With ``burst`` each thread exits as soon as the queue has nothing for it.
+    """
+    config = app.config
+    concurrency = concurrency or config.get('JOB_WORKER_CONCURRENCY', 2)
+    poll_interval = poll_interval if poll_interval is not None else config.get(
+        'JOB_POLL_INTERVAL', 1.0)
+    stop_event = stop_event or threading.Event()
+    base_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def loop(worker_id):
+        while not stop_event.is_set():
+            with app.app_context():
+                job = claim_next(
+                    worker_id,
+                    lease_seconds=config.get('JOB_LEASE_SECONDS', 600),
+                    kinds=kinds,
+                    kind_limits=config.get('JOB_KIND_CONCURRENCY'),
+                )
+                if job is not None:
+                    logger.info('%s running job %s (%s)', worker_id, job.id, job.kind)
+                    run_job(job, backoff_seconds=config.get('JOB_RETRY_BACKOFF_SECONDS', 10),
+                            lease_seconds=config.get('JOB_LEASE_SECONDS', 600))
+                    continue
+            if burst:
+                return
+            stop_event.wait(poll_interval)
+
+    threads = [
+        threading.Thread(target=loop, args=(f'{base_id}:{n}',), name=f'job-worker-{n}',
+                         daemon=True)
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, stop_event
+
+
+# ── Handlers ─────────────────────────────────────────────────────────
+
+
+def _get_incident(params, session_id):
+    incident = Incident.query.filter_by(id=params.get('incident_id'), session_id=session_id).first()
+    if not incident:
+        raise NotFoundError('Incident not found')
+    return incident
+
+
+@job_handler('incident_report')
+def incident_report_job(params, session_id):
+    from app.services.reports import incident_report
+    incident = _get_incident(params, session_id)
+    return JobResult(current_app.json.dumps(incident_report(incident)), 'application/json',
+                     f'{incident.incident_number}-report.json')
+
+
+@job_handler('sla_compliance')
+def sla_compliance_job(params, session_id):
+    from app.services.reports import sla_compliance_report
+    return sla_compliance_report(session_id)
+
+
+@job_handler('export_incidents')
+def export_incidents_job(params, session_id):
+    from app.api.incidents import apply_incident_filters
+    from app.services.reports import incidents_csv
+    query = apply_incident_filters(Incident.query.filter(Incident.session_id == session_id),
+                                   params, session_id)
+    stamp = _now().strftime('%Y%m%d-%H%M%S')
+    return JobResult(incidents_csv(query), 'text/csv', f'incidents-{stamp}.csv')
+
+
+@job_handler('reindex_similarity')
+def reindex_similarity_job(params, session_id):
+    from app.services.similarity import rebuild_index
+    count = rebuild_index(session_id)
+    db.session.commit()
+    return {'incidents_indexed': count}
@@ -0,0 +1,92 @@
+"""Login attempt limits, checked before the password KDF runs.
+
+A credential-stuffing client would otherwise make every worker spend ~50 ms of
+CPU on scrypt per guess. Attempts are counted per client address
+(``LOGIN_ATTEMPTS_PER_ADDRESS``) and failures per username
+(``LOGIN_FAILURES_PER_USERNAME``) over a sliding ``LOGIN_THROTTLE_WINDOW_SECONDS``;
+over either limit the login is refused with 429 without touching the hash.
+Counts are per worker, like the other in-process caches. Behind a proxy set
+``PROXY_FIX_X_FOR`` so the client address is the real one.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowCounter:
+    """Event timestamps per key over the last ``window`` seconds, for at most ``max_keys`` keys."""
+
+    def __init__(self, window, max_keys=10000):
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+
+    def _prune(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def count(self, key, now):
+        events = self._prune(key, now)
+        return len(events) if events else 0
+
+    def retry_after(self, key, now):
+        events = self._prune(key, now)
+        return max(1, int(events[0] + self.window - now) + 1) if events else 0
+
+    def add(self, key, now):
+        events = self._prune(key, now)
+        if events is None:
+            events = self._events[key] = deque()
+        events.append(now)
+        self._events.move_to_end(key)
+        while len(self._events) > self.max_keys:
+            self._events.popitem(last=False)
+
+    def reset(self, key):
+        self._events.pop(key, None)
+
+
+class LoginThrottle:
+    def __init__(self, attempts_per_address=60, failures_per_username=5, window=300):
+        self.attempts_per_address = attempts_per_address
+        self.failures_per_username = failures_per_username
+        self.attempts = SlidingWindowCounter(window)
+        self.failures = SlidingWindowCounter(window)
+        self._lock = threading.Lock()
+
+    def check(self, address, username):
+        """Count an attempt; returns seconds to wait if it must be refused, else 0."""
+        now = time.monotonic()
+        with self._lock:
+            if self.attempts.count(address, now) >= self.attempts_per_address:
+                return self.attempts.retry_after(address, now)
+            if self.failures.count(username, now) >= self.failures_per_username:
+                return self.failures.retry_after(username, now)
+            self.attempts.add(address, now)
+            return 0
+
+    def record_failure(self, username):
+        with self._lock:
+            self.failures.add(username, time.monotonic())
+
+    def record_success(self, username):
+        with self._lock:
+            self.failures.reset(username)
+
+
+def init_login_throttle(app):
+    if not app.config.get('LOGIN_THROTTLE_ENABLED', True):
+        app.extensions['login_throttle'] = None
+        return
+    app.extensions['login_throttle'] = LoginThrottle(
+        attempts_per_address=app.config.get('LOGIN_ATTEMPTS_PER_ADDRESS', 60),
+        failures_per_username=app.config.get('LOGIN_FAILURES_PER_USERNAME', 5),
+        window=app.config.get('LOGIN_THROTTLE_WINDOW_SECONDS', 300),
+    )
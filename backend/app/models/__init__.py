@@ -5,6 +5,16 @@ from app.models.incident_responder import IncidentResponder
 from app.models.problem import Problem
 from app.models.communication import Communication
 from app.models.sla_target import SLATarget
+from app.models.incident_term import IncidentTerm
+from app.models.incident_tag import IncidentTag
+from app.models.demo_session import DemoSession
+from app.models.job import Job
+from app.models.session_metrics import SessionMetrics
+from app.models.outbox_message import OutboxMessage
+from app.models.webhook_subscription import WebhookSubscription
+from app.models.webhook_event import WebhookEvent
+from app.models.webhook_delivery import WebhookDelivery
+from app.models.user import User
 
 __all__ = [
     'Incident',
@@ -14,4 +24,14 @@ __all__ = [
     'Problem',
     'Communication',
     'SLATarget',
+    'IncidentTerm',
+    'IncidentTag',
+    'DemoSession',
+    'Job',
+    'SessionMetrics',
+    'OutboxMessage',
+    'WebhookSubscription',
+    'WebhookEvent',
+    'WebhookDelivery',
+    'User',
 ]
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from app.extensions import db
+
+
+class DemoSession(db.Model):
+    """A demo session sharing the main database, isolated by ``session_id``."""
+    __tablename__ = 'demo_sessions'
+
+    id = db.Column(db.String(100), primary_key=True)
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    last_seen_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    expires_at = db.Column(db.String(50), nullable=False)
+    provisioned_at = db.Column(db.String(50))
+
+    __table_args__ = (
+        db.Index('ix_demo_sessions_expires_at', 'expires_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at,
+            'last_seen_at': self.last_seen_at,
+            'expires_at': self.expires_at,
+            'provisioned_at': self.provisioned_at,
+        }
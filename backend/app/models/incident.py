@@ -1,9 +1,11 @@
 import uuid
 from datetime import datetime, timezone
+from sqlalchemy.orm import load_only
 from app.extensions import db
+from app.tenancy import TenantScoped
 
 
-class Incident(db.Model):
+class Incident(TenantScoped, db.Model):
     __tablename__ = 'incidents'
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -38,6 +40,10 @@ class Incident(db.Model):
     tags = db.Column(db.Text, default='[]')
     session_id = db.Column(db.String(100), default='__default__')
 
+    __table_args__ = (
+        db.Index('ix_incidents_session_id', 'session_id'),
+    )
+
     # Relationships
     timeline_entries = db.relationship('TimelineEntry', backref='incident', lazy='dynamic',
                                        cascade='all, delete-orphan')
@@ -48,6 +54,22 @@ class Incident(db.Model):
     communications = db.relationship('Communication', backref='incident', lazy='dynamic',
                                      cascade='all, delete-orphan')
 
+    # Compact representation for list contexts; none of the large Text columns
+    SUMMARY_FIELDS = (
+        'id', 'incident_number', 'title', 'severity', 'category', 'status',
+        'reported_at', 'acknowledged_at', 'resolved_at', 'closed_at',
+        'assigned_to', 'users_affected', 'problem_id',
+        'created_at', 'updated_at', 'session_id',
+    )
+
+    @classmethod
+    def summary_load_options(cls):
+        """Query option that only reads the summary columns from the database."""
+        return load_only(*[getattr(cls, name) for name in cls.SUMMARY_FIELDS])
+
+    def to_summary_dict(self):
+        return {name: getattr(self, name) for name in self.SUMMARY_FIELDS}
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,8 +1,9 @@
 import uuid
 from app.extensions import db
+from app.tenancy import TenantScoped
 
 
-class IncidentAsset(db.Model):
+class IncidentAsset(TenantScoped, db.Model):
     __tablename__ = 'incident_assets'
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -1,9 +1,10 @@
 import uuid
 from datetime import datetime, timezone
 from app.extensions import db
+from app.tenancy import TenantScoped
 
 
-class IncidentResponder(db.Model):
+class IncidentResponder(TenantScoped, db.Model):
     __tablename__ = 'incident_responders'
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
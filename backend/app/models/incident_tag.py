@@ -0,0 +1,23 @@
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class IncidentTag(TenantScoped, db.Model):
+    """Normalized copy of ``Incident.tags`` so tag filters can use an index."""
+    __tablename__ = 'incident_tags'
+
+    incident_id = db.Column(db.String(36), db.ForeignKey('incidents.id', ondelete='CASCADE'),
+                            primary_key=True)
+    tag = db.Column(db.String(100), primary_key=True)
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_incident_tags_session_tag', 'session_id', 'tag'),
+    )
+
+    def to_dict(self):
+        return {
+            'incident_id': self.incident_id,
+            'tag': self.tag,
+            'session_id': self.session_id,
+        }
@@ -0,0 +1,25 @@
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class IncidentTerm(TenantScoped, db.Model):
+    """Inverted-index posting: one row per (incident, term) with its normalized TF weight."""
+    __tablename__ = 'incident_terms'
+
+    incident_id = db.Column(db.String(36), db.ForeignKey('incidents.id', ondelete='CASCADE'),
+                            primary_key=True)
+    term = db.Column(db.String(50), primary_key=True)
+    weight = db.Column(db.Float, nullable=False)
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_incident_terms_session_term', 'session_id', 'term'),
+    )
+
+    def to_dict(self):
+        return {
+            'incident_id': self.incident_id,
+            'term': self.term,
+            'weight': self.weight,
+            'session_id': self.session_id,
+        }
@@ -0,0 +1,50 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class Job(TenantScoped, db.Model):
+    """A queued background operation and, once finished, its result."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.Text, default='{}')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    lease_expires_at = db.Column(db.String(50))
+    worker_id = db.Column(db.String(100))
+    error = db.Column(db.Text)
+    result = db.Column(db.Text)
+    result_content_type = db.Column(db.String(100))
+    result_filename = db.Column(db.String(255))
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    started_at = db.Column(db.String(50))
+    finished_at = db.Column(db.String(50))
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': json.loads(self.params or '{}'),
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_after': self.run_after,
+            'error': self.error,
+            'has_result': self.result is not None,
+            'result_content_type': self.result_content_type,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'session_id': self.session_id,
+        }
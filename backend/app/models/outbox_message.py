@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class OutboxMessage(TenantScoped, db.Model):
+    """A notification written with the change that caused it, awaiting delivery."""
+    __tablename__ = 'outbox_messages'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    incident_id = db.Column(db.String(36), db.ForeignKey('incidents.id'), nullable=False)
+    event = db.Column(db.String(30), nullable=False)  # status_changed, assigned, resolved
+    channel = db.Column(db.String(30), nullable=False)
+    recipient = db.Column(db.String(200))
+    message = db.Column(db.Text)
+    sent_by = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.String(50),
+                                default=lambda: datetime.now(timezone.utc).isoformat())
+    claim_token = db.Column(db.String(36))
+    lease_expires_at = db.Column(db.String(50))
+    last_error = db.Column(db.Text)
+    communication_id = db.Column(db.String(36))
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    sent_at = db.Column(db.String(50))
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_outbox_messages_channel_status', 'channel', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'incident_id': self.incident_id,
+            'event': self.event,
+            'channel': self.channel,
+            'recipient': self.recipient,
+            'message': self.message,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at,
+            'last_error': self.last_error,
+            'communication_id': self.communication_id,
+            'created_at': self.created_at,
+            'sent_at': self.sent_at,
+            'session_id': self.session_id,
+        }
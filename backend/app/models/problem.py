@@ -1,9 +1,10 @@
 import uuid
 from datetime import datetime, timezone
 from app.extensions import db
+from app.tenancy import TenantScoped
 
 
-class Problem(db.Model):
+class Problem(TenantScoped, db.Model):
     __tablename__ = 'problems'
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class SessionMetrics(TenantScoped, db.Model):
+    """Per-session MTTR/MTTA/SLA rollup written by ``flask recompute-metrics``."""
+    __tablename__ = 'session_metrics'
+
+    session_id = db.Column(db.String(100), primary_key=True)
+    incident_count = db.Column(db.Integer, nullable=False, default=0)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+    mttr_hours = db.Column(db.Float, nullable=False, default=0.0)
+    mtta_minutes = db.Column(db.Float, nullable=False, default=0.0)
+    sla_compliance_pct = db.Column(db.Float, nullable=False, default=100.0)
+    computed_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'incident_count': self.incident_count,
+            'resolved_count': self.resolved_count,
+            'mttr_hours': self.mttr_hours,
+            'mtta_minutes': self.mtta_minutes,
+            'sla_compliance_pct': self.sla_compliance_pct,
+            'computed_at': self.computed_at,
+        }
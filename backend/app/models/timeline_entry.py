@@ -1,9 +1,10 @@
 import uuid
 from datetime import datetime, timezone
 from app.extensions import db
+from app.tenancy import TenantScoped
 
 
-class TimelineEntry(db.Model):
+class TimelineEntry(TenantScoped, db.Model):
     __tablename__ = 'timeline_entries'
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -16,6 +17,11 @@ class TimelineEntry(db.Model):
     new_status = db.Column(db.String(20))
     session_id = db.Column(db.String(100), default='__default__')
 
+    __table_args__ = (
+        # Dashboard recent activity: a session's newest entries
+        db.Index('ix_timeline_entries_session_created', 'session_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+
+
+class User(db.Model):
+    __tablename__ = 'users'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    username = db.Column(db.String(100), nullable=False, unique=True, index=True)
+    password_hash = db.Column(db.String(255), nullable=False)
+    role = db.Column(db.String(30), nullable=False, default='responder')
+    name = db.Column(db.String(200))
+    active = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'role': self.role,
+            'name': self.name,
+        }
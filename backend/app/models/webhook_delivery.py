@@ -0,0 +1,48 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class WebhookDelivery(TenantScoped, db.Model):
+    """One incident's coalesced events, owed to one subscription."""
+    __tablename__ = 'webhook_deliveries'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    subscription_id = db.Column(db.String(36), db.ForeignKey('webhook_subscriptions.id'),
+                                nullable=False)
+    incident_id = db.Column(db.String(36), db.ForeignKey('incidents.id'), nullable=False)
+    event_types = db.Column(db.Text, default='[]')
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.String(50),
+                                default=lambda: datetime.now(timezone.utc).isoformat())
+    claim_token = db.Column(db.String(36))
+    lease_expires_at = db.Column(db.String(50))
+    response_status = db.Column(db.Integer)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    delivered_at = db.Column(db.String(50))
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_webhook_deliveries_status', 'status', 'next_attempt_at'),
+        db.Index('ix_webhook_deliveries_subscription', 'subscription_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subscription_id': self.subscription_id,
+            'incident_id': self.incident_id,
+            'event_types': json.loads(self.event_types or '[]'),
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at,
+            'response_status': self.response_status,
+            'last_error': self.last_error,
+            'created_at': self.created_at,
+            'delivered_at': self.delivered_at,
+        }
@@ -0,0 +1,29 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class WebhookEvent(TenantScoped, db.Model):
+    """An incident change waiting to be fanned out to webhook subscriptions."""
+    __tablename__ = 'webhook_events'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    incident_id = db.Column(db.String(36), db.ForeignKey('incidents.id'), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, default='{}')
+    occurred_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    session_id = db.Column(db.String(100), default='__default__')
+
+    __table_args__ = (
+        db.Index('ix_webhook_events_occurred_at', 'occurred_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'occurred_at': self.occurred_at,
+            'data': json.loads(self.data or '{}'),
+        }
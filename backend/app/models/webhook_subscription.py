@@ -0,0 +1,54 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from app.tenancy import TenantScoped
+
+
+class WebhookSubscription(TenantScoped, db.Model):
+    """A downstream URL that receives signed incident events matching its filters."""
+    __tablename__ = 'webhook_subscriptions'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    url = db.Column(db.String(500), nullable=False)
+    secret = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(200))
+    # JSON lists; an empty list matches everything
+    events = db.Column(db.Text, default='[]')
+    severities = db.Column(db.Text, default='[]')
+    categories = db.Column(db.Text, default='[]')
+    active = db.Column(db.Integer, nullable=False, default=1)
+    consecutive_failures = db.Column(db.Integer, nullable=False, default=0)
+    last_delivery_at = db.Column(db.String(50))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.String(50), default=lambda: datetime.now(timezone.utc).isoformat())
+    session_id = db.Column(db.String(100), default='__default__')
+
+    def matches(self, event_types, severity, category):
+        events = json.loads(self.events or '[]')
+        severities = json.loads(self.severities or '[]')
+        categories = json.loads(self.categories or '[]')
+        return (
+            (not events or any(e in events for e in event_types))
+            and (not severities or severity in severities)
+            and (not categories or category in categories)
+        )
+
+    def to_dict(self, include_secret=False):
+        result = {
+            'id': self.id,
+            'url': self.url,
+            'description': self.description,
+            'events': json.loads(self.events or '[]'),
+            'severities': json.loads(self.severities or '[]'),
+            'categories': json.loads(self.categories or '[]'),
+            'active': bool(self.active),
+            'consecutive_failures': self.consecutive_failures,
+            'last_delivery_at': self.last_delivery_at,
+            'last_error': self.last_error,
+            'created_at': self.created_at,
+            'session_id': self.session_id,
+        }
+        if include_secret:
+            result['secret'] = self.secret
+        return result
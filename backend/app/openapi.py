@@ -0,0 +1,63 @@
+"""Precompiled OpenAPI spec: export the flasgger spec once and serve the file directly."""
+import json
+import os
+from flask import send_file
+
+SPEC_ENDPOINT = 'flasgger.apispec'
+
+
+def spec_path(app):
+    """Versioned location of the exported spec, e.g. ``backend/openapi/openapi-1.0.0.json``."""
+    from app import SWAGGER_TEMPLATE
+    version = SWAGGER_TEMPLATE['info']['version']
+    directory = app.config.get('OPENAPI_SPEC_DIR') or os.path.join(
+        os.path.dirname(app.root_path), 'openapi'
+    )
+    return os.path.join(directory, f'openapi-{version}.json')
+
+
+def render_spec(app):
+    """Build the spec from the endpoint docstrings and return it as stable JSON text."""
+    swagger = app.extensions['flasgger']
+    with app.test_request_context('/'):
+        spec = swagger.get_apispecs('apispec')
+    return json.dumps(spec, indent=2, sort_keys=True, default=str) + '\n'
+
+
+def export_spec(app, check=False):
+    """Write the rendered spec to ``spec_path``; with ``check`` only report whether it drifted.
+
+    Returns ``(path, up_to_date)``.
+    """
+    path = spec_path(app)
+    rendered = render_spec(app)
+    current = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            current = f.read()
+    if check or current == rendered:
+        return path, current == rendered
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(rendered)
+    return path, True
+
+
+def init_static_spec(app, swagger):
+    """Serve /apispec.json from the exported file (with ETag) instead of introspecting routes."""
+    app.extensions['flasgger'] = swagger
+    if not app.config.get('OPENAPI_STATIC_SPEC'):
+        return
+
+    path = spec_path(app)
+    if not os.path.exists(path):
+        app.logger.warning('OPENAPI_STATIC_SPEC is set but %s is missing; '
+                           'falling back to runtime spec generation', path)
+        return
+
+    def static_apispec():
+        return send_file(path, mimetype='application/json', etag=True, conditional=True,
+                         max_age=300)
+
+    app.view_functions[SPEC_ENDPOINT] = static_apispec
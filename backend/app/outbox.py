@@ -0,0 +1,319 @@
+"""Transactional outbox for incident notifications.
+
+Status changes, assignments and resolutions call ``enqueue_notifications``
+before they commit, so an ``outbox_messages`` row exists exactly when the change
+does and the API never waits on a mail gateway or webhook. ``flask
+dispatch-notifications`` drains the table: for each channel it claims a batch
+under a lease, POSTs the batch to the channel's URL in one request, and records
+each delivered message as a ``Communication`` in the commit that marks it sent.
+Failed batches are retried with exponential backoff up to
+``OUTBOX_MAX_ATTEMPTS``; a ``Retry-After`` from the receiver pauses the channel.
+Delivery is at-least-once, so message ids are sent for receivers to deduplicate.
+
+Channels are configured with ``NOTIFICATION_CHANNELS``, e.g.::
+
+    {"slack": {"url": "https://hooks.example.com/T000/B000", "recipient": "#it-ops",
+               "events": ["status_changed", "resolved"],
+               "batch_size": 20, "rate_per_minute": 30}}
+
+``events`` defaults to all of ``NOTIFICATION_EVENTS``; a channel without a
+``url`` only logs its messages. Rate limits are enforced per dispatcher
+process, so run one dispatcher. ``flask notification-sink`` is a local HTTP
+receiver for trying this out.
+"""
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import groupby
+from operator import attrgetter
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from app.extensions import db
+from app.models.communication import Communication
+from app.models.outbox_message import OutboxMessage
+from app.tenancy import tenant_scope
+
+logger = logging.getLogger('app.outbox')
+
+NOTIFICATION_EVENTS = ('status_changed', 'assigned', 'resolved')
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def enqueue_notifications(incident, event, message, sent_by=None):
+    """Queue ``message`` on every channel subscribed to ``event``. The caller commits."""
+    rows = [
+        OutboxMessage(
+            incident_id=incident.id,
+            event=event,
+            channel=name,
+            recipient=channel.get('recipient'),
+            message=f'{incident.incident_number} {incident.title}: {message}',
+            sent_by=sent_by,
+            session_id=incident.session_id,
+        )
+        for name, channel in (current_app.config.get('NOTIFICATION_CHANNELS') or {}).items()
+        if event in channel.get('events', NOTIFICATION_EVENTS)
+    ]
+    db.session.add_all(rows)
+    return rows
+
+
+def _claimable(now):
+    return or_(
+        and_(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now),
+        # A batch whose lease lapsed belonged to a dispatcher that died mid-send
+        and_(OutboxMessage.status == 'sending', OutboxMessage.lease_expires_at <= now),
+    )
+
+
+def due_count():
+    """Messages that could be claimed right now, across all channels."""
+    return db.session.query(func.count(OutboxMessage.id)).filter(
+        _claimable(_now().isoformat())).scalar()
+
+
+def claim_batch(channel, limit, lease_seconds=60):
+    """Claim up to ``limit`` due messages on ``channel``, oldest first."""
+    now = _now().isoformat()
+    ids = [row.id for row in db.session.query(OutboxMessage.id).filter(
+        OutboxMessage.channel == channel, _claimable(now)
+    ).order_by(OutboxMessage.created_at).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+
+    token = str(uuid.uuid4())
+    db.session.execute(
+        db.update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ids), _claimable(now))
+        .values(status='sending', claim_token=token, attempts=OutboxMessage.attempts + 1,
+                lease_expires_at=(_now() + timedelta(seconds=lease_seconds)).isoformat())
+    )
+    db.session.commit()
+    return OutboxMessage.query.filter_by(claim_token=token).order_by(
+        OutboxMessage.created_at).all()
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, retry_after=None, permanent=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+def deliver(name, channel, messages, timeout=10):
+    """Send ``messages`` to the channel as one batch; raises DeliveryError on failure."""
+    url = channel.get('url')
+    if not url:
+        for m in messages:
+            logger.info('[%s] to %s: %s', name, m.recipient, m.message)
+        return
+
+    body = json.dumps({
+        'channel': name,
+        'messages': [{
+            'id': m.id,
+            'incident_id': m.incident_id,
+            'event': m.event,
+            'recipient': m.recipient,
+            'message': m.message,
+            'created_at': m.created_at,
+        } for m in messages],
+    }).encode('utf-8')
+    req = urllib.request.Request(url, data=body, method='POST', headers={
+        'Content-Type': 'application/json', **channel.get('headers', {}),
+    })
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        retry_after = exc.headers.get('Retry-After', '')
+        raise DeliveryError(
+            f'HTTP {exc.code} from {url}',
+            retry_after=float(retry_after) if retry_after.isdigit() else None,
+            # The receiver rejected the payload itself; sending it again will not help
+            permanent=400 <= exc.code < 500 and exc.code not in (408, 429),
+        ) from exc
+    except OSError as exc:
+        raise DeliveryError(f'{type(exc).__name__}: {exc}') from exc
+
+
+def mark_sent(messages):
+    """Record delivered messages as Communications and close them out in one commit."""
+    now = _now().isoformat()
+    for session_id, group in groupby(sorted(messages, key=attrgetter('session_id')),
+                                     key=attrgetter('session_id')):
+        # Flushed per tenant so each Communication lands in its tenant's partition
+        with tenant_scope(session_id):
+            for m in group:
+                communication = Communication(
+                    id=str(uuid.uuid4()),
+                    incident_id=m.incident_id,
+                    channel=m.channel,
+                    recipient=m.recipient,
+                    message=m.message,
+                    sent_at=now,
+                    sent_by=m.sent_by or 'Notification dispatcher',
+                    session_id=m.session_id,
+                )
+                db.session.add(communication)
+                m.status = 'sent'
+                m.sent_at = now
+                m.communication_id = communication.id
+                m.claim_token = m.lease_expires_at = m.last_error = None
+            db.session.flush()
+    db.session.commit()
+
+
+def mark_failed(messages, error, max_attempts=8, backoff_seconds=5, permanent=False):
+    """Schedule a retry for each message, or fail it once out of attempts."""
+    for m in messages:
+        m.last_error = error
+        m.claim_token = m.lease_expires_at = None
+        if permanent or m.attempts >= max_attempts:
+            m.status = 'failed'
+        else:
+            m.status = 'pending'
+            delay = backoff_seconds * 2 ** (m.attempts - 1)
+            m.next_attempt_at = (_now() + timedelta(seconds=delay)).isoformat()
+    db.session.commit()
+
+
+class TokenBucket:
+    """Allows ``rate_per_minute`` sends on average with bursts of up to ``capacity``."""
+
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def available(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return int(self.tokens)
+
+    def take(self, count):
+        self.tokens -= count
+
+
+class Dispatcher:
+    """Per-process delivery state: each channel's rate limit and Retry-After pause."""
+
+    def __init__(self, config):
+        self.config = config
+        self.channels = config.get('NOTIFICATION_CHANNELS') or {}
+        self.buckets = {
+            name: TokenBucket(channel['rate_per_minute'], self._batch_size(channel))
+            for name, channel in self.channels.items() if channel.get('rate_per_minute')
+        }
+        self.paused_until = {}
+
+    def _batch_size(self, channel):
+        return channel.get('batch_size', self.config.get('OUTBOX_BATCH_SIZE', 20))
+
+    def run_once(self):
+        """Send at most one batch per channel; returns the number of messages delivered."""
+        delivered = 0
+        for name, channel in self.channels.items():
+            if self.paused_until.get(name, 0) > time.monotonic():
+                continue
+            limit = self._batch_size(channel)
+            bucket = self.buckets.get(name)
+            if bucket is not None:
+                limit = min(limit, bucket.available())
+            if limit < 1:
+                continue
+
+            messages = claim_batch(name, limit, self.config.get('OUTBOX_LEASE_SECONDS', 60))
+            if not messages:
+                continue
+            if bucket is not None:
+                bucket.take(len(messages))
+            try:
+                deliver(name, channel, messages, self.config.get('OUTBOX_HTTP_TIMEOUT', 10))
+            except DeliveryError as exc:
+                logger.warning('Delivery of %d message(s) on %s failed: %s',
+                               len(messages), name, exc)
+                if exc.retry_after:
+                    self.paused_until[name] = time.monotonic() + exc.retry_after
+                mark_failed(messages, str(exc),
+                            max_attempts=self.config.get('OUTBOX_MAX_ATTEMPTS', 8),
+                            backoff_seconds=self.config.get('OUTBOX_RETRY_BACKOFF_SECONDS', 5),
+                            permanent=exc.permanent)
+                continue
+            mark_sent(messages)
+            delivered += len(messages)
+        return delivered
+
+
+def run_dispatcher(app, stop_event=None, burst=False):
+    """Deliver outbox messages until ``stop_event`` is set; returns the number delivered.
+
+    With ``burst`` it returns as soon as nothing is due.
+    """
+    stop_event = stop_event or threading.Event()
+    poll_interval = app.config.get('OUTBOX_POLL_INTERVAL', 1.0)
+    dispatcher = Dispatcher(app.config)
+    total = 0
+    while not stop_event.is_set():
+        with app.app_context():
+            delivered = dispatcher.run_once()
+            total += delivered
+            if not delivered and burst and not due_count():
+                return total
+        if not delivered:
+            stop_event.wait(poll_interval)
+    return total
+
+
+def make_sink_server(host='127.0.0.1', port=8025, fail_rate=0.0, delay=0.0, secret=None):
+    """A local HTTP receiver that prints notification and webhook batches.
+
+    ``fail_rate`` of requests get a 503. With ``secret``, webhook batches whose
+    signature does not verify get a 401.
+    """
+    from app.webhooks import sign
+
+    class SinkHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            timestamp = self.headers.get('X-ITL-Timestamp')
+            if secret and timestamp and not hmac.compare_digest(
+                    sign(secret, timestamp, body), self.headers.get('X-ITL-Signature', '')):
+                print(f'{self.path} bad signature', flush=True)
+                self.send_response(401)
+                self.end_headers()
+                return
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header('Retry-After', '1')
+                self.end_headers()
+                return
+            batch = json.loads(body or b'{}')
+            for m in batch.get('messages', []):
+                print(f"{self.path} [{batch.get('channel')}] {m['recipient']}: {m['message']}",
+                      flush=True)
+            for d in batch.get('deliveries', []):
+                print(f"{self.path} {d['incident']['incident_number']}: "
+                      f"{', '.join(e['type'] for e in d['events'])}", flush=True)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), SinkHandler)
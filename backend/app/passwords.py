@@ -0,0 +1,84 @@
+"""Password hashing with configurable cost, run off the request's thread.
+
+``PASSWORD_HASH_METHOD`` is a werkzeug method string such as
+``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``. Hashing and verification run
+in a per-worker pool of ``PASSWORD_HASH_THREADS`` native threads (gevent's
+``ThreadPool`` when the worker is monkey-patched), and OpenSSL's KDFs release the
+GIL, so under gevent the worker keeps serving other requests while a login
+hashes. At most ``PASSWORD_HASH_MAX_PENDING`` hash operations may run or wait
+per worker; a login that cannot get a place within
+``PASSWORD_HASH_QUEUE_TIMEOUT`` gets a 503. Hashes stored with other
+parameters are replaced at the user's next successful login.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.errors import ServiceUnavailableError
+
+EXTENSION_KEY = 'password_hasher'
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt:32768:8:1', threads=2, max_pending=16, queue_timeout=5.0):
+        self.method = method
+        self.threads = threads
+        self.queue_timeout = queue_timeout
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._method_prefix = None
+
+    def _get_pool(self):
+        # Created on first use so each forked gunicorn worker gets its own threads
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if _gevent_patched():
+                        from gevent.threadpool import ThreadPool
+                        self._pool = ThreadPool(self.threads)
+                    else:
+                        self._pool = ThreadPoolExecutor(self.threads,
+                                                        thread_name_prefix='password-hash')
+        return self._pool
+
+    def _run(self, func, *args):
+        if not self._pending.acquire(timeout=self.queue_timeout):
+            raise ServiceUnavailableError('Too many logins in progress, please retry shortly')
+        try:
+            pool = self._get_pool()
+            if isinstance(pool, ThreadPoolExecutor):
+                return pool.submit(func, *args).result()
+            return pool.apply(func, args)
+        finally:
+            self._pending.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Whether ``stored_hash`` was made with parameters other than ``method``."""
+        if self._method_prefix is None:
+            # werkzeug fills in defaults ("scrypt" -> "scrypt:32768:8:1"); compare expanded forms
+            self._method_prefix = self._run(
+                generate_password_hash, '', self.method).split('$', 1)[0]
+        return stored_hash.split('$', 1)[0] != self._method_prefix
+
+
+def init_password_hasher(app):
+    app.extensions[EXTENSION_KEY] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+        threads=app.config.get('PASSWORD_HASH_THREADS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 16),
+        queue_timeout=app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5.0),
+    )
@@ -0,0 +1,130 @@
+"""Query budget and N+1 guard for development, testing and CI.
+
+When ``QUERY_GUARD_ENABLED`` is set, every statement a request executes is
+recorded by shape (whitespace collapsed, IN lists folded). Once the response
+has been fully sent (so streamed bodies count too) the request is checked
+against:
+
+* ``QUERY_BUDGETS`` - the maximum statements per endpoint, and
+* ``N_PLUS_ONE_THRESHOLD`` - the most times one statement shape may repeat.
+
+Violations are logged and appended to ``violations`` so ``flask
+check-query-budgets`` (or a test) can fail on them.
+"""
+import logging
+import re
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger('app.query_guard')
+
+# Upper bounds per endpoint, independent of data volume. Raise deliberately.
+QUERY_BUDGETS = {
+    'auth.login': 2,
+    'auth.me': 1,
+    'health_check': 0,
+    'dashboard.get_dashboard': 14,
+    'incidents.list_incidents': 3,
+    'incidents.create_incident': 10,
+    'incidents.get_incident': 8,
+    'incidents.update_incident': 8,
+    # These three include the outbox insert made when notification channels are configured
+    'incidents.update_status': 6,
+    'incidents.assign_incident': 6,
+    'incidents.resolve_incident': 8,
+    'incidents.get_report': 7,
+    'incidents.get_similar_incidents': 7,
+    # Timeline and dashboard lookups go through the header cache; these are the cold-cache counts
+    'timeline.list_timeline': 2,
+    'timeline.create_timeline_entry': 5,
+    'problems.list_problems': 2,
+    'problems.create_problem': 4,
+    'problems.get_problem': 2,
+    'problems.update_problem': 3,
+    'problems.link_incident': 7,
+    'problems.link_incidents': 7,
+    'problems.get_problem_candidates': 8,
+    'sla.list_sla_targets': 1,
+    'sla.get_sla_compliance': 7,
+    'internal_metrics.get_internal_metrics': 0,
+    'jobs.create_job': 2,
+    'jobs.get_job': 1,
+    'jobs.get_job_result': 1,
+    'webhooks.create_webhook': 2,
+    'webhooks.list_webhooks': 1,
+    'webhooks.get_webhook': 1,
+    'webhooks.delete_webhook': 3,
+    'webhooks.list_deliveries': 2,
+}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IN_LIST_RE = re.compile(r'IN \((?:\?|%\(\w+\)s|%s|:\w+)(?:, (?:\?|%\(\w+\)s|%s|:\w+))*\)')
+
+violations = []
+# endpoint -> statements run by its most recent request (for reporting)
+last_counts = {}
+
+
+def statement_shape(statement):
+    """Normalize a SQL statement so repeated executions with different values compare equal."""
+    shape = _WHITESPACE_RE.sub(' ', statement).strip()
+    return _IN_LIST_RE.sub('IN (?)', shape)
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        shapes = g.get('query_shapes')
+        if shapes is None:
+            shapes = g.query_shapes = Counter()
+        shapes[statement_shape(statement)] += 1
+
+
+def check_request(endpoint, method, shapes, budgets, default_budget, repeat_threshold):
+    """Return a list of violation messages for one request's statement shapes."""
+    problems = []
+    total = sum(shapes.values())
+    budget = budgets.get(endpoint, default_budget)
+    if budget is not None and total > budget:
+        problems.append(f'{method} {endpoint} ran {total} queries (budget {budget})')
+    for shape, count in shapes.items():
+        if count > repeat_threshold:
+            problems.append(
+                f'{method} {endpoint} repeated a statement {count} times (possible N+1): {shape[:200]}'
+            )
+    return problems
+
+
+def init_query_guard(app):
+    if not app.config.get('QUERY_GUARD_ENABLED'):
+        return
+
+    from app.extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'after_cursor_execute', _record)
+
+    budgets = dict(QUERY_BUDGETS, **(app.config.get('QUERY_BUDGETS') or {}))
+    default_budget = app.config.get('QUERY_BUDGET_DEFAULT')
+    repeat_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+
+    @app.before_request
+    def _reset_shapes():
+        g.query_shapes = Counter()
+
+    @app.after_request
+    def _check_on_close(response):
+        shapes = g.query_shapes
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+
+        def _check():
+            last_counts[endpoint] = sum(shapes.values())
+            for message in check_request(endpoint, method, shapes, budgets,
+                                         default_budget, repeat_threshold):
+                violations.append(message)
+                logger.warning(message)
+
+        response.call_on_close(_check)
+        return response
@@ -9,6 +9,9 @@ from app.models.problem import Problem
 from app.models.communication import Communication
 from app.models.sla_target import SLATarget
 from app.services.incident_number import IncidentCounter
+from app.services.similarity import rebuild_index
+from app.services.tags import backfill_tags
+from app.services.users import ensure_demo_users
 
 # Deterministic namespace for uuid5
 NS = uuid.UUID('a1b2c3d4-e5f6-7890-abcd-ef1234567890')
@@ -921,6 +924,11 @@ def seed():
     for c in comms:
         db.session.add(c)
 
+    db.session.flush()
+    rebuild_index(session_id)
+    backfill_tags(session_id)
+    ensure_demo_users()
+
     db.session.commit()
     print('Seed data loaded: 9 incidents, 2 problems, 4 SLA targets, '
           '37 timeline entries, 8 assets, 2 responders, 4 communications')
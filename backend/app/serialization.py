@@ -0,0 +1,119 @@
+"""Response serialization helpers: column projection, streaming and the fast JSON provider."""
+import time
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from app.errors import BadRequestError
+from app.instrumentation import record_serialization
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            response = super().response(*args, **kwargs)
+        else:
+            obj = self._prepare_response_obj(args, kwargs)
+            response = self._app.response_class(self._orjson_dumps(obj), mimetype=self.mimetype)
+        record_serialization(time.perf_counter() - started)
+        return response
+
+    def _orjson_dumps(self, obj):
+        # Datetimes go through Flask's default so output matches the stdlib provider
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
+def init_json_provider(app):
+    app.json = FastJSONProvider(app)
+
+
+VALID_VIEWS = {'summary', 'full'}
+
+
+def wants_full_view(view_param):
+    """True when a list endpoint was asked for ``view=full`` instead of the summary."""
+    view = view_param or 'summary'
+    if view not in VALID_VIEWS:
+        raise BadRequestError(f'Invalid view. Must be one of: {", ".join(sorted(VALID_VIEWS))}')
+    return view == 'full'
+
+
+def parse_fields(model, fields_param):
+    """Resolve a ``fields=a,b,c`` parameter to model columns, or None for the full representation.
+
+    ``id`` is always included so projected rows stay addressable.
+    """
+    if not fields_param:
+        return None
+    columns = model.__table__.columns
+    names = ['id']
+    for name in fields_param.split(','):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in columns:
+            raise BadRequestError(f'Unknown field: {name}')
+        names.append(name)
+    return [columns[name] for name in names]
+
+
+def rows_to_dicts(rows, columns):
+    """Turn projected row tuples into dicts without hydrating ORM objects."""
+    keys = [c.key for c in columns]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class JSONArrayStream:
+    """Marks an iterable to be encoded item by item as a JSON array by ``stream_json``."""
+
+    def __init__(self, iterable, serialize=None):
+        self.iterable = iterable
+        self.serialize = serialize
+
+
+def _iter_json(obj, dumps, sort_keys):
+    if isinstance(obj, JSONArrayStream):
+        yield '['
+        first = True
+        for item in obj.iterable:
+            if obj.serialize is not None:
+                item = obj.serialize(item)
+            yield dumps(item) if first else ',' + dumps(item)
+            first = False
+        yield ']'
+    elif isinstance(obj, dict) and any(isinstance(v, JSONArrayStream) for v in obj.values()):
+        yield '{'
+        keys = sorted(obj) if sort_keys else list(obj)
+        for index, key in enumerate(keys):
+            yield ('' if index == 0 else ',') + dumps(str(key)) + ':'
+            yield from _iter_json(obj[key], dumps, sort_keys)
+        yield '}'
+    else:
+        yield dumps(obj)
+
+
+def stream_json(obj, status=200):
+    """Build a chunked JSON response, encoding any ``JSONArrayStream`` values lazily.
+
+    Large arrays are produced from their iterables (e.g. a ``yield_per`` query)
+    while the response is written, so the full payload is never held in memory.
+    """
+    provider = current_app.json
+    chunks = _iter_json(obj, provider.dumps, provider.sort_keys)
+    return current_app.response_class(
+        stream_with_context(chunks), status=status, mimetype=provider.mimetype
+    )
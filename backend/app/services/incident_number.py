@@ -47,3 +47,15 @@ def generate_problem_number():
     db.session.flush()
 
     return f'PRB-{year}-{counter.last_number:04d}'
+
+
+def reserve_numbers(counter_type, year, count):
+    """Advance the yearly counter by ``count`` and return the first number of the block."""
+    counter = IncidentCounter.query.filter_by(counter_type=counter_type, year=year).first()
+    if counter is None:
+        counter = IncidentCounter(counter_type=counter_type, year=year, last_number=0)
+        db.session.add(counter)
+    first = counter.last_number + 1
+    counter.last_number += count
+    db.session.flush()
+    return first
@@ -107,3 +107,69 @@ def calculate_sla_compliance(session_id='__default__'):
                 compliant += 1
 
     return round((compliant / total) * 100.0, 1) if total > 0 else 100.0
+
+
+class MetricsAccumulator:
+    """Single-pass MTTR/MTTA/SLA for one session, fed one incident at a time.
+
+    Gives the same results as ``calculate_mttr``, ``calculate_mtta`` and
+    ``calculate_sla_compliance`` without loading the session's incidents three
+    times. ``resolution_targets`` maps severity to resolution target minutes.
+    """
+
+    def __init__(self, resolution_targets):
+        self.resolution_targets = resolution_targets
+        self.incidents = 0
+        self.resolved = 0
+        self.resolve_hours = 0.0
+        self.resolve_count = 0
+        self.ack_minutes = 0.0
+        self.ack_count = 0
+        self.sla_total = 0
+        self.sla_compliant = 0
+
+    def add(self, severity, status, reported_at, acknowledged_at, resolved_at):
+        self.incidents += 1
+        reported = _parse_dt(reported_at)
+
+        if reported_at is not None and acknowledged_at is not None:
+            ack = _parse_dt(acknowledged_at)
+            if reported and ack:
+                diff = (ack - reported).total_seconds() / 60.0
+                if diff >= 0:
+                    self.ack_minutes += diff
+                    self.ack_count += 1
+
+        if status not in ('resolved', 'closed') or reported_at is None or resolved_at is None:
+            return
+        self.resolved += 1
+        resolved_dt = _parse_dt(resolved_at)
+        minutes = None
+        if reported and resolved_dt:
+            minutes = (resolved_dt - reported).total_seconds() / 60.0
+            if minutes >= 0:
+                self.resolve_hours += minutes / 60.0
+                self.resolve_count += 1
+
+        target = self.resolution_targets.get(severity)
+        if not target:
+            self.sla_compliant += 1
+            self.sla_total += 1
+        elif minutes is not None:
+            self.sla_total += 1
+            if minutes <= target:
+                self.sla_compliant += 1
+
+    def result(self):
+        if not self.resolution_targets or not self.sla_total:
+            sla_pct = 100.0
+        else:
+            sla_pct = round((self.sla_compliant / self.sla_total) * 100.0, 1)
+        return {
+            'incident_count': self.incidents,
+            'resolved_count': self.resolved,
+            'mttr_hours': round(self.resolve_hours / self.resolve_count, 2)
+            if self.resolve_count else 0.0,
+            'mtta_minutes': round(self.ack_minutes / self.ack_count, 2) if self.ack_count else 0.0,
+            'sla_compliance_pct': sla_pct,
+        }
@@ -0,0 +1,125 @@
+"""Report builders shared by the API views and background jobs."""
+import csv
+import io
+from datetime import datetime, timezone
+from app.models.incident import Incident
+from app.models.sla_target import SLATarget
+from app.models.timeline_entry import TimelineEntry
+from app.services.metrics import calculate_sla_compliance, _parse_dt
+
+EXPORT_COLUMNS = [
+    'incident_number', 'title', 'severity', 'category', 'status', 'reported_at',
+    'acknowledged_at', 'resolved_at', 'closed_at', 'reported_by', 'assigned_to',
+    'resolved_by', 'users_affected', 'business_impact', 'problem_id', 'tags',
+]
+
+
+def incident_report(incident, timeline=None):
+    """Post-incident report for ``incident``.
+
+    ``timeline`` defaults to a fully loaded list; the API passes a lazy
+    ``JSONArrayStream`` instead so long timelines are streamed.
+    """
+    if timeline is None:
+        timeline = [
+            e.to_dict()
+            for e in incident.timeline_entries.order_by(TimelineEntry.created_at.asc())
+        ]
+    assets = [a.to_dict() for a in incident.assets.all()]
+    responders = [r.to_dict() for r in incident.responders.all()]
+    communications = [c.to_dict() for c in incident.communications.all()]
+
+    # Calculate duration
+    duration_hours = None
+    if incident.reported_at and incident.resolved_at:
+        try:
+            reported = _parse_dt(incident.reported_at)
+            resolved = _parse_dt(incident.resolved_at)
+            if reported and resolved:
+                duration_hours = round((resolved - reported).total_seconds() / 3600.0, 2)
+        except Exception:
+            pass
+
+    return {
+        'incident': incident.to_dict(),
+        'timeline': timeline,
+        'affected_assets': assets,
+        'responders': responders,
+        'communications': communications,
+        'duration_hours': duration_hours,
+        'problem': incident.problem.to_dict() if incident.problem else None,
+        'report_generated_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def sla_compliance_report(session_id='__default__'):
+    """Overall and per-severity SLA compliance with the breached incidents listed."""
+    sla_targets = {
+        t.severity: t for t in SLATarget.query.filter_by(session_id=session_id).all()
+    }
+
+    # Overall compliance
+    overall_pct = calculate_sla_compliance(session_id)
+
+    # Per-severity compliance
+    per_severity = []
+    for severity in ['critical', 'high', 'medium', 'low']:
+        target = sla_targets.get(severity)
+        if not target:
+            continue
+
+        resolved = Incident.query.filter(
+            Incident.session_id == session_id,
+            Incident.severity == severity,
+            Incident.status.in_(['resolved', 'closed']),
+            Incident.reported_at.isnot(None),
+            Incident.resolved_at.isnot(None),
+        ).all()
+
+        total = 0
+        compliant = 0
+        breached_incidents = []
+        for inc in resolved:
+            reported = _parse_dt(inc.reported_at)
+            resolved_dt = _parse_dt(inc.resolved_at)
+            if reported and resolved_dt:
+                diff_minutes = (resolved_dt - reported).total_seconds() / 60.0
+                total += 1
+                if diff_minutes <= target.resolution_target_minutes:
+                    compliant += 1
+                else:
+                    breached_incidents.append({
+                        'incident_number': inc.incident_number,
+                        'title': inc.title,
+                        'resolution_minutes': round(diff_minutes, 1),
+                        'target_minutes': target.resolution_target_minutes,
+                    })
+
+        pct = round((compliant / total) * 100.0, 1) if total > 0 else 100.0
+
+        per_severity.append({
+            'severity': severity,
+            'response_target_minutes': target.response_target_minutes,
+            'resolution_target_minutes': target.resolution_target_minutes,
+            'total_incidents': total,
+            'compliant': compliant,
+            'breached': total - compliant,
+            'compliance_pct': pct,
+            'breached_incidents': breached_incidents,
+        })
+
+    return {
+        'overall_compliance_pct': overall_pct,
+        'per_severity': per_severity,
+    }
+
+
+def incidents_csv(query):
+    """Render the incidents matched by ``query`` as CSV text, streaming rows from the DB."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    columns = [getattr(Incident, name) for name in EXPORT_COLUMNS]
+    for row in query.with_entities(*columns).order_by(Incident.reported_at.desc()).yield_per(1000):
+        writer.writerow(row)
+    return buffer.getvalue()
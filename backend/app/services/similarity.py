@@ -0,0 +1,236 @@
+"""Incident similarity search backed by a persistent TF-IDF inverted index.
+
+Each incident's title/description/root_cause is tokenized into ``IncidentTerm``
+postings when it is created or its text changes, so suggestions only touch the
+postings of the query's most distinctive terms instead of comparing every
+incident in the session.
+"""
+import math
+import re
+from collections import Counter
+from sqlalchemy import func
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.incident_asset import IncidentAsset
+from app.models.incident_term import IncidentTerm
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'was', 'were', 'are', 'has', 'have', 'had', 'not',
+    'but', 'from', 'this', 'that', 'these', 'those', 'into', 'onto', 'our', 'all',
+    'any', 'can', 'after', 'before', 'when', 'due', 'been', 'being', 'its', 'via',
+    'out', 'per', 'who', 'which', 'will', 'would', 'could', 'should', 'than', 'then',
+}
+INDEXED_FIELDS = ('title', 'description', 'root_cause')
+TITLE_BOOST = 2
+
+QUERY_TERMS = 24          # most distinctive query terms looked up in the index
+MAX_DF_RATIO = 0.1        # terms in more than this share of incidents are ignored
+MIN_DOCS_FOR_DF_CUTOFF = 50
+ASSET_WEIGHT = 0.3
+CATEGORY_WEIGHT = 0.1
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords and very short tokens removed."""
+    if not text:
+        return []
+    return [
+        t for t in TOKEN_RE.findall(text.lower())
+        if len(t) > 2 and t not in STOPWORDS and len(t) <= 50
+    ]
+
+
+def term_weights(title=None, description=None, root_cause=None):
+    """L2-normalized term frequencies for a document (title terms boosted)."""
+    counts = Counter()
+    for token in tokenize(title):
+        counts[token] += TITLE_BOOST
+    counts.update(tokenize(description))
+    counts.update(tokenize(root_cause))
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    if not norm:
+        return {}
+    return {term: c / norm for term, c in counts.items()}
+
+
+def index_incident(incident):
+    """Replace an incident's postings. The caller is responsible for committing."""
+    IncidentTerm.query.filter_by(incident_id=incident.id).delete(synchronize_session=False)
+    weights = term_weights(incident.title, incident.description, incident.root_cause)
+    db.session.add_all([
+        IncidentTerm(
+            incident_id=incident.id,
+            term=term,
+            weight=weight,
+            session_id=incident.session_id,
+        )
+        for term, weight in weights.items()
+    ])
+
+
+def text_fields_changed(data):
+    """True if an update payload touches any field that feeds the index."""
+    return any(field in data for field in INDEXED_FIELDS)
+
+
+def rebuild_index(session_id=None):
+    """Rebuild postings for every incident (optionally one session). Returns incidents indexed."""
+    delete_query = IncidentTerm.query
+    source = db.session.query(
+        Incident.id, Incident.title, Incident.description, Incident.root_cause, Incident.session_id
+    )
+    if session_id is not None:
+        delete_query = delete_query.filter_by(session_id=session_id)
+        source = source.filter(Incident.session_id == session_id)
+    delete_query.delete(synchronize_session=False)
+
+    count = 0
+    batch = []
+    for row in source.yield_per(1000):
+        weights = term_weights(row.title, row.description, row.root_cause)
+        batch.extend(
+            {'incident_id': row.id, 'term': term, 'weight': weight, 'session_id': row.session_id}
+            for term, weight in weights.items()
+        )
+        count += 1
+        if len(batch) >= 5000:
+            db.session.execute(IncidentTerm.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(IncidentTerm.__table__.insert(), batch)
+    return count
+
+
+def _score_candidates(session_id, weights, asset_ids, exclude_ids, unlinked_only=False):
+    """Return {incident_id: (score, shared_terms, shared_assets)} from the index.
+
+    With ``unlinked_only`` incidents already linked to a problem are left out.
+    """
+    scores = {}
+
+    if weights:
+        total_docs = db.session.query(func.count(Incident.id)).filter(
+            Incident.session_id == session_id
+        ).scalar() or 0
+        doc_freq = dict(
+            db.session.query(IncidentTerm.term, func.count(IncidentTerm.incident_id))
+            .filter(IncidentTerm.session_id == session_id, IncidentTerm.term.in_(list(weights)))
+            .group_by(IncidentTerm.term)
+            .all()
+        )
+        max_df = total_docs * MAX_DF_RATIO if total_docs >= MIN_DOCS_FOR_DF_CUTOFF else None
+
+        idf = {}
+        for term, df in doc_freq.items():
+            if max_df is not None and df > max_df:
+                continue
+            idf[term] = math.log((1 + total_docs) / (1 + df)) + 1.0
+
+        query_terms = sorted(idf, key=lambda t: weights[t] * idf[t], reverse=True)[:QUERY_TERMS]
+        query_norm = math.sqrt(sum((weights[t] * idf[t]) ** 2 for t in query_terms)) or 1.0
+
+        if query_terms:
+            postings = db.session.query(
+                IncidentTerm.incident_id, IncidentTerm.term, IncidentTerm.weight
+            ).filter(
+                IncidentTerm.session_id == session_id,
+                IncidentTerm.term.in_(query_terms),
+            )
+            if unlinked_only:
+                postings = postings.join(Incident, Incident.id == IncidentTerm.incident_id) \
+                    .filter(Incident.problem_id.is_(None))
+            for incident_id, term, weight in postings:
+                if incident_id in exclude_ids:
+                    continue
+                entry = scores.setdefault(incident_id, [0.0, [], []])
+                entry[0] += weights[term] * weight * idf[term] ** 2 / query_norm
+                entry[1].append(term)
+
+    if asset_ids:
+        shared = db.session.query(
+            IncidentAsset.incident_id, IncidentAsset.asset_tracker_id
+        ).filter(
+            IncidentAsset.session_id == session_id,
+            IncidentAsset.asset_tracker_id.in_(list(asset_ids)),
+        )
+        if unlinked_only:
+            shared = shared.join(Incident, Incident.id == IncidentAsset.incident_id) \
+                .filter(Incident.problem_id.is_(None))
+        for incident_id, asset_tracker_id in shared.distinct():
+            if incident_id in exclude_ids:
+                continue
+            entry = scores.setdefault(incident_id, [0.0, [], []])
+            entry[0] += ASSET_WEIGHT
+            entry[2].append(asset_tracker_id)
+
+    return scores
+
+
+def _rank(session_id, weights, asset_ids, category, exclude_ids, limit, summary,
+          unlinked_only=False):
+    scores = _score_candidates(session_id, weights, asset_ids, exclude_ids, unlinked_only)
+    if not scores:
+        return []
+
+    # Hydrate only a shortlist; the category bonus can reorder but never add candidates
+    shortlist = sorted(scores, key=lambda i: scores[i][0], reverse=True)[:limit * 3]
+    query = Incident.query.filter(
+        Incident.session_id == session_id,
+        Incident.id.in_(shortlist),
+    )
+    if summary:
+        query = query.options(Incident.summary_load_options())
+    incidents = query.all()
+
+    results = []
+    for incident in incidents:
+        score, shared_terms, shared_assets = scores[incident.id]
+        same_category = bool(category) and incident.category == category
+        if same_category:
+            score += CATEGORY_WEIGHT
+        results.append({
+            'incident': incident,
+            'score': round(score, 4),
+            'shared_terms': sorted(shared_terms),
+            'shared_assets': sorted(shared_assets),
+            'same_category': same_category,
+        })
+    results.sort(key=lambda r: r['score'], reverse=True)
+    return results[:limit]
+
+
+def _asset_ids_for(session_id, incident_ids):
+    if not incident_ids:
+        return set()
+    rows = db.session.query(IncidentAsset.asset_tracker_id).filter(
+        IncidentAsset.session_id == session_id,
+        IncidentAsset.incident_id.in_(list(incident_ids)),
+        IncidentAsset.asset_tracker_id.isnot(None),
+    ).distinct().all()
+    return {r[0] for r in rows}
+
+
+def similar_incidents(incident, limit=10, summary=False):
+    """Rank incidents in the same session that resemble ``incident``."""
+    weights = term_weights(incident.title, incident.description, incident.root_cause)
+    asset_ids = _asset_ids_for(incident.session_id, [incident.id])
+    return _rank(incident.session_id, weights, asset_ids, incident.category,
+                 {incident.id}, limit, summary)
+
+
+def problem_candidates(problem, limit=10, summary=False):
+    """Rank unlinked incidents that likely belong to ``problem``."""
+    session_id = problem.session_id
+    linked = db.session.query(Incident.id, Incident.category).filter(
+        Incident.session_id == session_id,
+        Incident.problem_id == problem.id,
+    ).all()
+    linked_ids = {row.id for row in linked}
+    categories = Counter(row.category for row in linked if row.category)
+    category = categories.most_common(1)[0][0] if categories else None
+
+    weights = term_weights(problem.title, problem.description, problem.root_cause)
+    asset_ids = _asset_ids_for(session_id, linked_ids)
+    return _rank(session_id, weights, asset_ids, category, linked_ids, limit, summary,
+                 unlinked_only=True)
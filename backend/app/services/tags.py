@@ -0,0 +1,109 @@
+"""Keep the normalized ``incident_tags`` table in sync with ``Incident.tags``."""
+import json
+from sqlalchemy import func
+from app.errors import BadRequestError
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.incident_tag import IncidentTag
+
+MAX_TAG_LENGTH = 100
+
+
+def parse_tags(raw):
+    """Normalize a tags value (JSON list string, comma-separated string or list) to tag names."""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw.split(',')
+        else:
+            if isinstance(value, str):
+                value = value.split(',')
+            elif not isinstance(value, list):
+                value = [value]
+    elif isinstance(raw, (list, tuple)):
+        value = raw
+    else:
+        return []
+
+    tags = []
+    for item in value:
+        if item is None:
+            continue
+        tag = str(item).strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def serialize_tags(raw):
+    """The JSON list string the tags column holds, from a list of tag names or a JSON
+    list / comma-separated string (normalized through ``parse_tags``); None stores no
+    tags. Other types, and lists with non-string items, are a BadRequestError."""
+    if raw is None:
+        return '[]'
+    if isinstance(raw, str):
+        return json.dumps(parse_tags(raw))
+    if not isinstance(raw, (list, tuple)) or not all(isinstance(tag, str) for tag in raw):
+        raise BadRequestError('tags must be a list of strings or a comma-separated string')
+    return json.dumps(list(raw))
+
+
+def sync_incident_tags(incident):
+    """Replace an incident's tag rows from its ``tags`` column. The caller commits."""
+    IncidentTag.query.filter_by(incident_id=incident.id).delete(synchronize_session=False)
+    db.session.add_all([
+        IncidentTag(incident_id=incident.id, tag=tag, session_id=incident.session_id)
+        for tag in parse_tags(incident.tags)
+    ])
+
+
+def filter_by_tags(query, session_id, tags):
+    """Restrict an incident query to incidents carrying every tag in ``tags``."""
+    tags = parse_tags(tags)
+    if not tags:
+        return query
+    matching = db.session.query(IncidentTag.incident_id).filter(
+        IncidentTag.session_id == session_id,
+        IncidentTag.tag.in_(tags),
+    ).group_by(IncidentTag.incident_id).having(
+        func.count(IncidentTag.tag) == len(tags)
+    )
+    return query.filter(Incident.id.in_(matching))
+
+
+def tag_counts(session_id, limit=20):
+    """Most used tags in a session as ``[(tag, count), ...]``."""
+    return db.session.query(IncidentTag.tag, func.count(IncidentTag.incident_id)).filter(
+        IncidentTag.session_id == session_id,
+    ).group_by(IncidentTag.tag).order_by(
+        func.count(IncidentTag.incident_id).desc(), IncidentTag.tag
+    ).limit(limit).all()
+
+
+def backfill_tags(session_id=None):
+    """Rebuild tag rows from the JSON tags column. Returns the number of tag rows written."""
+    delete_query = IncidentTag.query
+    source = db.session.query(Incident.id, Incident.tags, Incident.session_id)
+    if session_id is not None:
+        delete_query = delete_query.filter_by(session_id=session_id)
+        source = source.filter(Incident.session_id == session_id)
+    delete_query.delete(synchronize_session=False)
+
+    written = 0
+    batch = []
+    for row in source.yield_per(1000):
+        batch.extend(
+            {'incident_id': row.id, 'tag': tag, 'session_id': row.session_id}
+            for tag in parse_tags(row.tags)
+        )
+        if len(batch) >= 5000:
+            db.session.execute(IncidentTag.__table__.insert(), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(IncidentTag.__table__.insert(), batch)
+        written += len(batch)
+    return written
@@ -0,0 +1,41 @@
+"""User store: indexed lookups by username and id, seeded with the demo users."""
+from flask import current_app
+from app.extensions import db
+from app.models.user import User
+from app.passwords import EXTENSION_KEY as PASSWORD_HASHER
+
+
+def get_by_username(username):
+    return User.query.filter_by(username=username, active=1).first()
+
+
+def get_by_id(user_id):
+    user = db.session.get(User, user_id)
+    return user if user is not None and user.active else None
+
+
+def create_user(username, password, role='responder', name=None):
+    """Add a user with a freshly hashed password. The caller commits."""
+    user = User(username=username,
+                password_hash=current_app.extensions[PASSWORD_HASHER].hash(password),
+                role=role, name=name)
+    db.session.add(user)
+    return user
+
+
+def ensure_demo_users():
+    """Add any missing ``DEMO_USERS`` with their precomputed hashes; returns how many.
+
+    The caller commits.
+    """
+    from app.api.auth import DEMO_USERS
+    existing = {row[0] for row in db.session.query(User.username)}
+    added = 0
+    for demo in DEMO_USERS.values():
+        if demo['username'] in existing:
+            continue
+        db.session.add(User(id=demo['id'], username=demo['username'],
+                            password_hash=demo['password'], role=demo['role'],
+                            name=demo['name']))
+        added += 1
+    return added
@@ -0,0 +1,277 @@
+"""Shared-database demo sessions.
+
+With ``DEMO_SESSION_MODE = 'shared'`` demo sessions live in the main database,
+isolated by the ``session_id`` column every table already carries, instead of
+each session getting its own copy of the SQLite file. Creating a session only
+inserts a ``DemoSession`` row; the template session's seed rows are cloned into
+it on the first request that uses it, so idle sessions cost one row and disk
+usage grows with the data users actually create.
+
+In the default file-copy mode the sessions' data lives in their own files, but
+their last access is still recorded in ``DemoSession.last_seen_at`` so the
+reaper ages both kinds of session by the same marker.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import request
+from sqlalchemy.exc import IntegrityError
+from app.db_routing import request_session_id
+from app.extensions import db
+from app.models.communication import Communication
+from app.models.demo_session import DemoSession
+from app.models.incident import Incident
+from app.models.incident_asset import IncidentAsset
+from app.models.incident_responder import IncidentResponder
+from app.models.incident_tag import IncidentTag
+from app.models.incident_term import IncidentTerm
+from app.models.problem import Problem
+from app.models.sla_target import SLATarget
+from app.models.timeline_entry import TimelineEntry
+from app.services.incident_number import reserve_numbers
+
+# Child tables copied with their incident_id remapped; the flag says whether they
+# have their own surrogate ``id`` that needs a fresh UUID.
+INCIDENT_CHILD_TABLES = (
+    (TimelineEntry.__table__, True),
+    (IncidentAsset.__table__, True),
+    (IncidentResponder.__table__, True),
+    (Communication.__table__, True),
+    (IncidentTerm.__table__, False),
+    (IncidentTag.__table__, False),
+)
+TOUCH_INTERVAL_SECONDS = 60
+MAX_TRACKED_SESSIONS = 10000
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _select_rows(table, session_id):
+    result = db.session.execute(table.select().where(table.c.session_id == session_id))
+    return [dict(row._mapping) for row in result]
+
+
+def _insert(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def clone_session_rows(source, target):
+    """Copy every row of session ``source`` into ``target`` with new ids and numbers.
+
+    Incident and problem numbers are globally unique, so the copies get a fresh
+    block from the yearly counters. The caller is responsible for committing.
+    Returns a dict of rows copied per table.
+    """
+    year = _now().year
+    counts = {}
+
+    sla_rows = _select_rows(SLATarget.__table__, source)
+    for row in sla_rows:
+        row.update(id=str(uuid.uuid4()), session_id=target)
+    _insert(SLATarget.__table__, sla_rows)
+    counts['sla_targets'] = len(sla_rows)
+
+    problem_rows = _select_rows(Problem.__table__, source)
+    problem_ids = {}
+    if problem_rows:
+        first = reserve_numbers('problem', year, len(problem_rows))
+        for n, row in enumerate(problem_rows):
+            problem_ids[row['id']] = str(uuid.uuid4())
+            row.update(id=problem_ids[row['id']], problem_number=f'PRB-{year}-{first + n:04d}',
+                       session_id=target)
+    _insert(Problem.__table__, problem_rows)
+    counts['problems'] = len(problem_rows)
+
+    incident_rows = _select_rows(Incident.__table__, source)
+    incident_ids = {}
+    if incident_rows:
+        first = reserve_numbers('incident', year, len(incident_rows))
+        for n, row in enumerate(incident_rows):
+            incident_ids[row['id']] = str(uuid.uuid4())
+            row.update(id=incident_ids[row['id']], incident_number=f'INC-{year}-{first + n:04d}',
+                       problem_id=problem_ids.get(row['problem_id']), session_id=target)
+    _insert(Incident.__table__, incident_rows)
+    counts['incidents'] = len(incident_rows)
+
+    for table, has_id in INCIDENT_CHILD_TABLES:
+        rows = []
+        for row in _select_rows(table, source):
+            incident_id = incident_ids.get(row['incident_id'])
+            if incident_id is None:
+                continue
+            row.update(incident_id=incident_id, session_id=target)
+            if has_id:
+                row['id'] = str(uuid.uuid4())
+            rows.append(row)
+        _insert(table, rows)
+        counts[table.name] = len(rows)
+
+    return counts
+
+
+class SharedSessionManager:
+    """Creates demo sessions as ``DemoSession`` rows and provisions them lazily."""
+
+    def __init__(self, template_session='__default__', ttl_seconds=4 * 3600):
+        self.template_session = template_session
+        self.ttl_seconds = ttl_seconds
+        # session_id -> monotonic time of the last touch (per worker)
+        self._touched = {}
+        # Sessions this worker has seen provisioned
+        self._ready = set()
+
+    def _expiry(self):
+        return (_now() + timedelta(seconds=self.ttl_seconds)).isoformat()
+
+    def create_session(self, session_id=None):
+        """Register a new session. O(1): no rows are copied until it is first used."""
+        session = DemoSession(id=session_id or uuid.uuid4().hex, expires_at=self._expiry())
+        db.session.add(session)
+        db.session.commit()
+        self._touched.pop(session.id, None)
+        self._ready.discard(session.id)
+        return session.id
+
+    def get_session(self, session_id):
+        """Return the live ``DemoSession`` for ``session_id`` or None if unknown or expired."""
+        return DemoSession.query.filter(
+            DemoSession.id == session_id,
+            DemoSession.expires_at > _now().isoformat(),
+        ).first()
+
+    def ensure_provisioned(self, session_id):
+        """Clone the template rows into a live session on first use.
+
+        Sessions already known to be provisioned cost nothing and others one
+        plain SELECT; only a missing clone takes the write lock. The claim is a
+        conditional UPDATE, so concurrent first requests copy the rows exactly
+        once. Returns True if the session is live and provisioned.
+        """
+        if session_id in self._ready:
+            return True
+        now = _now().isoformat()
+        live = DemoSession.id == session_id, DemoSession.expires_at > now
+        row = db.session.query(DemoSession.provisioned_at).filter(*live).first()
+        if row is None:
+            return False
+        if row.provisioned_at is None:
+            claimed = db.session.execute(
+                db.update(DemoSession)
+                .where(*live, DemoSession.provisioned_at.is_(None))
+                .values(provisioned_at=now)
+            ).rowcount
+            if claimed:
+                clone_session_rows(self.template_session, session_id)
+                db.session.commit()
+            else:
+                db.session.rollback()
+                if db.session.query(DemoSession.id).filter(
+                        *live, DemoSession.provisioned_at.isnot(None)).first() is None:
+                    return False
+        if len(self._ready) >= MAX_TRACKED_SESSIONS:
+            self._ready.clear()
+        self._ready.add(session_id)
+        return True
+
+    def touch(self, session_id):
+        """Slide the session's expiry forward. Returns False if it is unknown or expired."""
+        now = _now()
+        touched = db.session.execute(
+            db.update(DemoSession)
+            .where(DemoSession.id == session_id, DemoSession.expires_at > now.isoformat())
+            .values(last_seen_at=now.isoformat(), expires_at=self._expiry())
+        ).rowcount
+        db.session.commit()
+        return bool(touched)
+
+    def on_request(self, session_id):
+        """Provision and touch ``session_id``, at most once per interval per worker."""
+        if session_id == self.template_session:
+            return
+        now = time.monotonic()
+        if now - self._touched.get(session_id, float('-inf')) < TOUCH_INTERVAL_SECONDS:
+            return
+        # Unknown ids are remembered too, so a stray session_id costs one lookup per interval
+        if self.ensure_provisioned(session_id) and not self.touch(session_id):
+            self._ready.discard(session_id)
+        if len(self._touched) >= MAX_TRACKED_SESSIONS:
+            self._touched.clear()
+        self._touched[session_id] = now
+
+
+class SessionAccessTracker:
+    """Records when file-mode sessions were last used in their ``DemoSession`` row.
+
+    Reading a session's database file does not change its mtime, so the reaper
+    cannot tell an idle session from one that is only being read without this.
+    """
+
+    def __init__(self, template_session='__default__', ttl_seconds=4 * 3600):
+        self.template_session = template_session
+        self.ttl_seconds = ttl_seconds
+        # session_id -> monotonic time of the last touch (per worker)
+        self._touched = {}
+
+    def touch(self, session_id):
+        """Upsert the session's ``last_seen_at`` and slide its expiry forward."""
+        now = _now()
+        values = {'last_seen_at': now.isoformat(),
+                  'expires_at': (now + timedelta(seconds=self.ttl_seconds)).isoformat()}
+        updated = db.session.execute(
+            db.update(DemoSession).where(DemoSession.id == session_id).values(**values)
+        ).rowcount
+        if not updated:
+            db.session.add(DemoSession(id=session_id, **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker inserted the row first; its timestamp is just as fresh
+            db.session.rollback()
+
+    def on_request(self, session_id):
+        """Touch ``session_id`` at most once per interval per worker."""
+        if session_id == self.template_session:
+            return
+        now = time.monotonic()
+        if now - self._touched.get(session_id, float('-inf')) < TOUCH_INTERVAL_SECONDS:
+            return
+        self.touch(session_id)
+        if len(self._touched) >= MAX_TRACKED_SESSIONS:
+            self._touched.clear()
+        self._touched[session_id] = now
+
+
+def init_session_provisioning(app):
+    """Install the shared-database session manager when ``DEMO_SESSION_MODE`` is 'shared'.
+
+    In file mode only a ``SessionAccessTracker`` is installed.
+    """
+    if app.config.get('DEMO_SESSION_MODE') != 'shared':
+        tracker = SessionAccessTracker(
+            template_session=app.config.get('DEMO_SESSION_TEMPLATE', '__default__'),
+            ttl_seconds=app.config.get('DEMO_SESSION_TTL_SECONDS', 4 * 3600),
+        )
+        app.extensions['session_access'] = tracker
+
+        @app.before_request
+        def _track_session_access():
+            if request.path.startswith('/api/'):
+                tracker.on_request(request_session_id())
+
+        return None
+
+    manager = SharedSessionManager(
+        template_session=app.config.get('DEMO_SESSION_TEMPLATE', '__default__'),
+        ttl_seconds=app.config.get('DEMO_SESSION_TTL_SECONDS', 4 * 3600),
+    )
+    app.extensions['session_provisioning'] = manager
+
+    @app.before_request
+    def _provision_session():
+        if request.path.startswith('/api/'):
+            manager.on_request(request_session_id())
+
+    return manager
@@ -0,0 +1,208 @@
+"""Purge expired demo sessions and compact the database.
+
+Expired ``DemoSession`` rows (shared mode) have their data deleted in small
+batches, each in its own short transaction, so the SQLite write lock is never
+held for long while live sessions keep writing. Per-session database files left
+in ``data/sessions`` by the file-copy mode are removed once they have been idle
+for longer than the session TTL, judged by the ``last_seen_at`` both modes
+record (reads never change a file's mtime). Afterwards the freed pages are returned to the
+filesystem with ``PRAGMA incremental_vacuum`` and planner statistics are
+refreshed with ``PRAGMA optimize``.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from app.extensions import db
+from app.models.communication import Communication
+from app.models.demo_session import DemoSession
+from app.models.incident import Incident
+from app.models.incident_asset import IncidentAsset
+from app.models.incident_responder import IncidentResponder
+from app.models.incident_tag import IncidentTag
+from app.models.incident_term import IncidentTerm
+from app.models.job import Job
+from app.models.outbox_message import OutboxMessage
+from app.models.problem import Problem
+from app.models.session_metrics import SessionMetrics
+from app.models.sla_target import SLATarget
+from app.models.timeline_entry import TimelineEntry
+from app.models.webhook_delivery import WebhookDelivery
+from app.models.webhook_event import WebhookEvent
+from app.models.webhook_subscription import WebhookSubscription
+from app.tenancy import tenant_scope
+
+DEFAULT_BATCH_SIZE = 200
+# Deleted before their incidents so foreign keys never dangle mid-purge
+INCIDENT_CHILD_MODELS = (
+    IncidentTerm, IncidentTag, TimelineEntry, IncidentAsset, IncidentResponder, Communication,
+    OutboxMessage, WebhookEvent, WebhookDelivery,
+)
+SESSION_FILE_SUFFIXES = ('.db', '.db-wal', '.db-shm', '.db-journal', '.sqlite')
+
+
+def expired_session_ids(now=None, limit=None):
+    """Ids of shared-mode sessions whose expiry has passed."""
+    now = now or datetime.now(timezone.utc)
+    query = db.session.query(DemoSession.id).filter(
+        DemoSession.expires_at <= now.isoformat()
+    ).order_by(DemoSession.expires_at)
+    if limit:
+        query = query.limit(limit)
+    return [row.id for row in query]
+
+
+def _delete_in_batches(model, session_id, batch_size):
+    """Delete a session's rows from a table with an ``id`` key, one batch per commit."""
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(model.id).filter(
+            model.session_id == session_id).limit(batch_size)]
+        if not ids:
+            return deleted
+        deleted += db.session.query(model).filter(model.id.in_(ids)).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+
+def purge_session(session_id, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete every row belonging to ``session_id``. Returns rows deleted per table."""
+    counts = {model.__tablename__: 0 for model in INCIDENT_CHILD_MODELS}
+    counts[Incident.__tablename__] = 0
+
+    while True:
+        incident_ids = [row.id for row in db.session.query(Incident.id).filter(
+            Incident.session_id == session_id).limit(batch_size)]
+        if not incident_ids:
+            break
+        for model in INCIDENT_CHILD_MODELS:
+            counts[model.__tablename__] += db.session.query(model).filter(
+                model.incident_id.in_(incident_ids)).delete(synchronize_session=False)
+        counts[Incident.__tablename__] += db.session.query(Incident).filter(
+            Incident.id.in_(incident_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+    counts[Problem.__tablename__] = _delete_in_batches(Problem, session_id, batch_size)
+    counts[SLATarget.__tablename__] = _delete_in_batches(SLATarget, session_id, batch_size)
+    counts[WebhookSubscription.__tablename__] = _delete_in_batches(
+        WebhookSubscription, session_id, batch_size)
+    counts[Job.__tablename__] = _delete_in_batches(Job, session_id, batch_size)
+    # One rollup row per session, keyed by session_id
+    counts[SessionMetrics.__tablename__] = SessionMetrics.query.filter_by(
+        session_id=session_id).delete(synchronize_session=False)
+    counts[DemoSession.__tablename__] = DemoSession.query.filter_by(id=session_id).delete(
+        synchronize_session=False)
+    db.session.commit()
+    return counts
+
+
+def _session_id_from_filename(name):
+    for suffix in SESSION_FILE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+
+def session_last_access(session_ids, chunk_size=500):
+    """Map session ids to the epoch seconds of their ``last_seen_at``, where recorded."""
+    session_ids = list(session_ids)
+    last_access = {}
+    for start in range(0, len(session_ids), chunk_size):
+        rows = db.session.query(DemoSession.id, DemoSession.last_seen_at).filter(
+            DemoSession.id.in_(session_ids[start:start + chunk_size]),
+            DemoSession.last_seen_at.isnot(None),
+        )
+        for row in rows:
+            try:
+                last_access[row.id] = datetime.fromisoformat(row.last_seen_at).timestamp()
+            except ValueError:
+                continue
+    return last_access
+
+
+def remove_stale_session_files(sessions_dir, max_idle_seconds, dry_run=False, last_access=None):
+    """Delete per-session database files not used for ``max_idle_seconds``.
+
+    A session was last used at the later of its files' mtime and the time
+    ``last_access`` (a callable mapping session ids to epoch seconds) reports.
+    Returns ``(files_removed, bytes_freed)``.
+    """
+    if not sessions_dir or not os.path.isdir(sessions_dir):
+        return 0, 0
+    cutoff = time.time() - max_idle_seconds
+    entries = []
+    for entry in os.scandir(sessions_dir):
+        session_id = _session_id_from_filename(entry.name)
+        if entry.is_file() and session_id is not None:
+            entries.append((session_id, entry))
+    seen = last_access({session_id for session_id, _ in entries}) if last_access else {}
+
+    removed = freed = 0
+    for session_id, entry in entries:
+        stat = entry.stat()
+        if max(stat.st_mtime, seen.get(session_id, 0)) >= cutoff:
+            continue
+        if not dry_run:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+        removed += 1
+        freed += stat.st_size
+    return removed, freed
+
+
+def _sqlite_size(conn):
+    page_size = conn.exec_driver_sql('PRAGMA page_size').scalar()
+    return conn.exec_driver_sql('PRAGMA page_count').scalar() * page_size
+
+
+def compact(engine, vacuum_pages=None):
+    """Return free pages to the filesystem and refresh planner statistics.
+
+    Incremental vacuum needs ``auto_vacuum=INCREMENTAL``, which SQLITE_PRAGMAS
+    sets for new databases; older files need one full ``VACUUM`` to switch.
+    Returns ``(bytes_before, bytes_after)``, or ``(None, None)`` off SQLite.
+    """
+    if engine.dialect.name != 'sqlite':
+        return None, None
+    with engine.connect() as conn:
+        before = _sqlite_size(conn)
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() == 2:
+            pages = '' if vacuum_pages is None else f'({int(vacuum_pages)})'
+            # Each step of the statement frees one page and cursor.execute() only steps
+            # once; executescript() runs it to completion
+            conn.commit()
+            conn.connection.dbapi_connection.executescript(f'PRAGMA incremental_vacuum{pages}')
+        conn.exec_driver_sql('PRAGMA optimize')
+        conn.commit()
+        # In WAL mode the file only shrinks once the vacuumed pages are checkpointed
+        conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        after = _sqlite_size(conn)
+    return before, after
+
+
+def reap(app, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, vacuum=True, vacuum_pages=None,
+         max_sessions=None):
+    """Purge expired sessions, stale session files and compact. Returns a summary dict."""
+    summary = {'sessions': 0, 'rows': {}, 'files': 0, 'file_bytes': 0,
+               'db_bytes_before': None, 'db_bytes_after': None}
+
+    session_ids = expired_session_ids(limit=max_sessions)
+    summary['sessions'] = len(session_ids)
+    if not dry_run:
+        for session_id in session_ids:
+            with tenant_scope(session_id):
+                counts = purge_session(session_id, batch_size)
+            for table, count in counts.items():
+                summary['rows'][table] = summary['rows'].get(table, 0) + count
+
+    sessions_dir = os.path.join(os.path.dirname(app.instance_path), 'data', 'sessions')
+    summary['files'], summary['file_bytes'] = remove_stale_session_files(
+        sessions_dir, app.config.get('DEMO_SESSION_TTL_SECONDS', 4 * 3600), dry_run=dry_run,
+        last_access=session_last_access,
+    )
+
+    if vacuum and not dry_run:
+        summary['db_bytes_before'], summary['db_bytes_after'] = compact(db.engine, vacuum_pages)
+    return summary
+
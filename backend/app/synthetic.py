@@ -0,0 +1,289 @@
+"""High-volume synthetic data for scaling and benchmark runs.
+
+Rows are built as plain dicts and written with Core ``executemany`` inserts in
+large batches, bypassing the ORM unit of work.
+"""
+import json
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.timeline_entry import TimelineEntry
+from app.models.incident_asset import IncidentAsset
+from app.models.incident_responder import IncidentResponder
+from app.models.problem import Problem
+from app.models.sla_target import SLATarget
+from app.services.incident_number import reserve_numbers
+
+BATCH_SIZE = 10000
+
+SEVERITY_WEIGHTS = {'critical': 5, 'high': 20, 'medium': 45, 'low': 30}
+CATEGORY_WEIGHTS = {
+    'outage': 15, 'degradation': 30, 'security': 8,
+    'data_loss': 4, 'access_issue': 28, 'other': 15,
+}
+OPEN_STATUSES = ['open', 'investigating', 'identified', 'monitoring']
+DEFAULT_SLA = {
+    'critical': (15, 240),
+    'high': (30, 480),
+    'medium': (120, 1440),
+    'low': (480, 4320),
+}
+# Median resolution time as a share of the SLA target; the lognormal tail
+# past 1.0 produces roughly 10-15% breaches.
+MTTR_MEDIAN_RATIO = 0.45
+MTTR_SIGMA = 0.7
+MTTA_SIGMA = 0.8
+
+SYSTEMS = [
+    'file share', 'VPN', 'email', 'SSO', 'Active Directory', 'payroll app', 'CRM',
+    'ERP', 'web portal', 'API gateway', 'database cluster', 'backup job', 'Wi-Fi',
+    'printer fleet', 'DNS', 'firewall', 'Teams', 'SharePoint', 'ticketing system',
+]
+SYMPTOMS = {
+    'outage': ['is down', 'unreachable', 'not responding', 'returning 503 errors'],
+    'degradation': ['slow for all users', 'intermittent timeouts', 'high latency', 'degraded'],
+    'security': ['suspicious logins', 'malware alert', 'phishing campaign', 'policy violation'],
+    'data_loss': ['missing records', 'corrupted files', 'failed replication'],
+    'access_issue': ['login failures', 'permission denied', 'account lockouts', 'MFA failing'],
+    'other': ['configuration drift', 'certificate expiring', 'license warning'],
+}
+ROOT_CAUSES = [
+    'disk full after log rotation stopped', 'expired TLS certificate',
+    'misconfigured firewall rule', 'memory leak in service worker',
+    'failed patch rollout', 'upstream provider outage', 'DNS record deleted',
+    'connection pool exhausted', 'session table exhausted', 'stale cached credentials',
+]
+PEOPLE = [
+    'Sarah Chen', 'Mike Torres', 'Alex Kim', 'Priya Patel', 'Jordan Lee',
+    'Sam Rivera', 'Taylor Brooks', 'Chris Nguyen', 'Morgan Diaz', 'Jamie Fox',
+]
+ASSET_TYPES = ['server', 'network', 'application', 'storage', 'endpoint']
+IMPACT_TYPES = ['down', 'degraded', 'at_risk']
+RESPONDER_ROLES = ['lead', 'investigator', 'communicator', 'subject_matter_expert']
+TAGS = ['prod', 'staging', 'db', 'network', 'auth', 'storage', 'vendor', 'customer-facing',
+        'internal', 'security', 'cloud', 'on-prem']
+FIX_STATUSES = ['open', 'in_progress', 'implemented', 'verified']
+
+
+def _iso(dt):
+    return dt.isoformat()
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _insert(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def _ensure_sla_targets(session_id):
+    targets = {t.severity: t for t in SLATarget.query.filter_by(session_id=session_id).all()}
+    for severity, (response, resolution) in DEFAULT_SLA.items():
+        if severity not in targets:
+            targets[severity] = SLATarget(
+                id=str(uuid.uuid4()), severity=severity,
+                response_target_minutes=response, resolution_target_minutes=resolution,
+                session_id=session_id,
+            )
+            db.session.add(targets[severity])
+    db.session.flush()
+    return {
+        severity: (t.response_target_minutes or DEFAULT_SLA[severity][0],
+                   t.resolution_target_minutes or DEFAULT_SLA[severity][1])
+        for severity, t in targets.items()
+    }
+
+
+def _make_problems(rng, count, session_id, now):
+    year = now.year
+    first = reserve_numbers('problem', year, count)
+    rows = []
+    for n in range(count):
+        system = rng.choice(SYSTEMS)
+        cause = rng.choice(ROOT_CAUSES)
+        created = now - timedelta(days=rng.uniform(0, 365))
+        fix_status = rng.choice(FIX_STATUSES)
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'problem_number': f'PRB-{year}-{first + n:04d}',
+            'title': f'Recurring {system} incidents: {cause}',
+            'description': f'Multiple incidents on the {system} traced to {cause}.',
+            'root_cause': cause,
+            'root_cause_category': rng.choice(['infrastructure', 'software', 'process', 'vendor']),
+            'fix_status': fix_status,
+            'fix_owner': rng.choice(PEOPLE),
+            'fix_due_date': (created + timedelta(days=rng.randint(14, 90))).date().isoformat(),
+            'fix_completed_date': (
+                (created + timedelta(days=rng.randint(7, 60))).date().isoformat()
+                if fix_status in ('implemented', 'verified') else None
+            ),
+            'estimated_cost': round(rng.uniform(500, 50000), 2),
+            'incident_count': 0,
+            'known_error': int(rng.random() < 0.4),
+            'priority': _weighted(rng, SEVERITY_WEIGHTS),
+            'created_at': _iso(created),
+            'updated_at': _iso(created),
+            'session_id': session_id,
+        })
+    return rows
+
+
+def generate(incidents, timeline_per_incident=5, problems=0, session_id='__default__',
+             seed=None, link_ratio=0.2, progress=None):
+    """Insert synthetic incidents with timeline, assets, responders and problems.
+
+    Returns a dict of row counts per table plus ``elapsed_seconds``.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    year = now.year
+    counts = {'incidents': 0, 'timeline_entries': 0, 'incident_assets': 0,
+              'incident_responders': 0, 'problems': problems}
+
+    sla = _ensure_sla_targets(session_id)
+    problem_rows = _make_problems(rng, problems, session_id, now)
+    _insert(Problem.__table__, problem_rows)
+    problem_ids = [p['id'] for p in problem_rows]
+    problem_incidents = {}
+
+    first_number = reserve_numbers('incident', year, incidents)
+    assets = [(f'AST-{n:05d}', f'{rng.choice(SYSTEMS)} node {n}', rng.choice(ASSET_TYPES))
+              for n in range(1, max(incidents // 50, 20) + 1)]
+
+    incident_rows, timeline_rows, asset_rows, responder_rows = [], [], [], []
+
+    def flush():
+        _insert(Incident.__table__, incident_rows)
+        _insert(TimelineEntry.__table__, timeline_rows)
+        _insert(IncidentAsset.__table__, asset_rows)
+        _insert(IncidentResponder.__table__, responder_rows)
+        counts['incidents'] += len(incident_rows)
+        counts['timeline_entries'] += len(timeline_rows)
+        counts['incident_assets'] += len(asset_rows)
+        counts['incident_responders'] += len(responder_rows)
+        for rows in (incident_rows, timeline_rows, asset_rows, responder_rows):
+            rows.clear()
+        if progress:
+            progress(counts['incidents'], incidents)
+
+    for n in range(incidents):
+        incident_id = str(uuid.uuid4())
+        severity = _weighted(rng, SEVERITY_WEIGHTS)
+        category = _weighted(rng, CATEGORY_WEIGHTS)
+        response_target, resolution_target = sla[severity]
+        system = rng.choice(SYSTEMS)
+        symptom = rng.choice(SYMPTOMS[category])
+        reported = now - timedelta(days=rng.uniform(0, 365) ** 1.5 / 365 ** 0.5)
+        ack = reported + timedelta(
+            minutes=rng.lognormvariate(math.log(response_target * 0.5), MTTA_SIGMA))
+        resolve_minutes = rng.lognormvariate(
+            math.log(resolution_target * MTTR_MEDIAN_RATIO), MTTR_SIGMA)
+        resolved = reported + timedelta(minutes=resolve_minutes)
+
+        if resolved < now and rng.random() < 0.92:
+            status = 'closed' if rng.random() < 0.6 else 'resolved'
+        else:
+            status = rng.choice(OPEN_STATUSES)
+            resolved = None
+        closed = resolved + timedelta(hours=rng.uniform(1, 72)) if status == 'closed' else None
+        if closed and closed > now:
+            closed = now
+        acknowledged = ack if (status != 'open' and ack < now) else None
+        assignee = rng.choice(PEOPLE)
+        cause = rng.choice(ROOT_CAUSES) if resolved else None
+
+        problem_id = None
+        if problem_ids and rng.random() < link_ratio:
+            problem_id = rng.choice(problem_ids)
+            problem_incidents[problem_id] = problem_incidents.get(problem_id, 0) + 1
+
+        incident_rows.append({
+            'id': incident_id,
+            'incident_number': f'INC-{year}-{first_number + n:04d}',
+            'title': f'{system} {symptom}',
+            'description': f'Users report the {system} {symptom}. Reported via monitoring and helpdesk.',
+            'severity': severity,
+            'category': category,
+            'status': status,
+            'reported_at': _iso(reported),
+            'detected_at': _iso(reported),
+            'acknowledged_at': _iso(acknowledged) if acknowledged else None,
+            'resolved_at': _iso(resolved) if resolved else None,
+            'closed_at': _iso(closed) if closed else None,
+            'impact_description': f'{system} impacted',
+            'users_affected': int(rng.paretovariate(1.2) * 10),
+            'business_impact': _weighted(rng, SEVERITY_WEIGHTS),
+            'data_breach': int(category == 'security' and rng.random() < 0.1),
+            'reported_by': rng.choice(PEOPLE),
+            'assigned_to': assignee,
+            'resolved_by': assignee if resolved else None,
+            'resolution_summary': f'Resolved: {cause}' if resolved else None,
+            'root_cause': cause,
+            'problem_id': problem_id,
+            'post_incident_completed': int(status == 'closed' and rng.random() < 0.5),
+            'created_at': _iso(reported),
+            'updated_at': _iso(resolved or acknowledged or reported),
+            'tags': json.dumps(rng.sample(TAGS, rng.randint(0, 3))),
+            'session_id': session_id,
+        })
+
+        end = closed or resolved or now
+        span = max((end - reported).total_seconds(), 60.0)
+        for k in range(timeline_per_incident):
+            if k == 0:
+                entry_type, content, at = 'update', f'Incident created: {system} {symptom}', reported
+            elif k == timeline_per_incident - 1 and resolved:
+                entry_type, content, at = 'resolution', f'Resolved: {cause}', resolved
+            else:
+                entry_type = rng.choice(['update', 'update', 'status_change', 'communication'])
+                content = f'{entry_type.replace("_", " ").capitalize()} on {system}'
+                at = reported + timedelta(seconds=span * k / timeline_per_incident)
+            timeline_rows.append({
+                'id': str(uuid.uuid4()),
+                'incident_id': incident_id,
+                'entry_type': entry_type,
+                'content': content,
+                'author': rng.choice(PEOPLE),
+                'created_at': _iso(at),
+                'session_id': session_id,
+            })
+
+        for asset_tracker_id, asset_name, asset_type in rng.sample(assets, rng.randint(0, 3)):
+            asset_rows.append({
+                'id': str(uuid.uuid4()),
+                'incident_id': incident_id,
+                'asset_tracker_id': asset_tracker_id,
+                'asset_name': asset_name,
+                'asset_type': asset_type,
+                'impact_type': rng.choice(IMPACT_TYPES),
+                'session_id': session_id,
+            })
+
+        for person in rng.sample(PEOPLE, rng.randint(1, 3)):
+            responder_rows.append({
+                'id': str(uuid.uuid4()),
+                'incident_id': incident_id,
+                'person_name': person,
+                'role': rng.choice(RESPONDER_ROLES),
+                'assigned_at': _iso(acknowledged or reported),
+                'session_id': session_id,
+            })
+
+        if len(incident_rows) >= BATCH_SIZE // max(timeline_per_incident, 1):
+            flush()
+    flush()
+
+    for problem_id, count in problem_incidents.items():
+        Problem.query.filter_by(id=problem_id).update(
+            {Problem.incident_count: count}, synchronize_session=False
+        )
+
+    counts['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    return counts
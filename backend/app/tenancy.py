@@ -0,0 +1,252 @@
+"""Tenant (``session_id``) scoping for ORM queries, and per-tenant storage.
+
+Models that mix in ``TenantScoped`` carry a ``session_id`` column. While a
+tenant is active - for the rest of a request once its handler has read its
+session with ``use_tenant(request.args)`` or ``use_tenant(data)``, or inside
+``with tenant_scope(session_id):`` in workers and CLI commands - every ORM SELECT, UPDATE and DELETE touching those
+models gets ``session_id = <tenant>`` added through ``with_loader_criteria``,
+including relationship loads, and new rows without a ``session_id`` get the
+tenant's. Statements run with the ``include_all_tenants`` execution option are
+left alone. Outside any scope nothing is filtered, so cross-tenant maintenance
+(reaper, rollups, queue workers) keeps working unchanged.
+
+``TENANT_PARTITIONS`` moves chosen tenants' incident data onto their own
+storage without touching the blueprints::
+
+    {"big-customer": "sqlite:////data/tenants/big-customer.db",
+     "other": {"schema": "tenant_other"}}
+
+A URL becomes an extra ``SQLALCHEMY_BINDS`` engine (``tenant:<session_id>``);
+``schema`` reuses the main PostgreSQL engine with a ``schema_translate_map``.
+While such a tenant is active, ``RoutingSession`` sends statements on
+``PARTITIONED_TABLES`` to its storage. Queue and rollup tables (jobs, outbox,
+webhooks, session metrics) stay in the main database so their workers poll one
+place. An incident write and the outbox or webhook rows it queues would then
+commit on two databases, breaking the outbox's all-or-nothing guarantee, so
+partitions are refused while ``NOTIFICATION_CHANNELS`` or ``WEBHOOKS_ENABLED``
+are set. ``flask split-tenant`` copies a tenant's rows into its partition and
+removes them from the main database.
+"""
+import contextvars
+from contextlib import contextmanager
+from flask import current_app, has_request_context, request
+from sqlalchemy import Column, String, delete, event, func, insert, select, text, tuple_
+from sqlalchemy.orm import Session, with_loader_criteria
+
+EXTENSION_KEY = 'tenancy'
+TOKEN_ENVIRON_KEY = 'itl.tenant_token'
+PARTITION_BIND_PREFIX = 'tenant:'
+
+PARTITIONED_TABLES = (
+    'incidents', 'timeline_entries', 'incident_assets', 'incident_responders',
+    'incident_tags', 'incident_terms', 'communications', 'problems', 'sla_targets',
+    # Incident/problem numbers must keep counting from where the main database was
+    'incident_counters',
+)
+
+_current_tenant = contextvars.ContextVar('tenant', default=None)
+# session_id -> Engine, filled by init_tenancy (per process)
+_partitions = {}
+
+
+class TenantScoped:
+    """Marker for models whose rows belong to one tenant through ``session_id``."""
+
+    # Models declare their own; this one only lets with_loader_criteria analyse its lambda
+    session_id = Column(String(100), default='__default__')
+
+
+def current_tenant():
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_scope(session_id):
+    """Scope ORM statements (and partition routing) to ``session_id``; None lifts the scope."""
+    token = _current_tenant.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _current_tenant.reset(token)
+
+
+def use_tenant(source):
+    """The request's ``session_id`` from ``source`` (``request.args`` or the JSON body),
+    scoping the rest of the request to it.
+
+    Handlers read their session through this, so the tenant is always exactly
+    the session the handler filters on, whichever place it takes it from.
+    """
+    session_id = source.get('session_id', '__default__')
+    if has_request_context() and current_app.config.get('TENANT_SCOPING_ENABLED', True):
+        token = _current_tenant.set(session_id)
+        # The first token restores the pre-request value at teardown
+        request.environ.setdefault(TOKEN_ENVIRON_KEY, token)
+    return session_id
+
+
+def _table_name(mapper, clause):
+    if mapper is not None:
+        return mapper.persist_selectable.name
+    table = getattr(clause, 'table', None)
+    if table is None and hasattr(clause, 'get_final_froms'):
+        froms = clause.get_final_froms()
+        table = froms[0] if froms else None
+    return getattr(table, 'name', None)
+
+
+def partition_engine(mapper=None, clause=None):
+    """The active tenant's engine for a statement on a partitioned table, else None."""
+    tenant = _current_tenant.get()
+    if tenant is None or tenant not in _partitions:
+        return None
+    if _table_name(mapper, clause) not in PARTITIONED_TABLES:
+        return None
+    return _partitions[tenant]
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _scope_to_tenant(state):
+    tenant = _current_tenant.get()
+    if (
+        tenant is None
+        or not (state.is_select or state.is_update or state.is_delete)
+        or state.is_column_load
+        or state.is_relationship_load
+        or state.execution_options.get('include_all_tenants', False)
+    ):
+        return
+    state.statement = state.statement.options(with_loader_criteria(
+        TenantScoped, lambda cls: cls.session_id == tenant, include_aliases=True,
+    ))
+
+
+@event.listens_for(Session, 'before_flush')
+def _default_tenant(session, flush_context, instances):
+    tenant = _current_tenant.get()
+    if tenant is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantScoped) and obj.session_id is None:
+            obj.session_id = tenant
+
+
+def _partition_targets(config):
+    for session_id, target in (config.get('TENANT_PARTITIONS') or {}).items():
+        yield session_id, {'url': target} if isinstance(target, str) else target
+
+
+def configure_partition_binds(app):
+    """Add an ``SQLALCHEMY_BINDS`` entry for each partition with its own database URL.
+
+    Must run before ``db.init_app`` so the engines get the same PRAGMAs and
+    instrumentation as the main one.
+    """
+    from app.config import engine_options
+
+    binds = {
+        f'{PARTITION_BIND_PREFIX}{session_id}': {'url': target['url'],
+                                                 **engine_options(target['url'])}
+        for session_id, target in _partition_targets(app.config) if target.get('url')
+    }
+    if binds:
+        app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), **binds}
+
+
+def init_tenancy(app):
+    """Register the configured partitions and end each request's tenant scope."""
+    from app.extensions import db
+
+    if app.config.get('TENANT_PARTITIONS') and (
+            app.config.get('NOTIFICATION_CHANNELS') or app.config.get('WEBHOOKS_ENABLED', True)):
+        raise RuntimeError('TENANT_PARTITIONS cannot be used with NOTIFICATION_CHANNELS or '
+                           'WEBHOOKS_ENABLED: outbox rows would commit apart from the incident '
+                           'changes they announce')
+
+    _partitions.clear()
+    with app.app_context():
+        for session_id, target in _partition_targets(app.config):
+            if target.get('url'):
+                _partitions[session_id] = db.engines[f'{PARTITION_BIND_PREFIX}{session_id}']
+            else:
+                _partitions[session_id] = db.engine.execution_options(
+                    schema_translate_map={None: target['schema']})
+    app.extensions[EXTENSION_KEY] = _partitions
+
+    @app.teardown_request
+    def _leave_tenant(exc):
+        token = request.environ.pop(TOKEN_ENVIRON_KEY, None)
+        if token is not None:
+            _current_tenant.reset(token)
+
+
+def _partitioned_tables(metadata):
+    return [t for t in metadata.sorted_tables if t.name in PARTITIONED_TABLES]
+
+
+def _merge_counters(source, dest, table):
+    """Raise the partition's counters to at least the main database's values."""
+    current = {(row.counter_type, row.year): row.last_number
+               for row in dest.execute(select(table))}
+    for row in source.execute(select(table)):
+        key = (row.counter_type, row.year)
+        if key not in current:
+            dest.execute(insert(table).values(counter_type=row.counter_type, year=row.year,
+                                              last_number=row.last_number))
+        elif current[key] < row.last_number:
+            dest.execute(table.update().where(
+                table.c.counter_type == row.counter_type, table.c.year == row.year
+            ).values(last_number=row.last_number))
+
+
+def split_tenant(session_id, dry_run=False, batch_size=1000):
+    """Copy ``session_id``'s partitioned rows to its partition, then delete them from the
+    main database.
+
+    Rows the tenant already has in the partition are kept, so re-running after a
+    failed attempt, or after the tenant has been writing to the partition, loses
+    nothing. Returns the rows per table that were (or with ``dry_run`` would be) moved.
+    """
+    from app.extensions import db
+
+    target = _partitions.get(session_id)
+    if target is None:
+        raise ValueError(f'{session_id} has no entry in TENANT_PARTITIONS')
+    tables = [t for t in _partitioned_tables(db.metadata) if 'session_id' in t.c]
+    counters = db.metadata.tables['incident_counters']
+
+    def owned(query, table):
+        return query.where(table.c.session_id == session_id)
+
+    if dry_run:
+        with db.engine.connect() as source:
+            return {table.name: source.execute(
+                owned(select(func.count()).select_from(table), table)).scalar()
+                for table in tables}
+
+    schema = (target.get_execution_options().get('schema_translate_map') or {}).get(None)
+    with target.begin() as conn:
+        if schema:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        db.metadata.create_all(conn, tables=_partitioned_tables(db.metadata))
+
+    moved = {}
+    with db.engine.connect() as source, target.begin() as dest:
+        _merge_counters(source, dest, counters)
+        for table in tables:
+            moved[table.name] = 0
+            key = tuple_(*table.primary_key.columns)
+            result = source.execution_options(yield_per=batch_size).execute(
+                owned(select(table), table))
+            for rows in result.partitions():
+                rows = [dict(row._mapping) for row in rows]
+                # Left over from an earlier run that failed before deleting from main
+                dest.execute(delete(table).where(key.in_(
+                    [tuple(row[c.name] for c in table.primary_key.columns) for row in rows])))
+                dest.execute(insert(table), rows)
+                moved[table.name] += len(rows)
+
+    with db.engine.begin() as conn:
+        for table in reversed(tables):
+            conn.execute(owned(delete(table), table))
+    return moved
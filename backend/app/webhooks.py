@@ -0,0 +1,364 @@
+"""Webhook subscriptions: signed, batched delivery of incident changes.
+
+Incident and timeline writes call ``record_event`` before they commit, adding
+one ``webhook_events`` row per change however many subscribers there are, so
+fan-out never touches the request path. ``flask webhook-dispatcher`` then works
+in two stages:
+
+1. Fan-out. Once an incident's oldest pending event is
+   ``WEBHOOK_COALESCE_SECONDS`` old, all of that incident's pending events are
+   folded into one ``webhook_deliveries`` row per matching subscription,
+   carrying the incident as it is at that moment. A burst of edits to one
+   incident reaches each subscriber once.
+2. Delivery. Due deliveries are grouped by subscription into batches of up to
+   ``WEBHOOK_BATCH_SIZE`` and POSTed by ``WEBHOOK_WORKERS`` threads, each keeping
+   one persistent connection per host. Every request is signed with the
+   subscription's secret::
+
+       X-ITL-Timestamp: 1760000000
+       X-ITL-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>">
+
+Failed batches are retried with exponential backoff up to
+``WEBHOOK_MAX_ATTEMPTS``. Only the dispatcher's main thread uses the database;
+run one dispatcher per database.
+
+Subscription URLs must resolve to public addresses: loopback, private,
+link-local (cloud metadata), multicast and reserved ranges are refused when the
+subscription is created and again when the dispatcher connects, which then uses
+the address it checked so a DNS answer that changes in between cannot redirect
+it. ``WEBHOOK_ALLOW_PRIVATE_DESTINATIONS`` lifts this for local development.
+"""
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from operator import attrgetter
+from urllib.parse import urlsplit
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from app.extensions import db
+from app.models.incident import Incident
+from app.models.webhook_delivery import WebhookDelivery
+from app.models.webhook_event import WebhookEvent
+from app.models.webhook_subscription import WebhookSubscription
+from app.tenancy import tenant_scope
+
+logger = logging.getLogger('app.webhooks')
+
+WEBHOOK_EVENTS = (
+    'incident.created', 'incident.updated', 'incident.status_changed',
+    'incident.assigned', 'incident.resolved', 'timeline.entry_added',
+)
+FAN_OUT_BATCH = 500
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def record_event(incident, event_type, **data):
+    """Queue ``event_type`` for the incident's webhook subscribers. The caller commits."""
+    if not current_app.config.get('WEBHOOKS_ENABLED', True):
+        return None
+    event = WebhookEvent(incident_id=incident.id, event_type=event_type,
+                         data=json.dumps(data), session_id=incident.session_id)
+    db.session.add(event)
+    return event
+
+
+def sign(secret, timestamp, body):
+    """The ``X-ITL-Signature`` value for ``body`` sent at ``timestamp``."""
+    digest = hmac.new(secret.encode('utf-8'), f'{timestamp}.'.encode('utf-8') + body,
+                      hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+def fan_out(coalesce_seconds=2, limit=FAN_OUT_BATCH):
+    """Turn settled events into per-subscription deliveries; returns deliveries created."""
+    cutoff = (_now() - timedelta(seconds=coalesce_seconds)).isoformat()
+    incident_ids = [row[0] for row in db.session.query(WebhookEvent.incident_id).group_by(
+        WebhookEvent.incident_id
+    ).having(func.min(WebhookEvent.occurred_at) <= cutoff).limit(limit)]
+    if not incident_ids:
+        db.session.rollback()
+        return 0
+
+    events = WebhookEvent.query.filter(WebhookEvent.incident_id.in_(incident_ids)).order_by(
+        WebhookEvent.incident_id, WebhookEvent.occurred_at).all()
+    incident_sessions = defaultdict(set)
+    for e in events:
+        incident_sessions[e.session_id].add(e.incident_id)
+    snapshots = {}
+    for session_id, ids in incident_sessions.items():
+        with tenant_scope(session_id):
+            for i in Incident.query.filter(Incident.id.in_(ids)):
+                snapshots[i.id] = (i, i.to_dict())
+    subscriptions = defaultdict(list)
+    for subscription in WebhookSubscription.query.filter(
+        WebhookSubscription.session_id.in_({e.session_id for e in events}),
+        WebhookSubscription.active == 1,
+    ):
+        subscriptions[subscription.session_id].append(subscription)
+
+    created = 0
+    for incident_id, group in groupby(events, key=attrgetter('incident_id')):
+        if incident_id not in snapshots:
+            continue
+        incident, snapshot = snapshots[incident_id]
+        group = list(group)
+        for subscription in subscriptions.get(incident.session_id, ()):
+            wanted = json.loads(subscription.events or '[]')
+            matched = [e for e in group if not wanted or e.event_type in wanted]
+            if not matched or not subscription.matches(
+                    [e.event_type for e in matched], incident.severity, incident.category):
+                continue
+            db.session.add(WebhookDelivery(
+                subscription_id=subscription.id,
+                incident_id=incident_id,
+                event_types=json.dumps(list(dict.fromkeys(e.event_type for e in matched))),
+                payload=json.dumps({'incident': snapshot,
+                                    'events': [e.to_dict() for e in matched]}),
+                session_id=incident.session_id,
+            ))
+            created += 1
+
+    # By id, so events recorded since the SELECT wait for the next round
+    db.session.query(WebhookEvent).filter(
+        WebhookEvent.id.in_([e.id for e in events])).delete(synchronize_session=False)
+    db.session.commit()
+    return created
+
+
+def _claimable(now):
+    return or_(
+        and_(WebhookDelivery.status == 'pending', WebhookDelivery.next_attempt_at <= now),
+        and_(WebhookDelivery.status == 'sending', WebhookDelivery.lease_expires_at <= now),
+    )
+
+
+def claim_deliveries(limit, lease_seconds=60):
+    """Claim up to ``limit`` due deliveries, ordered by subscription."""
+    now = _now().isoformat()
+    ids = [row.id for row in db.session.query(WebhookDelivery.id).filter(
+        _claimable(now)).order_by(WebhookDelivery.created_at).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+
+    token = str(uuid.uuid4())
+    db.session.execute(
+        db.update(WebhookDelivery)
+        .where(WebhookDelivery.id.in_(ids), _claimable(now))
+        .values(status='sending', claim_token=token, attempts=WebhookDelivery.attempts + 1,
+                lease_expires_at=(_now() + timedelta(seconds=lease_seconds)).isoformat())
+    )
+    db.session.commit()
+    return WebhookDelivery.query.filter_by(claim_token=token).order_by(
+        WebhookDelivery.subscription_id, WebhookDelivery.created_at).all()
+
+
+class DestinationNotAllowed(Exception):
+    """A webhook URL that resolves to a loopback, private, link-local or reserved address."""
+
+
+def resolve_destination(hostname, port, allow_private=False):
+    """The address to connect to for ``hostname``; DestinationNotAllowed unless every
+    address it resolves to is public."""
+    if not hostname:
+        raise DestinationNotAllowed('URL has no host')
+    try:
+        infos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise DestinationNotAllowed(f'Cannot resolve {hostname}')
+    addresses = [info[4][0] for info in infos]
+    if not allow_private:
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%', 1)[0])
+            if getattr(ip, 'ipv4_mapped', None):
+                ip = ip.ipv4_mapped
+            if not ip.is_global or ip.is_multicast:
+                raise DestinationNotAllowed(f'{hostname} resolves to a non-public address')
+    return addresses[0]
+
+
+def check_destination(url, allow_private=False):
+    """Raise DestinationNotAllowed unless ``url`` is http(s) on a public address."""
+    target = urlsplit(url)
+    if target.scheme not in ('http', 'https'):
+        raise DestinationNotAllowed('URL must be http or https')
+    try:
+        port = target.port or (443 if target.scheme == 'https' else 80)
+    except ValueError:
+        raise DestinationNotAllowed('URL has an invalid port')
+    resolve_destination(target.hostname, port, allow_private)
+
+
+class ConnectionPool:
+    """Persistent HTTP connections, one per thread and host."""
+
+    def __init__(self, timeout=10, allow_private=False):
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self.local = threading.local()
+
+    def post(self, url, body, headers):
+        """POST ``body``; returns ``(status, retry_after)``.
+
+        Raises OSError/HTTPException, or DestinationNotAllowed before connecting
+        to a host that does not resolve to a public address.
+        """
+        target = urlsplit(url)
+        path = (target.path or '/') + (f'?{target.query}' if target.query else '')
+        key = (target.scheme, target.hostname, target.port)
+        connections = self.local.__dict__.setdefault('connections', {})
+        while True:
+            conn = connections.get(key)
+            reused = conn is not None
+            if conn is None:
+                port = target.port or (443 if target.scheme == 'https' else 80)
+                address = resolve_destination(target.hostname, port, self.allow_private)
+                connection_class = (http.client.HTTPSConnection if target.scheme == 'https'
+                                    else http.client.HTTPConnection)
+                conn = connection_class(target.hostname, port, timeout=self.timeout)
+                # Connect to the checked address; Host and TLS still use the hostname
+                conn._create_connection = (
+                    lambda _, timeout, source, address=address, port=port:
+                    socket.create_connection((address, port), timeout, source))
+                connections[key] = conn
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                del connections[key]
+                # The server may have dropped an idle keep-alive connection; retry once fresh
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                conn.close()
+                del connections[key]
+            return response.status, response.getheader('Retry-After')
+
+
+def _send(pool, url, secret, body):
+    timestamp = str(int(time.time()))
+    try:
+        status, _ = pool.post(url, body, {
+            'Content-Type': 'application/json',
+            'User-Agent': 'itl-webhooks/1.0',
+            'X-ITL-Timestamp': timestamp,
+            'X-ITL-Signature': sign(secret, timestamp, body),
+        })
+    except DestinationNotAllowed:
+        return None, 'Destination not allowed'
+    except (OSError, http.client.HTTPException) as exc:
+        return None, f'{type(exc).__name__}: {exc}'
+    return status, None if 200 <= status < 300 else f'HTTP {status}'
+
+
+def _record_result(subscription, deliveries, status, error, max_attempts, backoff_seconds):
+    now = _now()
+    for delivery in deliveries:
+        delivery.response_status = status
+        delivery.claim_token = delivery.lease_expires_at = None
+        delivery.last_error = error
+        if error is None:
+            delivery.status = 'delivered'
+            delivery.delivered_at = now.isoformat()
+        elif delivery.attempts >= max_attempts:
+            delivery.status = 'failed'
+        else:
+            delivery.status = 'pending'
+            delay = backoff_seconds * 2 ** (delivery.attempts - 1)
+            delivery.next_attempt_at = (now + timedelta(seconds=delay)).isoformat()
+    if error is None:
+        subscription.consecutive_failures = 0
+        subscription.last_delivery_at = now.isoformat()
+    else:
+        subscription.consecutive_failures += 1
+        subscription.last_error = error
+
+
+def deliver_due(executor, pool, config):
+    """Claim due deliveries and send them batched per subscription; returns deliveries sent."""
+    batch_size = config.get('WEBHOOK_BATCH_SIZE', 50)
+    deliveries = claim_deliveries(batch_size * config.get('WEBHOOK_WORKERS', 8),
+                                  config.get('WEBHOOK_LEASE_SECONDS', 60))
+    if not deliveries:
+        return 0
+    subscriptions = {s.id: s for s in WebhookSubscription.query.filter(
+        WebhookSubscription.id.in_({d.subscription_id for d in deliveries}))}
+
+    futures = []
+    for subscription_id, group in groupby(deliveries, key=attrgetter('subscription_id')):
+        group = list(group)
+        subscription = subscriptions.get(subscription_id)
+        if subscription is None or not subscription.active:
+            for delivery in group:
+                delivery.status = 'cancelled'
+                delivery.claim_token = delivery.lease_expires_at = None
+            continue
+        for start in range(0, len(group), batch_size):
+            batch = group[start:start + batch_size]
+            body = json.dumps({'deliveries': [
+                {'id': d.id, 'incident_id': d.incident_id, **json.loads(d.payload)}
+                for d in batch
+            ]}).encode('utf-8')
+            futures.append((subscription, batch, executor.submit(
+                _send, pool, subscription.url, subscription.secret, body)))
+
+    sent = 0
+    for subscription, batch, future in futures:
+        status, error = future.result()
+        if error:
+            logger.warning('Webhook delivery of %d event(s) to %s failed: %s',
+                           len(batch), subscription.url, error)
+        else:
+            sent += len(batch)
+        _record_result(subscription, batch, status, error,
+                       config.get('WEBHOOK_MAX_ATTEMPTS', 8),
+                       config.get('WEBHOOK_RETRY_BACKOFF_SECONDS', 5))
+    db.session.commit()
+    return sent
+
+
+def _idle():
+    now = _now().isoformat()
+    return not db.session.query(WebhookEvent.id).first() and not db.session.query(
+        WebhookDelivery.id).filter(_claimable(now)).first()
+
+
+def run_webhook_dispatcher(app, workers=None, stop_event=None, burst=False):
+    """Fan out and deliver webhook events until ``stop_event`` is set; returns deliveries sent.
+
+    With ``burst`` it returns once no events are pending and no delivery is due.
+    """
+    config = app.config
+    workers = workers or config.get('WEBHOOK_WORKERS', 8)
+    stop_event = stop_event or threading.Event()
+    pool = ConnectionPool(config.get('WEBHOOK_HTTP_TIMEOUT', 10),
+                          config.get('WEBHOOK_ALLOW_PRIVATE_DESTINATIONS', False))
+    total = 0
+    with ThreadPoolExecutor(workers, thread_name_prefix='webhook') as executor:
+        while not stop_event.is_set():
+            with app.app_context():
+                created = fan_out(config.get('WEBHOOK_COALESCE_SECONDS', 2))
+                sent = deliver_due(executor, pool, config)
+                total += sent
+                if burst and not created and not sent and _idle():
+                    return total
+            if not created and not sent:
+                stop_event.wait(config.get('WEBHOOK_POLL_INTERVAL', 0.5))
+    return total
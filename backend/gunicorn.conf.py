@@ -0,0 +1,43 @@
+"""Gunicorn settings; each can be overridden from the environment or the command line.
+
+With a client/server database the default worker class is ``gevent``: every
+worker serves its requests on greenlets, so slow streaming clients and
+long-running responses no longer pin one of a handful of workers while short
+CRUD requests queue behind them.
+
+With SQLite (``DATABASE_URL`` unset or ``sqlite:``) it is ``gthread`` instead.
+sqlite3 waits for a locked database inside a blocking C call (the connect
+``timeout`` and ``busy_timeout``) that gevent cannot yield from, so one writer
+waiting on the lock would stall every greenlet in its worker for up to that
+timeout. A thread waiting there releases the GIL and only holds up its own
+request. Set ``GUNICORN_WORKER_CLASS=gevent`` to override this anyway.
+"""
+import os
+
+_sqlite = os.getenv('DATABASE_URL', 'sqlite:').startswith('sqlite')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if _sqlite else 'gevent')
+# Request threads per gthread worker
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+# Concurrent greenlets per gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+preload_app = True
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded so the locks, sockets and SQLAlchemy pool
+    # queues it creates are cooperative. Pool checkouts then wait on greenlets,
+    # which caps concurrent DB work at pool_size + max_overflow per worker.
+    from gevent import monkey
+    monkey.patch_all()
+
+    # psycopg2 blocks the hub unless it is told to wait through gevent
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        pass
+    else:
+        patch_psycopg()
@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+import pytest
+
+# Read by app.config at import time
+_db_dir = tempfile.mkdtemp()
+os.environ['TEST_DATABASE_URL'] = f'sqlite:///{_db_dir}/test.db'
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models.demo_session import DemoSession
+from app.session_provisioning import SharedSessionManager
+
+
+def _statements():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    return statements, lambda: event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_ensure_provisioned_claims_only_missing_clones(app):
+    with app.app_context():
+        manager = SharedSessionManager()
+        session_id = manager.create_session()
+        statements, stop = _statements()
+        try:
+            assert manager.ensure_provisioned(session_id)
+            assert 'UPDATE' in statements
+            assert db.session.get(DemoSession, session_id).provisioned_at is not None
+
+            del statements[:]
+            assert manager.ensure_provisioned(session_id)
+            assert statements == []
+
+            other = SharedSessionManager()
+            assert other.ensure_provisioned(session_id)
+            assert statements == ['SELECT']
+
+            del statements[:]
+            assert not other.ensure_provisioned('unknown')
+            assert statements == ['SELECT']
+        finally:
+            stop()
@@ -0,0 +1,60 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.extensions import db
+from app.models.demo_session import DemoSession
+from app.models.job import Job
+from app.models.session_metrics import SessionMetrics
+from app.session_reaper import purge_session, remove_stale_session_files, session_last_access
+from app.tenancy import tenant_scope
+
+
+def test_purge_session_deletes_jobs_and_metrics(app):
+    with app.app_context():
+        db.session.add_all([
+            Job(kind='export', session_id='gone'),
+            Job(kind='export', session_id='kept'),
+            SessionMetrics(session_id='gone'),
+            SessionMetrics(session_id='kept'),
+        ])
+        db.session.commit()
+
+        with tenant_scope('gone'):
+            counts = purge_session('gone', batch_size=1)
+
+        assert counts['jobs'] == 1
+        assert counts['session_metrics'] == 1
+        with tenant_scope(None):
+            assert [j.session_id for j in Job.query.all()] == ['kept']
+            assert [m.session_id for m in SessionMetrics.query.all()] == ['kept']
+
+
+def test_file_sessions_age_by_last_access(app, tmp_path):
+    old = time.time() - 3600
+    for name in ('read.db', 'idle.db', 'untracked.db'):
+        path = tmp_path / name
+        path.write_bytes(b'x')
+        os.utime(path, (old, old))
+
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        db.session.add_all([
+            DemoSession(id='read', last_seen_at=now.isoformat(),
+                        expires_at=(now + timedelta(hours=1)).isoformat()),
+            DemoSession(id='idle', last_seen_at=(now - timedelta(hours=1)).isoformat(),
+                        expires_at=now.isoformat()),
+        ])
+        db.session.commit()
+
+        removed, _ = remove_stale_session_files(str(tmp_path), 600,
+                                                last_access=session_last_access)
+
+    assert removed == 2
+    assert sorted(os.listdir(tmp_path)) == ['read.db']
+
+
+def test_file_mode_requests_record_last_access(app, client):
+    client.get('/api/incidents', query_string={'session_id': 'abc'})
+    with app.app_context():
+        assert db.session.get(DemoSession, 'abc').last_seen_at is not None
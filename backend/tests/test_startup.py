@@ -0,0 +1,13 @@
+from app.benchmark import startup_benchmark
+
+# Generous: catches work creeping back onto the start-up path (spec building,
+# password hashing), not machine-to-machine noise. See flask benchmark-startup.
+MAX_STARTUP_MS = 3000
+
+
+def test_worker_startup_defers_spec_and_hashing(app):
+    with app.app_context():
+        result = startup_benchmark(runs=1)
+    assert result['spec_status'] == 200
+    assert result['startup_ms'] < MAX_STARTUP_MS
+    assert result['startup_ms'] < result['eager_startup_ms']
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize('tags, expected', [
+    ('db,prod', ['db', 'prod']),
+    ('', []),
+    ('["db", "prod"]', ['db', 'prod']),
+    (['db', 'prod'], ['db', 'prod']),
+    (None, []),
+])
+def test_create_incident_accepts_tag_forms(client, tags, expected):
+    response = client.post('/api/incidents', json={'title': 'Disk full', 'tags': tags})
+    assert response.status_code == 201
+    assert json.loads(response.get_json()['tags']) == expected
+
+    listed = client.get('/api/incidents', query_string={'tag': expected[:1]} if expected else {})
+    assert response.get_json()['id'] in [i['id'] for i in listed.get_json()['incidents']]
+
+
+@pytest.mark.parametrize('tags', [5, {'db': True}, ['db', 1]])
+def test_create_incident_rejects_other_tag_types(client, tags):
+    response = client.post('/api/incidents', json={'title': 'Disk full', 'tags': tags})
+    assert response.status_code == 400
@@ -126,6 +126,7 @@ export interface DashboardData {
   incidents_by_severity: Array<{ name: string; value: number; color: string }>;
   incidents_by_status: Array<{ name: string; value: number; color: string }>;
   incidents_by_category: Array<{ name: string; value: number; color: string }>;
+  top_tags?: Array<{ name: string; value: number }>;
   recent_activity: Array<TimelineEntry & { incident_number?: string }>;
   trending_problems: Problem[];
   open_incidents: Incident[];